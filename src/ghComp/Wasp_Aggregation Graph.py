@@ -109,17 +109,20 @@ def main(aggregation, full_graph, half_edge, flatten_edges):
         
         ## extract graph data
         nodes = [int(n) for n in g.get_nodes()]
-        edges = g.get_edges(flatten = flatten_edges)
-        edges_attributes = g.get_edges_attributes(flatten = flatten_edges)
+        if not flatten_edges:
+            edges = g.get_edges(flatten = flatten_edges)
+            edges_attributes = g.get_edges_attributes(flatten = flatten_edges)
         
         ## generate geometric representation
         nodes_pts = [aggregation.aggregated_parts[int(i)].center for i in sorted(nodes)]
         
         edges_lines = []
         if flatten_edges:
-            for edge in edges:
-                start = aggregation.aggregated_parts[int(edge[0])].center
-                end = aggregation.aggregated_parts[int(edge[1])].center
+            ## edge attributes are read directly from the graph arrays
+            edge_start_ids, edge_end_ids, conn_start_ids, conn_end_ids = g.get_edge_arrays()
+            for i in range(len(edge_start_ids)):
+                start = aggregation.aggregated_parts[int(edge_start_ids[i])].center
+                end = aggregation.aggregated_parts[int(edge_end_ids[i])].center
                 edges_lines.append(rg.Line(start, end))
         else:
             for i in range(len(edges)):
@@ -131,18 +134,12 @@ def main(aggregation, full_graph, half_edge, flatten_edges):
                 
         
         ## format data for GH outputs
-        edge_start_ids = []
-        edge_end_ids =[]
-        conn_start_ids =[]
-        conn_end_ids =[]
-        
-        if flatten_edges:
-            for edge_attr in edges_attributes:
-                edge_start_ids.append(edge_attr['start'])
-                edge_end_ids.append(edge_attr['end'])
-                conn_start_ids.append(edge_attr['conn_start'])
-                conn_end_ids.append(edge_attr['conn_end'])
-        else:
+        if not flatten_edges:
+            edge_start_ids = []
+            edge_end_ids =[]
+            conn_start_ids =[]
+            conn_end_ids =[]
+            
             for i in range(len(edges_attributes)):
                 edge_start_ids.append([])
                 edge_end_ids.append([])
@@ -35,6 +35,7 @@ Provided by Wasp 0.5
     Args:
         FIELD: Field object to extract iso-voxels from
         ISO: Isolevel of the voxel mesh
+        MERGE: OPTIONAL // True to merge adjacent coplanar faces into larger rectangles (False by default)
     Returns:
         VM: Voxel mesh at the chosen iso-level
 """
@@ -73,7 +74,7 @@ if wasp_loaded:
 
 
 
-def main(field, iso):
+def main(field, iso, merge):
     check_data = True
     
     ##check inputs
@@ -87,13 +88,16 @@ def main(field, iso):
         msg = "No isolevel provided"
         ghenv.Component.AddRuntimeMessage(gh.Kernel.GH_RuntimeMessageLevel.Warning, msg)
     
+    if merge is None:
+        merge = False
+    
     if check_data:
         
-        return field.compute_voxel_mesh(iso)
+        return field.compute_voxel_mesh(iso, merge=merge)
     else:
         return -1
 
-result = main(FIELD, ISO)
+result = main(FIELD, ISO, MERGE)
 
 if result != -1:
     VM = result
\ No newline at end of file
@@ -38,6 +38,7 @@ Provided by Wasp 0.5
         COUNT: Vector storing cell counts for each axis (from FieldPts component)
         RES: Resolution of cell grid
         VAL: Values to assign to each cell
+        INTERP: OPTIONAL // True to sample the field with trilinear interpolation between its points (False by default, sampling the value of the closest lower point)
     Returns:
         FIELD: Field object (to be used to drive the FieldAggr component)
 """
@@ -74,7 +75,7 @@ if wasp_loaded:
     from wasp.field import Field
 
 
-def main(name, empty_field, values):
+def main(name, empty_field, values, interpolate):
     
     check_data = True
     
@@ -100,17 +101,20 @@ def main(name, empty_field, values):
             msg = "Field points and Values lists are not matching. Please provide a number of values matching the number of points in the base field."
             ghenv.Component.AddRuntimeMessage(gh.Kernel.GH_RuntimeMessageLevel.Error, msg)
     
+    if interpolate is None:
+        interpolate = False
+    
     if check_data:
         #count = empty_field.return_count_vec()
         points = [rg.Point3d(v[0], v[1], v[2]) for v in empty_field.return_pts_list()]
-        field = Field(name, points, empty_field.return_count_vec(), empty_field.resolution, boundaries = empty_field.boundaries, plane = empty_field.plane)
+        field = Field(name, points, empty_field.return_count_vec(), empty_field.resolution, boundaries = empty_field.boundaries, plane = empty_field.plane, interpolate = interpolate)
         field.set_values(values, use_boundaries = True)
         return field
     else:
         return -1
 
 
-result = main(NAME, E_FIELD, VAL)
+result = main(NAME, E_FIELD, VAL, INTERP)
 
 if result != -1:
     FIELD = result
\ No newline at end of file
@@ -121,9 +121,9 @@ def main(aggregation, path, filename, save):
             part_dict['connection_to_parent'] = None
             
             if part.parent is not None:
-                parent_graph = aggregation.graph.graph_dict[part.parent]
-                part_dict['parent_connection'] = parent_graph[part.id]['conn_start']
-                part_dict['connection_to_parent'] = parent_graph[part.id]['conn_end']
+                parent_edge = aggregation.graph.get_edge_attributes(aggregation.graph.get_edge_index(part.parent, part.id))
+                part_dict['parent_connection'] = parent_edge['conn_start']
+                part_dict['connection_to_parent'] = parent_edge['conn_end']
             
             """
             part_dict['children'] = part.children
@@ -34,10 +34,14 @@ from __future__ import division
 import os
 import sys
 
-from Rhino.RhinoDoc import ActiveDoc
-
-
-global_tolerance = ActiveDoc.ModelAbsoluteTolerance*2
+## model tolerance used outside of Rhino (or when no document is open)
+DEFAULT_TOLERANCE = 0.001
+
+try:
+	from Rhino.RhinoDoc import ActiveDoc
+	global_tolerance = ActiveDoc.ModelAbsoluteTolerance*2
+except (ImportError, AttributeError):
+	global_tolerance = DEFAULT_TOLERANCE*2
 
 
 __author__ = ['ar0551 <a.rossi.andrea@gmail.com>']
@@ -0,0 +1,12 @@
+"""
+(C) 2017-2020 Andrea Rossi <ghwasp@gmail.com>
+
+This file is part of Wasp. https://github.com/ar0551/Wasp
+@license GPL-3.0 <https://www.gnu.org/licenses/gpl.html>
+
+@version 0.5.001
+
+Batch execution of aggregations (parameter sweeps)
+"""
+
+from .runner import *
\ No newline at end of file
@@ -0,0 +1,18 @@
+"""
+(C) 2017-2020 Andrea Rossi <ghwasp@gmail.com>
+
+This file is part of Wasp. https://github.com/ar0551/Wasp
+@license GPL-3.0 <https://www.gnu.org/licenses/gpl.html>
+
+@version 0.5.001
+
+Command-line entry point (python -m wasp.batch sweep.json)
+"""
+
+import sys
+
+from wasp.batch.runner import main
+
+
+if __name__ == "__main__":
+	sys.exit(main())
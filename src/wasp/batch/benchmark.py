@@ -0,0 +1,51 @@
+"""
+(C) 2017-2020 Andrea Rossi <ghwasp@gmail.com>
+
+This file is part of Wasp. https://github.com/ar0551/Wasp
+@license GPL-3.0 <https://www.gnu.org/licenses/gpl.html>
+
+@version 0.5.001
+
+Parts and rules shared by the benchmarks
+"""
+
+from wasp.geometry import Point3d, Vector3d, Plane, Mesh
+from wasp.core import Part, Connection, Rule, Collider
+
+
+## create a box mesh centered at the origin
+def box_mesh(size_x, size_y, size_z):
+	mesh = Mesh()
+	for z in (-0.5, 0.5):
+		for y in (-0.5, 0.5):
+			for x in (-0.5, 0.5):
+				mesh.Vertices.Add(x*size_x, y*size_y, z*size_z)
+	for face in ((0,2,3,1), (4,5,7,6), (0,1,5,4), (2,6,7,3), (0,4,6,2), (1,3,7,5)):
+		mesh.Faces.AddFace(*face)
+	return mesh
+
+
+## create a box part with a connection at the center of each face
+def box_part(name, size_x, size_y, size_z):
+	conn_planes = [((size_x*0.5,0,0), (0,1,0), (0,0,1)), ((-size_x*0.5,0,0), (0,-1,0), (0,0,1)),
+		((0,size_y*0.5,0), (-1,0,0), (0,0,1)), ((0,-size_y*0.5,0), (1,0,0), (0,0,1)),
+		((0,0,size_z*0.5), (1,0,0), (0,1,0)), ((0,0,-size_z*0.5), (1,0,0), (0,-1,0))]
+	connections = []
+	for i in range(len(conn_planes)):
+		origin, x_axis, y_axis = conn_planes[i]
+		connections.append(Connection(Plane(Point3d(*origin), Vector3d(*x_axis), Vector3d(*y_axis)), 'box', name, i))
+	collider = Collider([box_mesh(size_x*0.98, size_y*0.98, size_z*0.98)])
+	return Part(name, box_mesh(size_x, size_y, size_z), connections, collider, [])
+
+
+## create 3 box parts of different sizes and the rules of the benchmarks (all connections can be joined with each other)
+def benchmark_setup():
+	parts = [box_part('A', 1.0, 1.0, 1.0), box_part('B', 2.0, 1.0, 1.0), box_part('C', 3.0, 1.0, 0.5)]
+	rules = []
+	for part_01 in parts:
+		for conn_01 in part_01.connections:
+			for part_02 in parts:
+				for conn_02 in part_02.connections:
+					rules.append(Rule(part_01.name, conn_01.id, part_02.name, conn_02.id))
+	return parts, rules
+
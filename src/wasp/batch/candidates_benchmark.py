@@ -0,0 +1,101 @@
+"""
+(C) 2017-2020 Andrea Rossi <ghwasp@gmail.com>
+
+This file is part of Wasp. https://github.com/ar0551/Wasp
+@license GPL-3.0 <https://www.gnu.org/licenses/gpl.html>
+
+@version 0.5.001
+
+Benchmark of the evaluation of candidate placements in field-driven aggregations
+
+Usage:
+	python -m wasp.batch.candidates_benchmark [-n COUNT] [-r RULES] [-e REPEATS] [-s SEED]
+
+A field-driven aggregation of 5 box parts joined by RULES rules is created, then all candidate placements of its parts
+(one for each active rule of each active connection) are evaluated against the field, once part by part (as when a part is placed)
+and once in a single batch (as when the queue is recomputed), reporting the number of candidates evaluated per second.
+As reference, the candidates are also evaluated one by one, computing a plane to plane transformation,
+a box containment check and a field sample for each of them (as done before candidates were evaluated in batches).
+"""
+
+import argparse
+import time
+
+from wasp.geometry import GEOMETRY_BACKEND
+from wasp.geometry import Point3d, Transform
+from wasp.core import Aggregation, Rule
+from wasp.batch.benchmark import box_part
+from wasp.batch.field_benchmark import wave_field
+
+
+## create 5 box parts of different sizes, joined by the given number of rules (evenly picked among all connection pairs)
+def candidates_setup(rules_count):
+	parts = [box_part('A', 1.0, 1.0, 1.0), box_part('B', 2.0, 1.0, 1.0), box_part('C', 3.0, 1.0, 0.5), box_part('D', 1.0, 1.0, 2.0), box_part('E', 2.0, 2.0, 0.5)]
+	all_rules = []
+	for part_01 in parts:
+		for conn_01 in part_01.connections:
+			for part_02 in parts:
+				for conn_02 in part_02.connections:
+					all_rules.append(Rule(part_01.name, conn_01.id, part_02.name, conn_02.id))
+	step = max(1, len(all_rules) // rules_count)
+	return parts, all_rules[::step][:rules_count]
+
+
+## return the number of candidate placements of the given parts (active rules of their active connections)
+def count_candidates(parts):
+	count = 0
+	for part in parts:
+		for conn_id in part.active_connections:
+			count += len(part.connections[conn_id].active_rules)
+	return count
+
+
+## evaluate all candidate placements of the given parts one by one, adding the ones inside the field to the aggregation queue
+def compute_next_one_by_one(aggr, parts):
+	for part in parts:
+		for conn_id in reversed(part.active_connections):
+			conn = part.connections[conn_id]
+			for rule_id in reversed(conn.active_rules):
+				rule = conn.rules_table[rule_id]
+				next_part = aggr.parts[rule.part2]
+				next_center = Point3d(next_part.center)
+				orientTransform = Transform.PlaneToPlane(next_part.connections[rule.conn2].flip_pln, conn.pln)
+				next_center.Transform(orientTransform)
+				if aggr.field.bbox.Contains(next_center):
+					aggr.aggregation_queue.push(aggr.field.return_pt_val(next_center), (next_part.name, part.id, orientTransform, rule.conn1, rule.conn2))
+
+
+## command-line entry point
+def main(argv = None):
+	parser = argparse.ArgumentParser(prog='python -m wasp.batch.candidates_benchmark', description='Benchmark the evaluation of candidate placements in field-driven aggregations.')
+	parser.add_argument('-n', '--count', type=int, default=500, help='number of parts of the aggregation')
+	parser.add_argument('-r', '--rules', type=int, default=50, help='number of rules')
+	parser.add_argument('-e', '--repeats', type=int, default=3, help='number of repeated evaluations')
+	parser.add_argument('-s', '--seed', type=int, default=0, help='random seed')
+	args = parser.parse_args(argv)
+
+	parts, rules = candidates_setup(args.rules)
+	aggr = Aggregation('benchmark', parts, rules, 0, _field=[wave_field(21, 2.5)], _rnd_seed=args.seed)
+	aggr.aggregate_field(args.count)
+	candidates = count_candidates(aggr.aggregated_parts)
+	print("geometry backend: %s, %s parts, %s rules, %s candidates" % (GEOMETRY_BACKEND, len(aggr.aggregated_parts), len(rules), candidates))
+
+	for method in ('one by one', 'part by part', 'single batch'):
+		wall_time = 0.0
+		for i in range(args.repeats):
+			aggr.aggregation_queue.clear()
+			start_time = time.time()
+			if method == 'one by one':
+				compute_next_one_by_one(aggr, aggr.aggregated_parts)
+			elif method == 'part by part':
+				for part in aggr.aggregated_parts:
+					aggr.compute_next_w_field(part)
+			else:
+				aggr.compute_next_w_field_batch(aggr.aggregated_parts)
+			wall_time += time.time() - start_time
+		print("%s: %.0f candidates per second, %s queued" % (method, candidates * args.repeats / wall_time, aggr.aggregation_queue.count))
+	return 0
+
+
+if __name__ == '__main__':
+	main()
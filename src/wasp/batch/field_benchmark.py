@@ -0,0 +1,96 @@
+"""
+(C) 2017-2020 Andrea Rossi <ghwasp@gmail.com>
+
+This file is part of Wasp. https://github.com/ar0551/Wasp
+@license GPL-3.0 <https://www.gnu.org/licenses/gpl.html>
+
+@version 0.5.001
+
+Benchmark of iso-surface extraction and sampling of fields
+
+Usage:
+	python -m wasp.batch.field_benchmark [-n COUNT [COUNT ...]] [-i ISO [ISO ...]] [-p PARTS] [-s SEEDS]
+
+For each count, a smooth field of COUNT^3 values is created (a sum of waves, in range -3 to 3),
+and the time needed to compute its voxel mesh is reported, with and without greedy merging of the faces.
+The time needed to compute its marching cubes iso-surface is then reported for each iso value (as when scrubbing the iso value),
+followed by the time needed to compute the isolines of all its XY slices at all iso values.
+Finally, field-driven aggregations of box parts on a coarse smooth field are run for each seed, sampling the field values
+at the closest points or with trilinear interpolation, reporting the wall time and the number of rejected placements.
+"""
+
+import argparse
+import math
+import time
+
+from wasp.geometry import GEOMETRY_BACKEND
+from wasp.geometry import Point3d, Plane
+from wasp.field import Field
+from wasp.core import Aggregation
+from wasp.batch.benchmark import benchmark_setup
+
+
+## create a cubic field with smooth values, in the range -3 to 3
+def wave_field(count, resolution = 1.0, interpolate = False):
+	frequency = 4.0 * math.pi / count
+	pts = []
+	values = []
+	for z in range(count):
+		for y in range(count):
+			for x in range(count):
+				pts.append(Point3d(x*resolution, y*resolution, z*resolution))
+				values.append(math.sin(x*frequency)*math.cos(y*frequency) + math.sin(y*frequency)*math.cos(z*frequency) + math.sin(z*frequency)*math.cos(x*frequency))
+	return Field('waves', pts, [count, count, count], resolution, plane=Plane.WorldXY, values=values, interpolate=interpolate)
+
+
+## run a field-driven aggregation of box parts for each seed, returning the total wall time and number of rejected placements
+def run_field_aggregation(field, count, seeds):
+	parts, rules = benchmark_setup()
+	wall_time = 0.0
+	rejections = 0
+	for seed in range(seeds):
+		aggr = Aggregation('benchmark', parts, rules, 0, _field=[field], _rnd_seed=seed)
+		start_time = time.time()
+		aggr.aggregate_field(count)
+		wall_time += time.time() - start_time
+		rejections += sum(aggr.rejections.values())
+	return wall_time, rejections
+
+
+## command-line entry point
+def main(argv = None):
+	parser = argparse.ArgumentParser(prog='python -m wasp.batch.field_benchmark', description='Benchmark iso-surface extraction and sampling of fields.')
+	parser.add_argument('-n', '--count', type=int, nargs='+', default=[50, 100], help='numbers of values along each side of the field')
+	parser.add_argument('-i', '--iso', type=float, nargs='+', default=[0.0, 0.5, 1.0], help='iso values (the first one is used for voxel meshes)')
+	parser.add_argument('-p', '--parts', type=int, default=100, help='number of parts placed by field-driven aggregations')
+	parser.add_argument('-s', '--seeds', type=int, default=4, help='number of random seeds of field-driven aggregations')
+	args = parser.parse_args(argv)
+
+	print("geometry backend: %s" % (GEOMETRY_BACKEND))
+	for count in args.count:
+		field = wave_field(count)
+		for merge in (False, True):
+			start_time = time.time()
+			mesh = field.compute_voxel_mesh(args.iso[0], True, merge)
+			wall_time = time.time() - start_time
+			print("%s^3 values, voxels%s: %.2f s, %s vertices, %s faces" % (count, " (merged)" if merge else "", wall_time, mesh.Vertices.Count, mesh.Faces.Count))
+		for iso in args.iso:
+			start_time = time.time()
+			mesh = field.compute_iso_mesh(iso)
+			wall_time = time.time() - start_time
+			print("%s^3 values, iso-surface at %s: %.2f s, %s vertices, %s faces" % (count, iso, wall_time, mesh.Vertices.Count, mesh.Faces.Count))
+		start_time = time.time()
+		isolines = field.compute_isolines(args.iso, range(count), 2)
+		wall_time = time.time() - start_time
+		polylines = [polyline for slice_isolines in isolines for iso_isolines in slice_isolines for polyline in iso_isolines]
+		print("%s^3 values, isolines of %s slices: %.2f s, %s polylines, %s points" % (count, count * len(args.iso), wall_time, len(polylines), sum(len(polyline) for polyline in polylines)))
+	
+	for interpolate in (False, True):
+		field = wave_field(13, 2.5, interpolate)
+		wall_time, rejections = run_field_aggregation(field, args.parts, args.seeds)
+		print("field-driven aggregation, %s sampling: %.2f s, %s parts, %s seeds, %s rejections" % ("trilinear" if interpolate else "nearest", wall_time, args.parts, args.seeds, rejections))
+	return 0
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,111 @@
+"""
+(C) 2017-2020 Andrea Rossi <ghwasp@gmail.com>
+
+This file is part of Wasp. https://github.com/ar0551/Wasp
+@license GPL-3.0 <https://www.gnu.org/licenses/gpl.html>
+
+@version 0.5.001
+
+Benchmark of the JSON and binary aggregation file formats
+
+Usage:
+	python -m wasp.batch.format_benchmark [-n COUNT [COUNT ...]] [-r COUNT [COUNT ...]] [-d DIRECTORY]
+
+For each count, an aggregation of box parts placed on a lattice (and, for the random counts, a random aggregation of the same parts)
+is saved and loaded again with to_data/from_data (JSON) and with to_binary/from_binary, reporting the file sizes and the save and load times of both formats.
+The binary format stores the settings of the aggregation (base parts, rules, fields...) once, in a compressed JSON header,
+and the compressed placements of the parts (110 bytes each before compression).
+Placements on a lattice compress much better than random ones, which are closer to real aggregations.
+Parts loaded from the binary format are lazy: their connections and the open sites of the aggregation are only generated when needed,
+so the time taken by the first random placement after loading is reported too (JSON loads build them immediately).
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from wasp.geometry import GEOMETRY_BACKEND
+from wasp.geometry import Transform, Vector3d
+from wasp.core import Aggregation
+from wasp.batch.benchmark import benchmark_setup
+
+
+## create an aggregation of the benchmark parts placed on a lattice (each part placed as child of the previous one)
+def lattice_aggregation(count):
+	parts, rules = benchmark_setup()
+	aggr = Aggregation('lattice', parts, rules, 0, _rnd_seed=0)
+	side = int(round(count ** (1.0/3))) + 1
+	parent_part = None
+	for i in range(count):
+		x = i % side
+		y = (i // side) % side
+		z = i // (side * side)
+		part = aggr.restore_placement(parts[i % len(parts)].name, Transform.Translation(Vector3d(x*3.0, y*3.0, z*3.0)), i, parent_part, 0, 1)
+		parent_part = part
+	return aggr
+
+
+## create a random aggregation of the benchmark parts
+def random_aggregation(count):
+	parts, rules = benchmark_setup()
+	aggr = Aggregation('random', parts, rules, 0, _rnd_seed=0)
+	aggr.aggregate_rnd(count)
+	return aggr
+
+
+## save and load an aggregation in the given format, returning the file size and the save and load times
+def save_and_load(aggr, file_path, binary):
+	start_time = time.time()
+	if binary:
+		aggr.to_binary(file_path)
+	else:
+		with open(file_path, 'w') as f:
+			json.dump(aggr.to_data(), f)
+	save_time = time.time() - start_time
+
+	start_time = time.time()
+	if binary:
+		loaded = Aggregation.from_binary(file_path)
+	else:
+		with open(file_path, 'r') as f:
+			loaded = Aggregation.from_data(json.load(f))
+	load_time = time.time() - start_time
+
+	start_time = time.time()
+	loaded.aggregate_rnd(1)
+	first_time = time.time() - start_time
+	return os.path.getsize(file_path), save_time, load_time, first_time
+
+
+## command-line entry point
+def main(argv = None):
+	parser = argparse.ArgumentParser(prog='python -m wasp.batch.format_benchmark', description='Benchmark the JSON and binary aggregation file formats.')
+	parser.add_argument('-n', '--count', type=int, nargs='+', default=[100, 1000, 10000], help='numbers of parts to test')
+	parser.add_argument('-r', '--random', type=int, nargs='*', default=[1000], help='numbers of parts of the random aggregations to test')
+	parser.add_argument('-d', '--directory', default=None, help='directory of the saved files (temporary by default)')
+	args = parser.parse_args(argv)
+
+	directory = args.directory
+	if directory is None:
+		directory = tempfile.mkdtemp()
+
+	print("geometry backend: %s" % (GEOMETRY_BACKEND))
+	tests = [('lattice', count) for count in args.count] + [('random', count) for count in args.random]
+	for kind, count in tests:
+		if kind == 'lattice':
+			aggr = lattice_aggregation(count)
+		else:
+			aggr = random_aggregation(count)
+		name = '%s %s parts' % (kind, count)
+		json_size, json_save, json_load, json_first = save_and_load(aggr, os.path.join(directory, 'benchmark_%s_%s.json' % (kind, count)), False)
+		bin_size, bin_save, bin_load, bin_first = save_and_load(aggr, os.path.join(directory, 'benchmark_%s_%s.wbin' % (kind, count)), True)
+		print("%s, JSON: %s bytes, save %.2f s, load %.2f s, first placement %.2f s" % (name, json_size, json_save, json_load, json_first))
+		print("%s, binary: %s bytes, save %.2f s, load %.2f s, first placement %.2f s" % (name, bin_size, bin_save, bin_load, bin_first))
+		print("%s, binary vs JSON: %.1fx smaller, save %.1fx faster, load %.1fx faster, load and first placement %.1fx faster" % (name, float(json_size) / bin_size, json_save / max(bin_save, 1e-6), json_load / max(bin_load, 1e-6), (json_load + json_first) / max(bin_load + bin_first, 1e-6)))
+	return 0
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,57 @@
+"""
+(C) 2017-2020 Andrea Rossi <ghwasp@gmail.com>
+
+This file is part of Wasp. https://github.com/ar0551/Wasp
+@license GPL-3.0 <https://www.gnu.org/licenses/gpl.html>
+
+@version 0.5.001
+
+Benchmark of full graph reconstruction from aggregations
+
+Usage:
+	python -m wasp.batch.graph_benchmark [-n COUNT [COUNT ...]]
+
+For each count, an aggregation of cubes placed on a lattice (each cube touching up to 6 others) is created,
+and the time needed by Graph.from_aggregation to compute its full graph is reported.
+"""
+
+import argparse
+import time
+
+from wasp.geometry import GEOMETRY_BACKEND
+from wasp.geometry import Transform, Vector3d
+from wasp.core import Aggregation, Graph
+from wasp.batch.benchmark import box_part
+
+
+## create an aggregation of unit cubes placed on a lattice
+def lattice_aggregation(count):
+	part = box_part('A', 1.0, 1.0, 1.0)
+	aggr = Aggregation('lattice', [part], [], 0, _rnd_seed=0)
+	side = int(round(count ** (1.0/3))) + 1
+	for i in range(count):
+		x = i % side
+		y = (i // side) % side
+		z = i // (side * side)
+		aggr.restore_placement('A', Transform.Translation(Vector3d(x, y, z)), i)
+	return aggr
+
+
+## command-line entry point
+def main(argv = None):
+	parser = argparse.ArgumentParser(prog='python -m wasp.batch.graph_benchmark', description='Benchmark full graph reconstruction from aggregations.')
+	parser.add_argument('-n', '--count', type=int, nargs='+', default=[10000, 100000], help='numbers of parts to test')
+	args = parser.parse_args(argv)
+
+	print("geometry backend: %s" % (GEOMETRY_BACKEND))
+	for count in args.count:
+		aggr = lattice_aggregation(count)
+		start_time = time.time()
+		graph = Graph.from_aggregation(aggr, True)
+		wall_time = time.time() - start_time
+		print("%s parts: %.2f s, %s edges" % (count, wall_time, graph.count_edges()))
+	return 0
+
+
+if __name__ == '__main__':
+	main()
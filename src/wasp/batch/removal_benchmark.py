@@ -0,0 +1,74 @@
+"""
+(C) 2017-2020 Andrea Rossi <ghwasp@gmail.com>
+
+This file is part of Wasp. https://github.com/ar0551/Wasp
+@license GPL-3.0 <https://www.gnu.org/licenses/gpl.html>
+
+@version 0.5.001
+
+Benchmark of the removal of parts from field-driven aggregations (as when scrubbing the number of parts)
+
+Usage:
+	python -m wasp.batch.removal_benchmark [-n COUNT [COUNT ...]] [-r STEPS] [-k PARTS] [-s SEED]
+
+For each count, a field-driven aggregation of box parts is created, then the number of parts is scrubbed down by PARTS for STEPS times
+(as when dragging the slider of the Field-driven Aggregation component) and back up again.
+The mean latency of each removal is reported with the incremental undo of the logged changes and with the full reset of all parts and queue
+(as done when the changes log is not available), followed by the mean time needed to place each part again.
+"""
+
+import argparse
+import time
+
+from wasp.geometry import GEOMETRY_BACKEND
+from wasp.core import Aggregation
+from wasp.batch.benchmark import benchmark_setup
+from wasp.batch.field_benchmark import wave_field
+
+
+## scrub the number of parts down and up again, returning the mean latency of removals and of the placement of the removed parts
+## if full_reset is True, the changes log is cleared before each removal, so that all parts and the whole queue are recomputed
+def scrub_aggregation(aggr, steps, parts_per_step, full_reset):
+	count = len(aggr.aggregated_parts)
+	remove_time = 0.0
+	for i in range(steps):
+		if full_reset:
+			aggr.reset_history()
+		start_time = time.time()
+		aggr.remove_elements(count - (i+1)*parts_per_step)
+		remove_time += time.time() - start_time
+
+	## some placements might be rejected, so the parts placed again might be less than the removed ones
+	size = len(aggr.aggregated_parts)
+	start_time = time.time()
+	aggr.aggregate_field(count - size)
+	add_time = time.time() - start_time
+	return remove_time / steps, add_time / max(len(aggr.aggregated_parts) - size, 1)
+
+
+## command-line entry point
+def main(argv = None):
+	parser = argparse.ArgumentParser(prog='python -m wasp.batch.removal_benchmark', description='Benchmark the removal of parts from field-driven aggregations.')
+	parser.add_argument('-n', '--count', type=int, nargs='+', default=[500, 2000], help='numbers of parts of the aggregations')
+	parser.add_argument('-r', '--steps', type=int, default=10, help='number of removals for each scrub')
+	parser.add_argument('-k', '--parts', type=int, default=1, help='number of parts removed by each step')
+	parser.add_argument('-s', '--seed', type=int, default=0, help='random seed')
+	args = parser.parse_args(argv)
+
+	parts, rules = benchmark_setup()
+	field = wave_field(21, 2.5)
+	print("geometry backend: %s, steps: %s, parts per step: %s" % (GEOMETRY_BACKEND, args.steps, args.parts))
+
+	for count in args.count:
+		aggr = Aggregation('benchmark', parts, rules, 0, _field=[field], _rnd_seed=args.seed)
+		aggr.aggregate_field(count)
+		## the incremental scrub comes first, as it needs the changes logged while placing the parts
+		for full_reset in (False, True):
+			size = len(aggr.aggregated_parts)
+			remove_time, add_time = scrub_aggregation(aggr, args.steps, args.parts, full_reset)
+			print("%s parts, %s: %.1f ms per removal, %.1f ms per part placed again" % (size, "full reset" if full_reset else "incremental", 1000.0 * remove_time, 1000.0 * add_time))
+	return 0
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,294 @@
+"""
+(C) 2017-2020 Andrea Rossi <ghwasp@gmail.com>
+
+This file is part of Wasp. https://github.com/ar0551/Wasp
+@license GPL-3.0 <https://www.gnu.org/licenses/gpl.html>
+
+@version 0.5.001
+
+Command-line batch runner for parameter sweeps over aggregations
+
+Usage:
+	python -m wasp.batch sweep.json [-p PROCESSES] [-o OUTPUT_DIR]
+
+The sweep spec is a JSON file with the following keys:
+	aggregation (str): Base aggregation file (saved with Aggregation.to_data or header_to_data), relative to the spec file
+	method (str): Aggregation method, 'rnd' or 'field' (default 'rnd')
+	count (int): Number of parts to place in each run
+	mode (int): Optional override of the constraints mode of the base aggregation
+	seeds ([int] or dict): List of random seeds, or {"start": a, "stop": b} for a range (default [0])
+	rule_sets (dict): Optional named rule sets, as lists of indexes of the base rules or of rule data dictionaries
+	catalogs (dict): Optional named catalogs, as PartCatalog data dictionaries (false for no catalog)
+	global_constraints (dict): Optional named lists of global constraints data dictionaries
+	output (str): Results directory, relative to the spec file (default 'sweep_results')
+	format (str): Results format, 'binary' (see Aggregation.to_binary), 'json' or 'none' (default 'binary')
+	processes (int): Number of worker processes (default: number of CPUs)
+
+A null entry in rule_sets, catalogs or global_constraints keeps the setting of the base aggregation.
+One run is executed for each combination of rule set, catalog, global constraints and seed,
+and the metrics of all runs are written to metrics.json in the results directory.
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from wasp.core import Aggregation, Rule, PartCatalog, Collider
+from wasp.core import Plane_Constraint, Mesh_Constraint
+
+
+## base aggregation and sweep spec of the current worker process (see init_worker)
+_worker_base = None
+
+
+## create the global constraints from their data dictionaries
+def global_constraints_from_data(data):
+	constraints = []
+	for const_data in data:
+		if const_data['type'] == 'plane':
+			constraints.append(Plane_Constraint.from_data(const_data))
+		elif const_data['type'] == 'mesh_collider':
+			constraints.append(Mesh_Constraint.from_data(const_data))
+	return constraints
+
+
+## load a sweep spec from file, resolving paths relative to the spec location
+def load_sweep_spec(file_path):
+	with open(file_path, 'r') as f:
+		spec = json.load(f)
+	spec_dir = os.path.dirname(os.path.abspath(file_path))
+	spec['aggregation'] = os.path.join(spec_dir, spec['aggregation'])
+	spec['output'] = os.path.join(spec_dir, spec.get('output', 'sweep_results'))
+	return spec
+
+
+## return the runs of a sweep, one for each combination of rule set, catalog, global constraints and seed
+def expand_sweep(spec):
+	seeds = spec.get('seeds', [0])
+	if isinstance(seeds, dict):
+		seeds = list(range(int(seeds['start']), int(seeds['stop'])))
+	rule_sets = spec.get('rule_sets') or {'base': None}
+	catalogs = spec.get('catalogs') or {'base': None}
+	constraints = spec.get('global_constraints') or {'base': None}
+
+	runs = []
+	for rule_set, catalog, const_set, seed in itertools.product(sorted(rule_sets), sorted(catalogs), sorted(constraints), seeds):
+		run = {}
+		run['id'] = len(runs)
+		run['seed'] = seed
+		run['rule_set'] = rule_set
+		run['catalog'] = catalog
+		run['global_constraints'] = const_set
+		runs.append(run)
+	return runs
+
+
+## check a sweep spec against its base aggregation, raising a ValueError describing the first invalid setting
+def validate_sweep_spec(spec, base):
+	if 'count' not in spec:
+		raise ValueError("Invalid sweep spec: missing 'count'")
+	try:
+		int(spec['count'])
+	except (TypeError, ValueError):
+		raise ValueError("Invalid sweep spec: 'count' must be an integer, not %r" % (spec['count'],))
+
+	method = spec.get('method', 'rnd')
+	if method not in ('rnd', 'field'):
+		raise ValueError("Invalid sweep spec: unknown method %r (use 'rnd' or 'field')" % (method,))
+	if method == 'field' and base.field is None:
+		raise ValueError("Invalid sweep spec: method 'field' requires a base aggregation with a field")
+	if spec.get('format', 'binary') not in ('binary', 'json', 'none'):
+		raise ValueError("Invalid sweep spec: unknown format %r (use 'binary', 'json' or 'none')" % (spec['format'],))
+	if 'mode' in spec and spec['mode'] not in (0, 1, 2, 3):
+		raise ValueError("Invalid sweep spec: unknown mode %r (use 0, 1, 2 or 3)" % (spec['mode'],))
+
+	for name, rules_data in (spec.get('rule_sets') or {}).items():
+		for rule_data in (rules_data or []):
+			if isinstance(rule_data, int) and not 0 <= rule_data < len(base.rules):
+				raise ValueError("Invalid sweep spec: rule set %r refers to rule %s, but the base aggregation has %s rules" % (name, rule_data, len(base.rules)))
+
+	for name, catalog_data in (spec.get('catalogs') or {}).items():
+		if catalog_data:
+			for part_name in catalog_data['parts']:
+				if part_name not in base.parts:
+					raise ValueError("Invalid sweep spec: catalog %r refers to part %r, which is not in the base aggregation" % (name, part_name))
+
+
+## create the settings shared by all runs of a sweep: base parts, rules, fields and constraints are created once and reused by all runs
+## the spec is validated first, so that invalid settings are reported before any run is started
+def build_sweep_setup(base_data, spec):
+	base = Aggregation.from_header_data(base_data)
+	validate_sweep_spec(spec, base)
+
+	if base.field is None:
+		fields = []
+	elif base.multiple_fields:
+		fields = [base.field[name] for name in sorted(base.field)]
+	else:
+		fields = [base.field]
+
+	rule_sets = {}
+	for name, rules_data in (spec.get('rule_sets') or {'base': None}).items():
+		if rules_data is None:
+			rule_sets[name] = base.rules
+		else:
+			rule_sets[name] = [base.rules[r] if isinstance(r, int) else Rule.from_data(r) for r in rules_data]
+
+	constraints = {}
+	for name, const_data in (spec.get('global_constraints') or {'base': None}).items():
+		if const_data is None:
+			constraints[name] = base.global_constraints
+		else:
+			constraints[name] = global_constraints_from_data(const_data)
+
+	return {'aggregation': base, 'fields': fields, 'rule_sets': rule_sets, 'global_constraints': constraints, 'spec': spec}
+
+
+## initialize a worker process with the settings built by the parent process (nothing is computed here, as errors raised by initializers are not reported by the pool)
+def init_worker(setup):
+	global _worker_base
+	_worker_base = setup
+
+
+## return a new catalog for a run (catalogs are modified while aggregating, so they are never shared)
+def return_run_catalog(base, catalog_data):
+	if catalog_data is None:
+		if base.catalog is None:
+			return None
+		return base.catalog.copy()
+	if catalog_data is False:
+		return None
+	return PartCatalog.from_data(catalog_data)
+
+
+## execute a single run in the current worker process and return its metrics
+def execute_run(run):
+	base = _worker_base['aggregation']
+	spec = _worker_base['spec']
+
+	name = "%s_%04d" % (base.name, run['id'])
+	count = int(spec['count'])
+	catalog = return_run_catalog(base, (spec.get('catalogs') or {}).get(run['catalog']))
+
+	Collider.reset_stats()
+	start_time = time.time()
+
+	aggr = Aggregation(name, list(base.parts.values()), _worker_base['rule_sets'][run['rule_set']], spec.get('mode', base.mode), [], base.coll_check,
+		_field=_worker_base['fields'], _global_constraints=_worker_base['global_constraints'][run['global_constraints']], _rnd_seed=run['seed'], _catalog=catalog)
+	if spec.get('method', 'rnd') == 'field':
+		msg = aggr.aggregate_field(count, catalog is not None)
+	else:
+		msg = aggr.aggregate_rnd(count, catalog is not None)
+
+	wall_time = time.time() - start_time
+
+	metrics = dict(run)
+	metrics['name'] = name
+	metrics['parts_placed'] = len(aggr.aggregated_parts)
+	metrics['message'] = msg
+	metrics['rejections'] = dict(aggr.rejections)
+	metrics['collision_checks'] = dict(Collider.stats)
+	metrics['wall_time'] = wall_time
+	metrics['bounding_box'] = None
+	metrics['bounding_volume'] = 0.0
+	if len(aggr.aggregated_parts) > 0:
+		bbox = aggr.return_bounding_box()
+		size = bbox.Diagonal
+		metrics['bounding_box'] = [[bbox.Min.X, bbox.Min.Y, bbox.Min.Z], [bbox.Max.X, bbox.Max.Y, bbox.Max.Z]]
+		metrics['bounding_volume'] = size.X * size.Y * size.Z
+
+	## save result
+	metrics['file'] = None
+	result_format = spec.get('format', 'binary')
+	if result_format == 'binary':
+		metrics['file'] = os.path.join(spec['output'], name + '.wbin')
+		aggr.to_binary(metrics['file'])
+	elif result_format == 'json':
+		metrics['file'] = os.path.join(spec['output'], name + '.json')
+		with open(metrics['file'], 'w') as f:
+			json.dump(aggr.to_data(), f)
+
+	return metrics
+
+
+## execute all runs of a sweep over a pool of worker processes, returning their metrics (in run order)
+def run_sweep(spec, processes = None, callback = None):
+	'''
+	Runs a parameter sweep, saving the results and their metrics in the output directory of the spec.
+	Invalid specs raise a ValueError before any run is started.
+
+	Args:
+		spec (dict): Sweep spec (see load_sweep_spec)
+		processes (int): Number of worker processes (overrides the spec, 1 runs everything in the current process)
+		callback (function): Optional function called with the metrics of each completed run
+
+	Returns:
+		results ([dict]): Metrics of each run
+	'''
+	with open(spec['aggregation'], 'r') as f:
+		base_data = json.load(f)
+
+	## built once here, so that invalid specs raise before any worker is started
+	setup = build_sweep_setup(base_data, spec)
+
+	runs = expand_sweep(spec)
+	if not os.path.isdir(spec['output']):
+		os.makedirs(spec['output'])
+
+	if processes is None:
+		processes = spec.get('processes') or multiprocessing.cpu_count()
+	processes = max(1, min(processes, len(runs)))
+
+	results = []
+	if processes == 1:
+		init_worker(setup)
+		for run in runs:
+			results.append(execute_run(run))
+			if callback is not None:
+				callback(results[-1])
+	else:
+		pool = multiprocessing.Pool(processes, initializer=init_worker, initargs=(setup,))
+		try:
+			for metrics in pool.imap(execute_run, runs):
+				results.append(metrics)
+				if callback is not None:
+					callback(metrics)
+			pool.close()
+		except:
+			pool.terminate()
+			raise
+		finally:
+			pool.join()
+
+	with open(os.path.join(spec['output'], 'metrics.json'), 'w') as f:
+		json.dump(results, f, indent=1)
+
+	return results
+
+
+## command-line entry point
+def main(argv = None):
+	parser = argparse.ArgumentParser(prog='python -m wasp.batch', description='Run a parameter sweep of Wasp aggregations.')
+	parser.add_argument('spec', help='sweep spec file (JSON)')
+	parser.add_argument('-p', '--processes', type=int, default=None, help='number of worker processes')
+	parser.add_argument('-o', '--output', default=None, help='results directory (overrides the spec)')
+	args = parser.parse_args(argv)
+
+	spec = load_sweep_spec(args.spec)
+	if args.output is not None:
+		spec['output'] = os.path.abspath(args.output)
+
+	total = len(expand_sweep(spec))
+	def report(metrics):
+		print("[%s/%s] %s: %s parts, %.2f s" % (metrics['id']+1, total, metrics['name'], metrics['parts_placed'], metrics['wall_time']))
+
+	try:
+		run_sweep(spec, args.processes, report)
+	except ValueError as e:
+		sys.stderr.write("%s\n" % (e))
+		return 1
+	return 0
@@ -0,0 +1,90 @@
+"""
+(C) 2017-2020 Andrea Rossi <ghwasp@gmail.com>
+
+This file is part of Wasp. https://github.com/ar0551/Wasp
+@license GPL-3.0 <https://www.gnu.org/licenses/gpl.html>
+
+@version 0.5.001
+
+Benchmark of the placement cost of random aggregations as they grow
+
+Usage:
+	python -m wasp.batch.scaling_benchmark [-n COUNT [COUNT ...]] [-w WINDOW] [-c CACHE] [-s SEED]
+
+A random aggregation of box parts is grown up to each count, then the time needed to place the next WINDOW parts is reported,
+per placed part and per checked candidate (placed or rejected), together with the mean number of collider pairs tested for each candidate (the parts found nearby by the spatial index).
+With the spatial index as broad phase, the cost per checked candidate stays roughly flat as the aggregation grows.
+A full garbage collection is run before each measure, and the time spent in garbage collections during the measure is reported separately,
+as a single full collection of a large aggregation (which visits all its objects) can take longer than the whole window.
+The geometry cache of the lazy parts is sized to the largest count by default: with a smaller CACHE, the colliders of the parts
+evicted from the cache are generated again when a candidate is checked against them, and the cost per candidate grows with the evicted share.
+"""
+
+import argparse
+import gc
+import time
+
+from wasp.geometry import GEOMETRY_BACKEND
+from wasp.core import Aggregation, Collider, set_geometry_cache_size
+from wasp.batch.benchmark import benchmark_setup
+
+
+## garbage collector callback accumulating the time spent in collections
+class GCTimer(object):
+	
+	def __init__(self):
+		self.start_time = None
+		self.total = 0.0
+	
+	def __call__(self, phase, info):
+		if phase == 'start':
+			self.start_time = time.time()
+		elif self.start_time is not None:
+			self.total += time.time() - self.start_time
+			self.start_time = None
+
+
+## command-line entry point
+def main(argv = None):
+	parser = argparse.ArgumentParser(prog='python -m wasp.batch.scaling_benchmark', description='Benchmark the placement cost of random aggregations as they grow.')
+	parser.add_argument('-n', '--count', type=int, nargs='+', default=[1000, 5000, 10000, 50000], help='aggregation sizes at which the placement cost is measured')
+	parser.add_argument('-w', '--window', type=int, default=200, help='number of parts placed for each measure')
+	parser.add_argument('-c', '--cache', type=int, default=None, help='number of lazy parts keeping their geometry in memory (the largest count by default)')
+	parser.add_argument('-s', '--seed', type=int, default=0, help='random seed')
+	args = parser.parse_args(argv)
+
+	cache_size = args.cache
+	if cache_size is None:
+		cache_size = max(args.count) + args.window
+	set_geometry_cache_size(cache_size)
+
+	parts, rules = benchmark_setup()
+	print("geometry backend: %s, window: %s parts, geometry cache: %s parts" % (GEOMETRY_BACKEND, args.window, cache_size))
+
+	gc_timer = GCTimer()
+	gc.callbacks.append(gc_timer)
+
+	aggr = Aggregation('benchmark', parts, rules, 0, _rnd_seed=args.seed)
+	for count in sorted(args.count):
+		## grow the aggregation up to the requested size (not measured)
+		if len(aggr.aggregated_parts) < count:
+			aggr.aggregate_rnd(count - len(aggr.aggregated_parts))
+
+		size = len(aggr.aggregated_parts)
+		checks = sum(aggr.rejections.values())
+		Collider.reset_stats()
+		gc.collect()
+		gc_timer.total = 0.0
+		start_time = time.time()
+		aggr.aggregate_rnd(args.window)
+		wall_time = time.time() - start_time
+
+		placed = len(aggr.aggregated_parts) - size
+		checks = sum(aggr.rejections.values()) - checks + placed
+		print("%s parts: %.2f ms per placement, %.3f ms per checked candidate, %.1f collider pairs per candidate, %.2f s in garbage collections" % (size, 1000.0 * wall_time / max(placed, 1), 1000.0 * wall_time / max(checks, 1), float(Collider.stats['pairs']) / max(checks, 1), gc_timer.total))
+	gc.callbacks.remove(gc_timer)
+	return 0
+
+
+if __name__ == '__main__':
+	main()
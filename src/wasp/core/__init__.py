@@ -16,4 +16,9 @@ from .attributes import *
 from .aggregation import *
 from .constraints import *
 from .colliders import *
-from .graph import *
\ No newline at end of file
+from .graph import *
+from .spatial import *
+from .queues import *
+from .streams import *
+from .memo import *
+from .sites import *
\ No newline at end of file
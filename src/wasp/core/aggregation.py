@@ -10,21 +10,46 @@ Aggregation class and functions
 """
 
 import random
-import bisect
 import time
+import json
+import struct
+import sys
+import os
+import zlib
+from array import array
 
-from Rhino.Geometry import Transform
-from Rhino.Geometry import Point3d, Vector3d, Plane
+from wasp.geometry import Transform
+from wasp.geometry import Point3d, Vector3d, Plane, BoundingBox
 
 from wasp import global_tolerance
+from wasp.utilities import transform_to_list, transform_from_list, replace_file, backup_path
 
 from wasp.core.parts import Part, AdvancedPart, PartCatalog
-from wasp.core.rules import Rule
+from wasp.core.rules import Rule, generate_rules_tables
 from wasp.core.graph import Graph
 from wasp.core.constraints import Plane_Constraint, Mesh_Constraint
+from wasp.core.spatial import SpatialGrid
+from wasp.core.queues import AggregationQueue
+from wasp.core.streams import AggregationStreamWriter, read_aggregation_stream
+from wasp.core.memo import FailureMemo
+from wasp.core.sites import OpenSites
 
 from wasp.field import Field
 
+## python 3 compatibility
+try:
+	xrange
+except NameError:
+	xrange = range
+
+
+## identifier and version of the binary aggregation format
+BINARY_MAGIC = b'WASPAGGR'
+BINARY_VERSION = 2
+
+## version of the checkpoint format
+CHECKPOINT_VERSION = 1
+
 
 #################################################################### Aggregation ####################################################################
 class Aggregation(object):
@@ -48,6 +73,9 @@ class Aggregation(object):
 		self.aggregated_parts = []
 		self.graph = Graph()
 		
+		## index of each aggregated part in the aggregated parts list, by part id (ids of previous parts might not follow the list order)
+		self.part_indexes = {}
+		
 		## fields
 		self.multiple_fields = False
 		if len(_field) == 0:
@@ -60,16 +88,49 @@ class Aggregation(object):
 				self.field[f.name] = f
 			self.multiple_fields = True
 		
+		## relative transformations between connected base parts, in the form (part1, conn1, part2, conn2): transform
+		self.rule_transforms = {}
+		
 		## reset base parts
 		self.reset_base_parts()
 		
 		## temp list to store possible colliders to newly added parts
 		self.possible_collisions = []
 		
-		## aggregation queue, storing sorted possible next states in the form (part, f_val)
-		self.aggregation_queue = []
-		self.queue_values = []
-		self.queue_count = 0
+		## spatial index of aggregated parts centers (broad phase for collision checks)
+		self.spatial_index = None
+		self.reset_spatial_index()
+		
+		## aggregation queue, storing sorted possible next states in the form (part_name, parent_id, transform, conn1, conn2)
+		self.aggregation_queue = AggregationQueue()
+		
+		## optional writer receiving each placed part (see to_stream)
+		self.stream_writer = None
+		
+		## periodic checkpoints (see set_checkpoints)
+		self.checkpoint_path = None
+		self.checkpoint_parts = None
+		self.checkpoint_seconds = None
+		self.last_checkpoint_size = 0
+		self.last_checkpoint_time = 0
+		
+		## number of candidate placements rejected by each check
+		self.rejections = {'collision': 0, 'additional_collider': 0, 'missing_supports': 0, 'global_constraints': 0, 'adjacencies': 0, 'orientation': 0}
+		
+		## log of changes to connections, rules and queue, in the form (type, aggregation_size, ...), used to undo them when removing parts
+		self.history = []
+		self.history_start = 0
+		
+		## placements rejected only for missing supports or adjacencies, reconsidered when a part is placed within their reach
+		self.failure_memo = FailureMemo(self.spatial_index.cell_size)
+		
+		## active rules of the active connections of the aggregated parts, sampled by aggregate_rnd in the form (part_index, conn_id, rule_id)
+		self.open_sites = OpenSites()
+		## number of aggregated parts covered by the open sites (the sites are rebuilt if it does not match the aggregated parts list)
+		self.open_sites_count = 0
+		
+		## re-test the open connections around each part placed by aggregate_rnd, pruning the rules blocked by it
+		self.sweep_connections = False
 		
 		## previous aggregated parts
 		self.prev_num = 0
@@ -77,10 +138,10 @@ class Aggregation(object):
 			self.prev_num = len(_prev)
 			for prev_p in _prev:
 				prev_p_copy = prev_p.copy(maintain_parenting=True)
-				prev_p_copy.reset_part(self.rules)
+				prev_p_copy.reset_part(self.rules, self.rules_tables)
 				if prev_p_copy.id is None:
-					prev_p_copy.id = len(self.aggregated_parts)
-				self.aggregated_parts.append(prev_p_copy)
+					prev_p_copy.id = self.return_next_part_id()
+				self.append_part(prev_p_copy)
 
 				## add node to graph
 				self.graph.add_node(prev_p_copy.id)
@@ -90,6 +151,10 @@ class Aggregation(object):
 				if self.field is not None:
 					self.compute_next_w_field(prev_p_copy)
 		
+		## changes made while adding previous parts are not logged
+		self.reset_history()
+		self.reset_open_sites()
+		
 		## global constraints applied to the aggregation
 		self.global_constraints = _global_constraints
 		
@@ -116,6 +181,37 @@ class Aggregation(object):
 	## create class from data dictionary
 	@classmethod
 	def from_data(cls, data):
+		aggregation = cls.from_header_data(data)
+
+		d_aggregated_parts = []
+		for p_id in data['aggregated_parts_sequence']:
+			aggr_part_data = data['aggregated_parts'][str(p_id)]
+			if aggr_part_data['class_type'] == 'Part':
+				d_aggregated_parts.append(Part.from_data(aggr_part_data))
+			elif aggr_part_data['class_type'] == 'AdvancedPart':
+				d_aggregated_parts.append(AdvancedPart.from_data(aggr_part_data))
+			else:
+				pass
+		
+		aggregation.aggregated_parts = d_aggregated_parts
+		aggregation.reset_part_indexes()
+		aggregation.reset_spatial_index()
+
+		aggregation.graph = Graph.from_data(data['graph'])
+
+		aggregation.reset_rules(aggregation.rules)
+		## if using a field, recompute the whole aggregation queue
+		if aggregation.field is not None:
+			aggregation.recompute_aggregation_queue()
+		aggregation.reset_history()
+		aggregation.reset_open_sites()
+
+		return aggregation
+	
+
+	## create an empty aggregation from the data dictionary of its settings (base parts, rules, fields, constraints, seed and catalog)
+	@classmethod
+	def from_header_data(cls, data):
 		d_name = data['name']
 
 		d_parts = []
@@ -146,40 +242,33 @@ class Aggregation(object):
 		if data['catalog'] is not None:
 			d_catalog = PartCatalog.from_data(data['catalog'])
 		
-		aggregation = cls(d_name, d_parts, d_rules, d_mode, [], d_coll_check, _field = d_field, _global_constraints=d_global_constraints, _rnd_seed=d_rnd_seed, _catalog=d_catalog)
-
-		d_aggregated_parts = []
-		for p_id in data['aggregated_parts_sequence']:
-			aggr_part_data = data['aggregated_parts'][str(p_id)]
-			if aggr_part_data['class_type'] == 'Part':
-				d_aggregated_parts.append(Part.from_data(aggr_part_data))
-			elif aggr_part_data['class_type'] == 'AdvancedPart':
-				d_aggregated_parts.append(AdvancedPart.from_data(aggr_part_data))
-			else:
-				pass
-		
-		aggregation.aggregated_parts = d_aggregated_parts
-
-		aggregation.graph = Graph.from_data(data['graph'])
-
-		aggregation.reset_rules(aggregation.rules)
-		## if using a field, recompute the whole aggregation queue
-		if aggregation.field is not None:
-			aggregation.recompute_aggregation_queue()
-
-		return aggregation
+		return cls(d_name, d_parts, d_rules, d_mode, [], d_coll_check, _field = d_field, _global_constraints=d_global_constraints, _rnd_seed=d_rnd_seed, _catalog=d_catalog)
 
 
 		
 	## return the data dictionary representing the aggregation
 	def to_data(self):
+		data = self.header_to_data()
+		data['graph'] = self.graph.to_data()
+
+		#data['aggregated_parts'] = [part.to_data() for part in self.aggregated_parts]
+		data['aggregated_parts'] =  {}
+		data['aggregated_parts_sequence'] = []
+		for part in self.aggregated_parts:
+			data['aggregated_parts'][part.id] = part.to_data()
+			data['aggregated_parts_sequence'].append(part.id)
+
+		return data
+	
+
+	## return the data dictionary representing the aggregation settings, without aggregated parts
+	def header_to_data(self):
 		data = {}
 		data['name'] = self.name
 		data['parts'] = [part.to_data() for part in self.parts.values()]
 		data['rules'] = [rule.to_data() for rule in self.rules]
 		data['mode'] = self.mode
 		data['coll_check'] = self.coll_check
-		data['graph'] = self.graph.to_data()
 
 		if self.field is None:
 			data['field'] = None
@@ -194,15 +283,410 @@ class Aggregation(object):
 		data['catalog'] = None
 		if self.catalog is not None:
 			data['catalog'] = self.catalog.to_data()
+		return data
+	
 
-		#data['aggregated_parts'] = [part.to_data() for part in self.aggregated_parts]
-		data['aggregated_parts'] =  {}
-		data['aggregated_parts_sequence'] = []
+	## save the aggregation to a compact binary file
+	def to_binary(self, file_path):
+		'''
+		Saves the aggregation in the Wasp binary format, storing the settings once and only the placement of each aggregated part.
+
+		File layout (all numbers little-endian):
+			magic (8 bytes): b'WASPAGGR'
+			version (uint32): format version (currently 2)
+			header_size (uint32): size in bytes of the header
+			header (header_size bytes): zlib-compressed UTF-8 JSON of header_to_data(), plus 'part_names' (base part names, indexed by the placements) and 'count' (number of placements)
+			placements (rest of the file, zlib-compressed), stored column by column (count values each):
+				name index (uint16), id (int32), parent id (int32, -1 if none), 
+				connection on parent (int16, -1 if none), connection to parent (int16, -1 if none), 
+				transform (12 float64 per part, first 3 rows of the matrix)
+		Version 1 files (same layout, without compression) can still be loaded.
+
+		Args:
+			file_path (str): Path of the file to write
+		'''
+		part_names = sorted(self.parts.keys())
+		names_index = dict((part_names[i], i) for i in xrange(len(part_names)))
+		
+		header = self.header_to_data()
+		header['part_names'] = part_names
+		header['count'] = len(self.aggregated_parts)
+		header_bytes = zlib.compress(json.dumps(header).encode('utf-8'))
+		
+		columns = [array('H'), array('i'), array('i'), array('h'), array('h'), array('d')]
 		for part in self.aggregated_parts:
-			data['aggregated_parts'][part.id] = part.to_data()
-			data['aggregated_parts_sequence'].append(part.id)
+			if not isinstance(part.id, int) or (part.parent is not None and not isinstance(part.parent, int)):
+				raise ValueError("The binary format requires integer part and parent ids")
+			columns[0].append(names_index[part.name])
+			columns[1].append(part.id)
+			columns[2].append(-1 if part.parent is None else part.parent)
+			columns[3].append(-1 if part.conn_on_parent is None else part.conn_on_parent)
+			columns[4].append(-1 if part.conn_to_parent is None else part.conn_to_parent)
+			columns[5].extend(transform_to_list(part.transformation))
+		
+		placements = []
+		for column in columns:
+			if sys.byteorder == 'big':
+				column.byteswap()
+			placements.append(column.tobytes() if hasattr(column, 'tobytes') else column.tostring())
+		
+		with open(file_path, 'wb') as f:
+			f.write(struct.pack('<8sII', BINARY_MAGIC, BINARY_VERSION, len(header_bytes)))
+			f.write(header_bytes)
+			f.write(zlib.compress(b''.join(placements)))
+	
 
-		return data
+	## load an aggregation from a binary file (see to_binary for the file layout)
+	@classmethod
+	def from_binary(cls, file_path):
+		with open(file_path, 'rb') as f:
+			magic, version, header_size = struct.unpack('<8sII', f.read(16))
+			if magic != BINARY_MAGIC or version > BINARY_VERSION:
+				raise ValueError("Not a valid Wasp binary aggregation file")
+			header_bytes = f.read(header_size)
+			placements = f.read()
+		
+		## version 1 files are not compressed
+		if version > 1:
+			header_bytes = zlib.decompress(header_bytes)
+			placements = zlib.decompress(placements)
+		header = json.loads(header_bytes.decode('utf-8'))
+		count = header['count']
+		
+		columns = []
+		start = 0
+		for typecode, size in (('H', count), ('i', count), ('i', count), ('h', count), ('h', count), ('d', count*12)):
+			column = array(typecode)
+			end = start + size * column.itemsize
+			if hasattr(column, 'frombytes'):
+				column.frombytes(placements[start:end])
+			else:
+				column.fromstring(placements[start:end])
+			if sys.byteorder == 'big':
+				column.byteswap()
+			columns.append(column)
+			start = end
+		
+		aggregation = cls.from_header_data(header)
+		base_parts = [aggregation.parts[name] for name in header['part_names']]
+		names_ids, ids, parents, conns_on_parent, conns_to_parent, transforms = columns
+		
+		## placed parts are built directly from the columns as lazy transformed parts, their geometry and connections are generated when requested
+		aggregated_parts = []
+		part_indexes = {}
+		graph = aggregation.graph
+		for i in xrange(count):
+			part = base_parts[names_ids[i]].transform(transform_from_list(transforms[i*12:(i+1)*12]))
+			part.id = ids[i]
+			part.reset_part(aggregation.rules, aggregation.rules_tables)
+			graph.add_node(part.id)
+			
+			if parents[i] != -1:
+				parent_part = aggregated_parts[part_indexes[parents[i]]]
+				part.parent = parent_part.id
+				part.conn_on_parent = conns_on_parent[i]
+				part.conn_to_parent = conns_to_parent[i]
+				parent_part.children.append(part.id)
+				graph.add_edge(parent_part.id, part.id, part.conn_on_parent, part.conn_to_parent)
+				
+				## deactivate the connections used to connect the part to its parent
+				if part.conn_to_parent in part.active_connections:
+					part.active_connections.remove(part.conn_to_parent)
+				if part.conn_on_parent in parent_part.active_connections:
+					parent_part.active_connections.remove(part.conn_on_parent)
+			
+			part_indexes[part.id] = i
+			aggregated_parts.append(part)
+		
+		aggregation.aggregated_parts = aggregated_parts
+		aggregation.part_indexes = part_indexes
+		aggregation.reset_spatial_index()
+		
+		## if using a field, recompute the whole aggregation queue
+		if aggregation.field is not None:
+			aggregation.recompute_aggregation_queue()
+		aggregation.reset_history()
+		## open sites are built when first needed (see check_open_sites), as they require the connections of every part
+
+		return aggregation
+	
+
+	## save the aggregation to a stream file, which can be extended while the aggregation grows (see AggregationStreamWriter)
+	def to_stream(self, file_path, keep_open = False):
+		writer = AggregationStreamWriter(file_path, self)
+		if keep_open:
+			self.stream_writer = writer
+		else:
+			writer.close()
+		return writer
+	
+
+	## stop writing placed parts to the stream file
+	def close_stream(self):
+		if self.stream_writer is not None:
+			self.stream_writer.close()
+			self.stream_writer = None
+	
+
+	## load an aggregation from a stream file, replaying its placements and removals in order
+	## with count, the replay stops as soon as the aggregation holds count parts (removals are replayed, so count is not the number of part records read)
+	@classmethod
+	def from_stream(cls, file_path, count = None):
+		aggregation = None
+		parts_by_id = {}
+		
+		records = read_aggregation_stream(file_path)
+		try:
+			for record in records:
+				if record['type'] == 'header':
+					aggregation = cls.from_header_data(record)
+				
+				elif record['type'] == 'part':
+					parent_part = None
+					if record['parent'] is not None:
+						parent_part = parts_by_id[record['parent']]
+					part = aggregation.restore_placement(record['name'], transform_from_list(record['transform']), record['id'], parent_part, record['conn_on_parent'], record['conn_to_parent'])
+					parts_by_id[part.id] = part
+				
+				elif record['type'] == 'remove':
+					for part in aggregation.aggregated_parts[record['count']:]:
+						del parts_by_id[part.id]
+					aggregation.remove_elements(record['count'])
+				
+				if count is not None and len(aggregation.aggregated_parts) >= count:
+					break
+		finally:
+			records.close()
+		
+		## if using a field, recompute the whole aggregation queue
+		if aggregation.field is not None:
+			aggregation.recompute_aggregation_queue()
+		aggregation.reset_history()
+		aggregation.reset_open_sites()
+
+		return aggregation
+	
+
+	## enable periodic checkpoints while aggregating, every given number of placed parts and/or seconds
+	def set_checkpoints(self, file_path, every_parts = None, every_seconds = None):
+		self.checkpoint_path = file_path
+		self.checkpoint_parts = every_parts
+		self.checkpoint_seconds = every_seconds
+		self.last_checkpoint_size = len(self.aggregated_parts)
+		self.last_checkpoint_time = time.time()
+	
+
+	## save a checkpoint if enough parts were placed or enough time passed since the last one
+	def update_checkpoint(self):
+		if self.checkpoint_path is None:
+			return
+		due = False
+		if self.checkpoint_parts is not None and len(self.aggregated_parts) - self.last_checkpoint_size >= self.checkpoint_parts:
+			due = True
+		if self.checkpoint_seconds is not None and time.time() - self.last_checkpoint_time >= self.checkpoint_seconds:
+			due = True
+		if due:
+			self.save_checkpoint(self.checkpoint_path)
+			self.last_checkpoint_size = len(self.aggregated_parts)
+			self.last_checkpoint_time = time.time()
+	
+
+	## save the complete state of the aggregation (parts, active connections and rules, queue, catalog and random state) to a file
+	def save_checkpoint(self, file_path):
+		data = {}
+		data['type'] = 'checkpoint'
+		data['version'] = CHECKPOINT_VERSION
+		data['header'] = self.header_to_data()
+		data['prev_num'] = self.prev_num
+		
+		data['parts'] = []
+		for part in self.aggregated_parts:
+			part_data = {}
+			part_data['name'] = part.name
+			part_data['id'] = part.id
+			part_data['parent'] = getattr(part.parent, 'id', part.parent)
+			part_data['conn_on_parent'] = part.conn_on_parent
+			part_data['conn_to_parent'] = part.conn_to_parent
+			part_data['transform'] = transform_to_list(part.transformation)
+			part_data['active_connections'] = part.active_connections
+			part_data['active_rules'] = [conn.active_rules for conn in part.connections]
+			data['parts'].append(part_data)
+		
+		## queue items are stored with their insertion order, so that ties are resolved as in the original queue
+		data['queue_order'] = self.aggregation_queue.order
+		data['queue'] = []
+		for item in self.aggregation_queue.heap:
+			if item[3]:
+				entry = item[2]
+				data['queue'].append([item[0], item[1], entry[0], entry[1], transform_to_list(entry[2]), entry[3], entry[4]])
+		
+		## suspended placements, in the form [site_id, center, dim, 'rule', part_id, conn_id, rule_id] or [site_id, center, dim, 'queue', queue item]
+		data['failure_memo_next'] = self.failure_memo.next_id
+		data['failure_memo'] = []
+		for site_id in sorted(self.failure_memo.sites):
+			center, dim, site_data = self.failure_memo.sites[site_id]
+			site_record = [site_id, [center.X, center.Y, center.Z], dim, site_data[0]]
+			if site_data[0] == 'rule':
+				site_record.extend([site_data[1].id, site_data[2], site_data[3]])
+			else:
+				item = site_data[1]
+				entry = item[2]
+				site_record.append([item[0], item[1], entry[0], entry[1], transform_to_list(entry[2]), entry[3], entry[4]])
+			data['failure_memo'].append(site_record)
+		
+		## open sites are stored in their sampling order
+		self.check_open_sites()
+		data['open_sites'] = self.open_sites.to_data()
+		
+		data['catalog_state'] = None
+		if self.catalog is not None:
+			data['catalog_state'] = self.catalog.state_to_data()
+		
+		data['random_state'] = random.getstate()
+		
+		## write to a temporary file first, so that an interrupted save does not corrupt the previous checkpoint
+		temp_path = file_path + '.tmp'
+		with open(temp_path, 'w') as f:
+			json.dump(data, f)
+		replace_file(temp_path, file_path)
+	
+
+	## load an aggregation from a checkpoint file, restoring the state needed to continue it exactly as the original one
+	## if the file is missing or corrupt, the backup left by an interrupted save is loaded instead
+	@classmethod
+	def load_checkpoint(cls, file_path):
+		try:
+			with open(file_path, 'r') as f:
+				data = json.load(f)
+		except (IOError, OSError, ValueError):
+			if not os.path.exists(backup_path(file_path)):
+				raise
+			with open(backup_path(file_path), 'r') as f:
+				data = json.load(f)
+		
+		aggregation = cls.from_header_data(data['header'])
+		aggregation.prev_num = data['prev_num']
+		
+		parts_by_id = {}
+		for part_data in data['parts']:
+			parent_part = None
+			if part_data['parent'] is not None:
+				parent_part = parts_by_id[part_data['parent']]
+			part = aggregation.restore_placement(part_data['name'], transform_from_list(part_data['transform']), part_data['id'], parent_part, part_data['conn_on_parent'], part_data['conn_to_parent'])
+			parts_by_id[part.id] = part
+		
+		## active connections and rules are restored after all parts are placed (children deactivate connections on their parents)
+		for part, part_data in zip(aggregation.aggregated_parts, data['parts']):
+			part.active_connections = list(part_data['active_connections'])
+			for conn, active_rules in zip(part.connections, part_data['active_rules']):
+				conn.active_rules = list(active_rules)
+		
+		for item in data['queue']:
+			entry = (item[2], item[3], transform_from_list(item[4]), item[5], item[6])
+			aggregation.aggregation_queue.push_item([item[0], item[1], entry, True])
+		aggregation.aggregation_queue.order = data['queue_order']
+		
+		for site_record in data.get('failure_memo', []):
+			if site_record[3] == 'rule':
+				site_data = ('rule', parts_by_id[site_record[4]], site_record[5], site_record[6])
+			else:
+				item = site_record[4]
+				site_data = ('queue', [item[0], item[1], (item[2], item[3], transform_from_list(item[4]), item[5], item[6]), False])
+			aggregation.failure_memo.restore(site_record[0], (Point3d(*site_record[1]), site_record[2], site_data))
+		aggregation.failure_memo.next_id = data.get('failure_memo_next', 0)
+		
+		if 'open_sites' in data:
+			aggregation.open_sites = OpenSites.from_data(data['open_sites'])
+			aggregation.open_sites_count = len(aggregation.aggregated_parts)
+		else:
+			aggregation.reset_open_sites()
+		
+		if data['catalog_state'] is not None:
+			aggregation.catalog.state_from_data(data['catalog_state'])
+		
+		random_state = data['random_state']
+		random.setstate((random_state[0], tuple(random_state[1]), random_state[2]))
+		
+		aggregation.reset_history()
+		aggregation.set_checkpoints(None)
+		
+		return aggregation
+	
+
+	## add a base part placed with the given transformation, connected to an optional parent part (used when loading placements)
+	def restore_placement(self, part_name, trans, part_id, parent_part = None, conn_on_parent = None, conn_to_parent = None):
+		part = self.parts[part_name].transform(trans)
+		part.id = part_id
+		part.reset_part(self.rules, self.rules_tables)
+		self.graph.add_node(part.id)
+		
+		if parent_part is not None:
+			part.parent = parent_part.id
+			part.conn_on_parent = conn_on_parent
+			part.conn_to_parent = conn_to_parent
+			parent_part.children.append(part.id)
+			self.graph.add_edge(parent_part.id, part.id, conn_on_parent, conn_to_parent)
+			
+			## deactivate the connections used to connect the part to its parent
+			if conn_to_parent in part.active_connections:
+				part.active_connections.remove(conn_to_parent)
+			self.deactivate_connection(parent_part, conn_on_parent)
+		
+		self.append_part(part)
+		return part
+	
+
+	## add a part at the end of the aggregation, updating the part indexes, the spatial index and the stream writer (if any)
+	def append_part(self, part):
+		self.aggregated_parts.append(part)
+		index = len(self.aggregated_parts)-1
+		self.part_indexes[part.id] = index
+		self.spatial_index.add(index, part.center, part.dim)
+		if self.open_sites_count == index:
+			for conn_id in part.active_connections:
+				self.add_open_sites(index, conn_id)
+			self.open_sites_count += 1
+		if self.stream_writer is not None:
+			self.stream_writer.write_part(part)
+	
+
+	## rebuild the index of the aggregated parts by part id
+	def reset_part_indexes(self):
+		self.part_indexes = {}
+		for i in xrange(len(self.aggregated_parts)):
+			self.part_indexes[self.aggregated_parts[i].id] = i
+	
+
+	## return the index in the aggregated parts list of the part with the given id (None if not found)
+	## the index is rebuilt if it does not match the list (e.g. if the aggregated parts list was edited externally)
+	def return_part_index(self, part_id):
+		index = self.part_indexes.get(part_id)
+		if index is None or index >= len(self.aggregated_parts) or self.aggregated_parts[index].id != part_id:
+			self.reset_part_indexes()
+			index = self.part_indexes.get(part_id)
+		return index
+	
+
+	## return an id for a new part, not used by the aggregated parts (the parts count, if ids follow the list order)
+	def return_next_part_id(self):
+		part_id = len(self.aggregated_parts)
+		while part_id in self.part_indexes:
+			part_id += 1
+		return part_id
+	
+
+	## return the world-aligned bounding box of the aggregated parts (from the transformed bounding boxes of the base parts)
+	def return_bounding_box(self):
+		base_corners = {}
+		corners = []
+		for part in self.aggregated_parts:
+			if part.name not in base_corners:
+				base_corners[part.name] = self.parts[part.name].geo.GetBoundingBox(True).GetCorners()
+			for corner in base_corners[part.name]:
+				corner_trans = Point3d(corner)
+				corner_trans.Transform(part.transformation)
+				corners.append(corner_trans)
+		return BoundingBox(corners)
 	
 
 	## reset base parts
@@ -212,8 +696,43 @@ class Aggregation(object):
 			for part in new_parts:
 				self.parts[part.name] = part
 		
+		## rules grouped by part name and connection id, shared by all parts
+		self.rules_tables = generate_rules_tables(self.rules)
+		
 		for p_key in self.parts:
-			self.parts[p_key].reset_part(self.rules)
+			self.parts[p_key].reset_part(self.rules, self.rules_tables)
+		
+		self.reset_rule_transforms()
+
+
+	## precompute the relative transformation between connected base parts for each rule
+	def reset_rule_transforms(self):
+		self.rule_transforms = {}
+		for rule in self.rules:
+			if rule.part1 in self.parts and rule.part2 in self.parts:
+				self.return_rule_transform(rule.part1, rule.conn1, rule.part2, rule.conn2)
+
+
+	## return the transformation placing base part2 on connection conn1 of base part1 (computed once for each rule)
+	def return_rule_transform(self, part1, conn1, part2, conn2):
+		key = (part1, conn1, part2, conn2)
+		if key not in self.rule_transforms:
+			self.rule_transforms[key] = Transform.PlaneToPlane(self.parts[part2].connections[conn2].flip_pln, self.parts[part1].connections[conn1].pln)
+		return self.rule_transforms[key]
+
+
+	## return the transformation placing base part2 on connection conn1 of an aggregated part
+	def return_child_transform(self, part, conn1, part2, conn2):
+		return Transform.Multiply(part.transformation, self.return_rule_transform(part.name, conn1, part2, conn2))
+
+
+	## rebuild the spatial index from the current aggregated parts
+	def reset_spatial_index(self):
+		max_dim = 0.0
+		for part in self.parts.values():
+			if part.dim > max_dim:
+				max_dim = part.dim
+		self.spatial_index = SpatialGrid.from_parts(self.aggregated_parts, cell_size = max_dim*2)
 
 
 	## reset rules and regenerate rule tables for each part
@@ -223,23 +742,153 @@ class Aggregation(object):
 			self.reset_base_parts()
 			
 			for part in self.aggregated_parts:
-				part.reset_part(rules)
+				part.reset_part(rules, self.rules_tables)
+			self.failure_memo.clear()
+			self.reset_history()
+			self.reset_open_sites()
 	
 
 	## recompute aggregation queue
 	def recompute_aggregation_queue(self):
-		self.aggregation_queue = []
-		self.queue_values = []
-		self.queue_count = 0
-		for part in self.aggregated_parts:
-			self.compute_next_w_field(part)
+		self.aggregation_queue.clear()
+		self.failure_memo.clear()
+		self.compute_next_w_field_batch(self.aggregated_parts)
+		self.reset_history()
+	
+
+	## clear the changes log (changes made before the current size cannot be undone anymore)
+	def reset_history(self):
+		self.history = []
+		self.history_start = len(self.aggregated_parts)
+	
+
+	## deactivate a connection of an aggregated part, logging the change
+	def deactivate_connection(self, part, conn_id):
+		for i in range(len(part.active_connections)):
+			if part.active_connections[i] == conn_id:
+				part.active_connections.pop(i)
+				self.history.append(('conn', len(self.aggregated_parts), part, conn_id, i))
+				self.remove_open_sites(self.return_part_index(part.id), conn_id, part.connections[conn_id].active_rules)
+				break
+	
+
+	## deactivate a rule of a connection of an aggregated part, logging the change
+	def deactivate_rule(self, part, conn_id, rule_id):
+		conn = part.connections[conn_id]
+		for i in range(len(conn.active_rules)):
+			if conn.active_rules[i] == rule_id:
+				conn.active_rules.pop(i)
+				self.history.append(('rule', len(self.aggregated_parts), part, conn_id, i, rule_id))
+				self.remove_open_sites(self.return_part_index(part.id), conn_id, [rule_id])
+				break
+	
+
+	## remove the best item from the aggregation queue (optionally for a given part name), logging the change
+	def pop_queue_item(self, part_name=None):
+		item = self.aggregation_queue.pop_item(part_name)
+		if item is not None:
+			self.history.append(('queue', len(self.aggregated_parts), item))
+		return item
+	
+
+	## rebuild the open sites from the active connections of the aggregated parts
+	def reset_open_sites(self):
+		self.open_sites.clear()
+		for part_index in xrange(len(self.aggregated_parts)):
+			for conn_id in self.aggregated_parts[part_index].active_connections:
+				self.add_open_sites(part_index, conn_id)
+		self.open_sites_count = len(self.aggregated_parts)
+	
+
+	## rebuild the open sites if the aggregated parts list was edited externally (e.g. by the Remove Parts component), as sites refer to parts by index
+	def check_open_sites(self):
+		if self.open_sites_count != len(self.aggregated_parts):
+			self.reset_open_sites()
+	
+
+	## add the active rules of a connection of an aggregated part (given its index in the aggregated parts list) to the open sites
+	def add_open_sites(self, part_index, conn_id):
+		rules_table, active_rules = self.aggregated_parts[part_index].return_connection_rules(conn_id)
+		for rule_id in active_rules:
+			self.open_sites.add((part_index, conn_id, rule_id), rules_table[rule_id].part2)
+	
+
+	## remove the given rules of a connection of an aggregated part (given its index in the aggregated parts list) from the open sites
+	def remove_open_sites(self, part_index, conn_id, rule_ids):
+		for rule_id in rule_ids:
+			self.open_sites.remove((part_index, conn_id, rule_id))
+	
+
+	## check if a site is still open (active rule of an active connection)
+	def is_open_site(self, site):
+		part_index, conn_id, rule_id = site
+		if part_index >= len(self.aggregated_parts):
+			return False
+		part = self.aggregated_parts[part_index]
+		return conn_id in part.active_connections and rule_id in part.connections[conn_id].active_rules
+	
+
+	## return a random open site (optionally placing a given part), discarding the sites closed since they were added (None if no site is open)
+	def sample_open_site(self, part_name = None):
+		while self.open_sites.count(part_name) > 0:
+			site = self.open_sites.sample(part_name)
+			if self.is_open_site(site):
+				return site
+			self.open_sites.remove(site)
+		return None
+	
+
+	## check if a connection of an aggregated part is used to connect it to its parent or to a child
+	def is_connection_used(self, part, conn_id):
+		if part.parent is not None and part.conn_to_parent == conn_id:
+			return True
+		for edge_index in self.graph.get_out_edges(part.id):
+			if self.graph.edge_conn_start[edge_index] == conn_id:
+				return True
+		return False
+	
+
+	## store a placement rejected only for missing supports or adjacencies in the failure memo, logging the change
+	## data is ('rule', part, conn_id, rule_id) for deactivated rules, or ('queue', item) for removed queue items
+	def suspend_failure(self, part, trans, data):
+		site_id = self.failure_memo.add(part.transform_center(trans), part.dim, data)
+		self.history.append(('suspend', len(self.aggregated_parts), site_id))
+	
+
+	## reactivate the suspended placements within reach of the last placed part, logging the changes (undone when removing the part)
+	def release_failures(self, part):
+		size = len(self.aggregated_parts) - 1
+		for site_id, site in self.failure_memo.release(part.center, part.dim):
+			self.history.append(('release', size, site_id, site))
+			data = site[2]
+			if data[0] == 'rule':
+				parent, conn_id, rule_id = data[1:]
+				conn = parent.connections[conn_id]
+				## connections used in the meantime stay inactive
+				if rule_id not in conn.active_rules and not self.is_connection_used(parent, conn_id):
+					conn.active_rules.append(rule_id)
+					self.history.append(('rule_on', size, parent, conn_id, rule_id))
+					if conn_id not in parent.active_connections:
+						parent.active_connections.append(conn_id)
+						self.history.append(('conn_on', size, parent, conn_id))
+					parent_index = self.return_part_index(parent.id)
+					if parent_index is not None:
+						self.add_open_sites(parent_index, conn_id)
+			elif data[0] == 'queue':
+				self.aggregation_queue.push_item(data[1])
+				self.history.append(('queue_on', size, data[1][2]))
 	
 
 	## trim aggregated parts list to a specific length
 	def remove_elements(self, num):
 
+		## open sites not matching the aggregated parts are rebuilt after the trim
+		open_sites_valid = self.open_sites_count == len(self.aggregated_parts)
 		self.removed_parts = self.aggregated_parts[num:]
+		removed_ids = set()
 		for p in self.removed_parts:
+			removed_ids.add(p.id)
+			self.part_indexes.pop(p.id, None)
 			## remove item from graph
 			self.graph.remove_node(p.id)
 
@@ -249,14 +898,72 @@ class Aggregation(object):
 
 		## trim the list to the desired length
 		self.aggregated_parts = self.aggregated_parts[:num]
+		self.spatial_index.trim(num)
+		if self.stream_writer is not None:
+			self.stream_writer.write_remove(num)
 
-		## reset the remaining parts (reactivate all connections, who might have been blocked by removed parts)
-		for part in self.aggregated_parts:
-			part.reset_part(self.rules)
+		## changes before the requested size are not logged, reset all parts and recompute the whole queue
+		if num < self.history_start:
+			## reset the remaining parts (reactivate all connections, who might have been blocked by removed parts)
+			for part in self.aggregated_parts:
+				part.reset_part(self.rules, self.rules_tables)
+			self.failure_memo.clear()
+			
+			## if using a field, recompute the whole aggregation queue
+			if self.field is not None:
+				self.recompute_aggregation_queue()
+			self.reset_history()
+			self.reset_open_sites()
 		
-		## if using a field, recompute the whole aggregation queue
-		if self.field is not None:
-			self.recompute_aggregation_queue()
+		## undo all changes made after the aggregation reached the requested size
+		else:
+			while len(self.history) > 0 and self.history[-1][1] >= num:
+				change = self.history.pop()
+				if change[0] == 'conn':
+					if change[2].id not in removed_ids:
+						change[2].active_connections.insert(change[4], change[3])
+						self.add_open_sites(self.return_part_index(change[2].id), change[3])
+				elif change[0] == 'rule':
+					if change[2].id not in removed_ids:
+						conn = change[2].connections[change[3]]
+						conn.active_rules.insert(change[4], change[5])
+						if change[3] in change[2].active_connections:
+							self.open_sites.add((self.return_part_index(change[2].id), change[3], change[5]), conn.rules_table[change[5]].part2)
+				elif change[0] == 'queue':
+					## re-insert candidates consumed after the requested size, unless their parent was removed
+					if change[2][2][1] not in removed_ids:
+						self.aggregation_queue.push_item(change[2])
+				elif change[0] == 'suspend':
+					self.failure_memo.remove(change[2])
+				elif change[0] == 'release':
+					self.failure_memo.restore(change[2], change[3])
+				elif change[0] == 'rule_on':
+					if change[2].id not in removed_ids:
+						change[2].connections[change[3]].active_rules.remove(change[4])
+						self.remove_open_sites(self.return_part_index(change[2].id), change[3], [change[4]])
+				elif change[0] == 'conn_on':
+					if change[2].id not in removed_ids:
+						change[2].active_connections.remove(change[3])
+						self.remove_open_sites(self.return_part_index(change[2].id), change[3], change[2].connections[change[3]].active_rules)
+				elif change[0] == 'queue_on':
+					## the entry might have been popped and re-inserted meanwhile, so it is found by identity
+					self.aggregation_queue.remove_entry(change[2])
+			
+			## drop candidates generated by the removed parts
+			if self.field is not None:
+				for part_id in removed_ids:
+					self.aggregation_queue.remove_parent(part_id)
+			
+			## drop the open sites of the removed parts (the sites of the remaining parts were restored with their rules)
+			for i in xrange(len(self.removed_parts)):
+				part = self.removed_parts[i]
+				for conn_id in xrange(len(part.connections)):
+					self.remove_open_sites(num + i, conn_id, xrange(len(part.connections[conn_id].rules_table)))
+			
+			if open_sites_valid:
+				self.open_sites_count = len(self.aggregated_parts)
+			else:
+				self.reset_open_sites()
 	
 
 	## compute all possible parts which can be placed given an existing part and connection
@@ -271,7 +978,7 @@ class Aggregation(object):
 				rule = current_conn.rules_table[rule_id]
 				
 				next_part = self.parts[rule.part2]
-				orientTransform = Transform.PlaneToPlane(next_part.connections[rule.conn2].flip_pln, current_conn.pln)
+				orientTransform = self.return_child_transform(current_part, rule.conn1, rule.part2, rule.conn2)
 				
 				## boolean checks for all constraints
 				coll_check = False
@@ -317,17 +1024,13 @@ class Aggregation(object):
 	
 	## add a custom pre-computed part which has been already transformed in place and checked for constraints
 	def add_custom_part(self, part_id, conn_id, next_part):
-		next_part.reset_part(self.rules)
-		next_part.id = len(self.aggregated_parts)
+		next_part.reset_part(self.rules, self.rules_tables)
+		next_part.id = self.return_next_part_id()
 		
 		self.aggregated_parts[part_id].children.append(next_part)
 		next_part.parent = self.aggregated_parts[part_id]
-		self.aggregated_parts.append(next_part)
-		
-		for i in range(len(self.aggregated_parts[part_id].active_connections)):
-			if self.aggregated_parts[part_id].active_connections[i] == conn_id:
-				self.aggregated_parts[part_id].active_connections.pop(i)
-				break
+		self.deactivate_connection(self.aggregated_parts[part_id], conn_id)
+		self.append_part(next_part)
 
 	
 	#### constraints checks ####
@@ -386,9 +1089,28 @@ class Aggregation(object):
 
 		## combine all constraints check result
 		global_check = coll_check or add_coll_check or missing_sup_check or global_const_check or adjacencies_check or orientation_check
+		
+		## count rejections by cause
+		if coll_check:
+			self.rejections['collision'] += 1
+		elif global_const_check:
+			self.rejections['global_constraints'] += 1
+		elif add_coll_check:
+			self.rejections['additional_collider'] += 1
+		elif missing_sup_check:
+			self.rejections['missing_supports'] += 1
+		elif adjacencies_check:
+			self.rejections['adjacencies'] += 1
+		elif orientation_check:
+			self.rejections['orientation'] += 1
 
 		return global_check, coll_check, add_coll_check, missing_sup_check, global_const_check, adjacencies_check, orientation_check
 
+
+	## check if a placement was rejected only for missing supports or adjacencies (which parts placed later can satisfy)
+	def is_transient_rejection(self, checks):
+		return checks[3] or checks[5]
+
 	
 	## overlap // part-part collision check
 	def collision_check(self, part, trans, part_center=None, part_collider=None):
@@ -397,15 +1119,18 @@ class Aggregation(object):
 		if part_center is None:
 			part_center = part.transform_center(trans)
 		
-		## overlap check
-		coll_count = 0
-		for ex_part in self.aggregated_parts:
+		## rebuild the spatial index if the aggregated parts list was edited externally
+		if self.spatial_index.count != len(self.aggregated_parts):
+			self.reset_spatial_index()
+		
+		## overlap check (only on parts close enough according to the spatial index)
+		for ex_id in self.spatial_index.query_part(part_center, part.dim):
+			ex_part = self.aggregated_parts[ex_id]
 			dist = ex_part.center.DistanceTo(part_center)
 			if dist < global_tolerance:
 				return True, None, None
 			elif dist < ex_part.dim + part.dim:
-				self.possible_collisions.append(coll_count)
-			coll_count += 1
+				self.possible_collisions.append(ex_id)
 		
 		## collision check
 		if self.coll_check == True:
@@ -500,19 +1225,50 @@ class Aggregation(object):
 	def check_all_connections(self):
 		for part in self.aggregated_parts:
 			if len(part.active_connections) > 0:
-				for conn_id in part.active_connections:
+				for conn_id in list(part.active_connections):
 					conn = part.connections[conn_id]
 					if len(conn.active_rules) > 0:
-						for rule_id in conn.active_rules:
+						for rule_id in list(conn.active_rules):
 							next_rule = conn.rules_table[rule_id]
 
 							next_part = self.parts[next_rule.part2]
-							orientTransform = Transform.PlaneToPlane(next_part.connections[next_rule.conn2].flip_pln, conn.pln)
+							orientTransform = self.return_child_transform(part, next_rule.conn1, next_rule.part2, next_rule.conn2)
 							coll_check, _, _ = self.collision_check(next_part, orientTransform)
 							if coll_check:
-								conn.active_rules.remove(rule_id)
+								self.deactivate_rule(part, conn_id, rule_id)
 								if len(conn.active_rules) == 0: 
-									part.active_connections.remove(conn_id)
+									self.deactivate_connection(part, conn_id)
+	
+
+	## re-test the open connections of the parts overlapping the last placed part, deactivating the rules colliding with it
+	## (rules are not checked against other parts, as their collisions are found when sampled)
+	def sweep_blocked_connections(self, new_part):
+		new_id = len(self.aggregated_parts) - 1
+		for part_id in self.spatial_index.query_part(new_part.center, new_part.dim):
+			part = self.aggregated_parts[part_id]
+			if part_id == new_id or part.center.DistanceTo(new_part.center) >= part.dim + new_part.dim:
+				continue
+			for conn_id in list(part.active_connections):
+				conn = part.connections[conn_id]
+				for rule_id in list(conn.active_rules):
+					rule = conn.rules_table[rule_id]
+					next_part = self.parts[rule.part2]
+					orientTransform = self.return_child_transform(part, rule.conn1, rule.part2, rule.conn2)
+					if self.check_collision_w_part(next_part, orientTransform, new_id):
+						self.deactivate_rule(part, conn_id, rule_id)
+				if len(conn.active_rules) == 0:
+					self.deactivate_connection(part, conn_id)
+	
+
+	## check if a part placed with the given transformation overlaps or collides with a single aggregated part
+	def check_collision_w_part(self, part, trans, part_id):
+		ex_part = self.aggregated_parts[part_id]
+		dist = ex_part.center.DistanceTo(part.transform_center(trans))
+		if dist < global_tolerance:
+			return True
+		if self.coll_check and dist < ex_part.dim + part.dim:
+			return part.transform_collider(trans).check_collisions_by_id(self.aggregated_parts, [part_id])
+		return False
 	
 
 	## check all connections of a given part for occlusion from other parts
@@ -561,7 +1317,7 @@ class Aggregation(object):
 				
 				next_part = self.parts[part2]
 				
-				orientTransform = Transform.PlaneToPlane(next_part.connections[conn2].flip_pln, first_part.connections[conn1].pln)
+				orientTransform = self.return_rule_transform(part1, conn1, part2, conn2)
 				
 				next_part_trans = next_part.transform(orientTransform)
 
@@ -574,8 +1330,8 @@ class Aggregation(object):
 				first_part_trans.children.append(next_part_trans)
 				next_part_trans.parent = first_part_trans
 				
-				self.aggregated_parts.append(first_part_trans)
-				self.aggregated_parts.append(next_part_trans)
+				self.append_part(first_part_trans)
+				self.append_part(next_part_trans)
 				
 				first_part_trans.children.append(next_part_trans)
 
@@ -617,7 +1373,7 @@ class Aggregation(object):
 					first_part.id = rule_ids[0]
 					next_part = self.parts[part2]
 					
-					orientTransform = Transform.PlaneToPlane(next_part.connections[conn2].flip_pln, first_part.connections[conn1].pln)
+					orientTransform = self.return_child_transform(first_part, conn1, part2, conn2)
 					next_part_trans = next_part.transform(orientTransform)
 					next_part_trans.id = rule_ids[1]
 
@@ -628,7 +1384,7 @@ class Aggregation(object):
 					next_part_trans.conn_to_parent = conn2
 
 					## add part to aggregated_parts list
-					self.aggregated_parts.append(next_part_trans)
+					self.append_part(next_part_trans)
 
 					## add data to graph
 					self.graph.add_node(next_part_trans.id)
@@ -643,6 +1399,7 @@ class Aggregation(object):
 	
 	## stochastic aggregation
 	def aggregate_rnd(self, num, use_catalog = False):
+		self.check_open_sites()
 		added = 0
 		loops = 0
 		while added < num:
@@ -658,154 +1415,177 @@ class Aggregation(object):
 				if use_catalog:
 					first_part = self.parts[self.catalog.return_weighted_part()]
 				else:
-					first_part = self.parts[random.choice(self.parts.keys())]		
+					first_part = self.parts[random.choice(list(self.parts.keys()))]		
 
 				if first_part is not None:
 					first_part_trans = first_part.transform(Transform.Identity)
 					for conn in first_part_trans.connections:
-						conn.generate_rules_table(self.rules)
+						conn.generate_rules_table(self.rules, self.rules_tables)
 					
 					first_part_trans.id = 0
-					self.aggregated_parts.append(first_part_trans)
+					self.append_part(first_part_trans)
 
 					## add data to graph
 					self.graph.add_node(first_part_trans.id)
 
 					added += 1
+					self.update_checkpoint()
 					if use_catalog:
 						self.catalog.update(first_part_trans.name, -1)
 			
 			## otherwise add new random part
 			else:
-				next_rule = None
-				part_01_id = -1
-				conn_01_id = -1
-				next_rule_id = -1
-				new_rule_attempts = 0
-				
-				while new_rule_attempts < 10000:
-					new_rule_attempts += 1
-					next_rule = None
-					if use_catalog:
-						if self.catalog.is_limited and self.catalog.is_empty:
-							break
-						next_part = self.parts[self.catalog.return_weighted_part()]
-						if next_part is not None:
-							part_01_id = random.randint(0,len(self.aggregated_parts)-1)
-							part_01 = self.aggregated_parts[part_01_id]
-							if len(part_01.active_connections) > 0:
-								conn_01_id = part_01.active_connections[random.randint(0, len(part_01.active_connections)-1)]
-								conn_01 = part_01.connections[conn_01_id]
-								if len(conn_01.active_rules) > 0:
-									next_rule_id = conn_01.active_rules[random.randint(0, len(conn_01.active_rules)-1)]
-									next_rule = conn_01.rules_table[next_rule_id]
-									if next_rule.part2 == next_part.name:
-										break
-					else:
-						part_01_id = random.randint(0,len(self.aggregated_parts)-1)
-						part_01 = self.aggregated_parts[part_01_id]
-						if len(part_01.active_connections) > 0:
-							conn_01_id = part_01.active_connections[random.randint(0, len(part_01.active_connections)-1)]
-							conn_01 = part_01.connections[conn_01_id]
-							if len(conn_01.active_rules) > 0:
-								next_rule_id = conn_01.active_rules[random.randint(0, len(conn_01.active_rules)-1)]
-								next_rule = conn_01.rules_table[next_rule_id]
-								break
-				
-				if next_rule is not None:
-					next_part = self.parts[next_rule.part2]
-					orientTransform = Transform.PlaneToPlane(next_part.connections[next_rule.conn2].flip_pln, conn_01.pln)
-					
-					global_check, coll_check, add_coll_check, missing_sup_check, global_const_check, adjacencies_check, orientation_check = self.check_all_constraints(next_part, orientTransform)
-					
-					if not global_check:
-						next_part_trans = next_part.transform(orientTransform)
-						next_part_trans.reset_part(self.rules)
-						for i in range(len(next_part_trans.active_connections)):
-							if next_part_trans.active_connections[i] == next_rule.conn2:
-								next_part_trans.active_connections.pop(i)
-								break
-						next_part_trans.id = len(self.aggregated_parts)
-						
-						## parent-child tracking
-						self.aggregated_parts[part_01_id].children.append(next_part_trans.id)
-						next_part_trans.parent = self.aggregated_parts[part_01_id].id
-						next_part_trans.conn_on_parent = next_rule.conn1
-						next_part_trans.conn_to_parent = next_rule.conn2
-						
-						## add part to aggregated_parts list
-						self.aggregated_parts.append(next_part_trans)
-
-						## add data to graph
-						self.graph.add_node(next_part_trans.id)
-						self.graph.add_edge(part_01_id, next_part_trans.id, next_rule.conn1, next_rule.conn2)
-
-						## update catalog if using one
-						if use_catalog:
-							self.catalog.update(next_part_trans.name, -1)
-						
-						for i in range(len(self.aggregated_parts[part_01_id].active_connections)):
-							if self.aggregated_parts[part_01_id].active_connections[i] == conn_01_id:
-								self.aggregated_parts[part_01_id].active_connections.pop(i)
-								break
-						added += 1
-					## TO FIX --> do not remove rules when only caused by missing supports
-					else:
-						## remove rules if they cause collisions or overlappings
-						for i in range(len(self.aggregated_parts[part_01_id].connections[conn_01_id].active_rules)):
-							if self.aggregated_parts[part_01_id].connections[conn_01_id].active_rules[i] == next_rule_id:
-								self.aggregated_parts[part_01_id].connections[conn_01_id].active_rules.pop(i)
-								break
-						## check if the connection is still active (still active rules available)
-						if len(self.aggregated_parts[part_01_id].connections[conn_01_id].active_rules) == 0:
-							for i in range(len(self.aggregated_parts[part_01_id].active_connections)):
-								if self.aggregated_parts[part_01_id].active_connections[i] == conn_01_id:
-									self.aggregated_parts[part_01_id].active_connections.pop(i)
-									break
-				else:
+				candidate = self.sample_rnd_candidate(use_catalog)
+				if candidate is None:
 					## if no part is available, exit the aggregation routine and return an error message
 					msg = "Could not place " + str(num-added) + " parts"
 					return msg
+				
+				checks, orientTransform = self.check_rnd_candidate(candidate)
+				if not checks[0]:
+					self.place_rnd_candidate(candidate, orientTransform, use_catalog)
+					added += 1
+					self.update_checkpoint()
+				else:
+					self.reject_rnd_candidate(candidate, checks, orientTransform)
+	
+
+	## sample a random placement (aggregated part id, connection id, rule id, rule) on the open sites, or return None if none is available
+	def sample_rnd_candidate(self, use_catalog = False):
+		site = None
+		if use_catalog:
+			## draw parts from the catalog until one can be placed on an open site
+			new_rule_attempts = 0
+			while new_rule_attempts < 10000 and len(self.open_sites) > 0:
+				new_rule_attempts += 1
+				if self.catalog.is_limited and self.catalog.is_empty:
+					break
+				next_part_name = self.catalog.return_weighted_part()
+				if next_part_name is not None:
+					site = self.sample_open_site(next_part_name)
+					if site is not None:
+						break
+		else:
+			site = self.sample_open_site()
+		
+		if site is None:
+			return None
+		part_01_id, conn_01_id, next_rule_id = site
+		next_rule = self.aggregated_parts[part_01_id].connections[conn_01_id].rules_table[next_rule_id]
+		return (part_01_id, conn_01_id, next_rule_id, next_rule)
+	
+
+	## check all constraints for a sampled placement, returning the checks results and the placement transformation
+	def check_rnd_candidate(self, candidate):
+		part_01_id, conn_01_id, next_rule_id, next_rule = candidate
+		next_part = self.parts[next_rule.part2]
+		orientTransform = self.return_child_transform(self.aggregated_parts[part_01_id], next_rule.conn1, next_rule.part2, next_rule.conn2)
+		return self.check_all_constraints(next_part, orientTransform), orientTransform
+	
+
+	## add a sampled placement to the aggregation
+	def place_rnd_candidate(self, candidate, orientTransform, use_catalog = False):
+		part_01_id, conn_01_id, next_rule_id, next_rule = candidate
+		next_part = self.parts[next_rule.part2]
+		next_part_trans = next_part.transform(orientTransform)
+		next_part_trans.reset_part(self.rules, self.rules_tables)
+		for i in range(len(next_part_trans.active_connections)):
+			if next_part_trans.active_connections[i] == next_rule.conn2:
+				next_part_trans.active_connections.pop(i)
+				break
+		next_part_trans.id = self.return_next_part_id()
+		
+		## parent-child tracking
+		self.aggregated_parts[part_01_id].children.append(next_part_trans.id)
+		next_part_trans.parent = self.aggregated_parts[part_01_id].id
+		next_part_trans.conn_on_parent = next_rule.conn1
+		next_part_trans.conn_to_parent = next_rule.conn2
+		
+		## deactivate the used connection on the parent (before adding the part, so that the change is undone when removing it)
+		self.deactivate_connection(self.aggregated_parts[part_01_id], conn_01_id)
+		
+		## add part to aggregated_parts list
+		self.append_part(next_part_trans)
+
+		## add data to graph
+		self.graph.add_node(next_part_trans.id)
+		self.graph.add_edge(next_part_trans.parent, next_part_trans.id, next_rule.conn1, next_rule.conn2)
+
+		## reconsider placements rejected for missing supports or adjacencies around the new part
+		self.release_failures(next_part_trans)
+		
+		## prune the rules of nearby connections blocked by the new part
+		if self.sweep_connections:
+			self.sweep_blocked_connections(next_part_trans)
+
+		## update catalog if using one
+		if use_catalog:
+			self.catalog.update(next_part_trans.name, -1)
+	
+
+	## remove the rule of a rejected placement (and its connection, if no active rules are left)
+	def reject_rnd_candidate(self, candidate, checks, orientTransform):
+		part_01_id, conn_01_id, next_rule_id, next_rule = candidate
+		## remove rules if they cause collisions or overlappings (until a part is placed nearby, if caused by missing supports or adjacencies)
+		self.deactivate_rule(self.aggregated_parts[part_01_id], conn_01_id, next_rule_id)
+		if self.is_transient_rejection(checks):
+			self.suspend_failure(self.parts[next_rule.part2], orientTransform, ('rule', self.aggregated_parts[part_01_id], conn_01_id, next_rule_id))
+		## check if the connection is still active (still active rules available)
+		if len(self.aggregated_parts[part_01_id].connections[conn_01_id].active_rules) == 0:
+			self.deactivate_connection(self.aggregated_parts[part_01_id], conn_01_id)
 	
 	
 	## compute all possibilities for child-parts of the given part, and store them in the aggregation queue
 	def compute_next_w_field(self, part):
+		self.compute_next_w_field_batch([part])
+	
+
+	## compute all possibilities for child-parts of the given parts, evaluating all candidates against the field(s) at once
+	def compute_next_w_field_batch(self, parts):
 		
-		for i in xrange(len(part.active_connections)-1, -1, -1):
-			conn_id = part.active_connections[i]
-			conn = part.connections[conn_id]
-			for i2 in xrange(len(conn.active_rules)-1, -1, -1):
-				rule_id = conn.active_rules[i2]
-				rule = conn.rules_table[rule_id]
-				
-				next_part = self.parts[rule.part2]
-				
-				next_center = Point3d(next_part.center)
-				orientTransform = Transform.PlaneToPlane(next_part.connections[rule.conn2].flip_pln, conn.pln)
-				next_center.Transform(orientTransform)
-				
-				if self.multiple_fields:
-					f_name = next_part.field
-					if self.field[f_name].bbox.Contains(next_center) == True:
-						field_val = self.field[f_name].return_pt_val(next_center)
-						
-						queue_index = bisect.bisect_left(self.queue_values, field_val)
-						queue_entry = (next_part.name, part.id, orientTransform, rule.conn1, rule.conn2)
-						
-						self.queue_values.insert(queue_index, field_val)
-						self.aggregation_queue.insert(queue_index, queue_entry)
-						self.queue_count += 1
+		## gather all candidate placements and their centers
+		candidates = []
+		candidates_centers = {}
+		for part in parts:
+			for i in xrange(len(part.active_connections)-1, -1, -1):
+				conn_id = part.active_connections[i]
+				conn = part.connections[conn_id]
+				for i2 in xrange(len(conn.active_rules)-1, -1, -1):
+					rule_id = conn.active_rules[i2]
+					rule = conn.rules_table[rule_id]
 					
-				else:
-					if self.field.bbox.Contains(next_center) == True:
-						field_val = self.field.return_pt_val(next_center)
-						
-						queue_index = bisect.bisect_left(self.queue_values, field_val)
-						queue_entry = (next_part.name, part.id, orientTransform, rule.conn1, rule.conn2)
-						
-						self.queue_values.insert(queue_index, field_val)
-						self.aggregation_queue.insert(queue_index, queue_entry)
-						self.queue_count += 1
+					next_part = self.parts[rule.part2]
+					
+					next_center = Point3d(next_part.center)
+					orientTransform = self.return_child_transform(part, rule.conn1, rule.part2, rule.conn2)
+					next_center.Transform(orientTransform)
+					
+					f_name = None
+					if self.multiple_fields:
+						f_name = next_part.field
+					if f_name not in candidates_centers:
+						candidates_centers[f_name] = []
+					candidates.append((f_name, len(candidates_centers[f_name]), (next_part.name, part.id, orientTransform, rule.conn1, rule.conn2)))
+					candidates_centers[f_name].append(next_center)
+		
+		## filter candidates against each field box and sample the field values
+		candidates_values = {}
+		for f_name in candidates_centers:
+			if self.multiple_fields:
+				field = self.field[f_name]
+			else:
+				field = self.field
+			centers = candidates_centers[f_name]
+			inside = field.return_pts_inside(centers)
+			values = field.return_pts_val([centers[i] for i in xrange(len(centers)) if inside[i]])
+			values_iter = iter(values)
+			candidates_values[f_name] = [next(values_iter) if inside[i] else None for i in xrange(len(centers))]
+		
+		## add valid candidates to the queue (in the same order they were generated)
+		for f_name, center_id, queue_entry in candidates:
+			field_val = candidates_values[f_name][center_id]
+			if field_val is not None:
+				self.aggregation_queue.push(field_val, queue_entry)
 	
 	
 	## field-driven aggregation
@@ -827,7 +1607,7 @@ class Aggregation(object):
 				if use_catalog:
 					first_part = self.parts[self.catalog.return_weighted_part()]
 				else:
-					first_part = self.parts[random.choice(self.parts.keys())]
+					first_part = self.parts[random.choice(list(self.parts.keys()))]
 				
 				if first_part is not None:
 					start_point = None
@@ -850,10 +1630,10 @@ class Aggregation(object):
 					first_part_trans = first_part.transform(first_transform)
 					
 					for conn in first_part_trans.connections:
-						conn.generate_rules_table(self.rules)
+						conn.generate_rules_table(self.rules, self.rules_tables)
 					
 					first_part_trans.id = 0
-					self.aggregated_parts.append(first_part_trans)
+					self.append_part(first_part_trans)
 
 					## add data to graph
 					self.graph.add_node(first_part_trans.id)
@@ -865,15 +1645,16 @@ class Aggregation(object):
 					## compute all possible next parts and append to list
 					self.compute_next_w_field(first_part_trans)
 					added += 1
+					self.update_checkpoint()
 			
 			else:
 				## if no part is available, exit the aggregation routine and return an error message
-				if self.queue_count == 0:
+				if self.aggregation_queue.count == 0:
 					msg = "Could not place " + str(num-added) + " parts"
 					return msg
 				
 				next_data = None
-				next_data_id = -1
+				next_part_name = None
 				next_part = None
 				next_center = None
 				orientTransform = None
@@ -885,53 +1666,59 @@ class Aggregation(object):
 						msg = "Could not place " + str(num-added) + " parts. Part Catalog is empty."
 						return msg
 					else:
-						next_part_id = None
 						next_part_attempts = 0
-						###### WIP, could be optimized using a set with all names of parts in the queue
 						while next_part_attempts < 1000:
 							next_part_attempts += 1
-							next_part_id = self.catalog.return_weighted_part()
-							for i in range(self.queue_count-1, -1, -1):
-								if self.aggregation_queue[i][0] == next_part_id:
-									next_data = self.aggregation_queue[i]
-									next_data_id = i
-									break
+							next_part_name = self.catalog.return_weighted_part()
+							if next_part_name is not None:
+								next_data = self.aggregation_queue.peek(next_part_name)
 							if next_data is not None:
 								break
 				
-				#### without catalog > last item in the queue
+				#### without catalog > best item in the queue
 				else:
-					next_data = self.aggregation_queue[self.queue_count-1]
+					next_data = self.aggregation_queue.peek()
 
 				if next_data is not None:
+					## remove the chosen entry from the queue (before new entries are added by the placed part)
+					next_item = self.pop_queue_item(next_part_name)
+					
 					next_part = self.parts[next_data[0]]
 					next_center = Point3d(next_part.center)
 					orientTransform = next_data[2]
 					
-					global_check, coll_check, add_coll_check, missing_sup_check, global_const_check, adjacencies_check, orientation_check = self.check_all_constraints(next_part, orientTransform)
-						
-					if not global_check:
+					checks = self.check_all_constraints(next_part, orientTransform)
+					
+					## keep entries rejected for missing supports or adjacencies until a part is placed nearby
+					if checks[0] and self.is_transient_rejection(checks):
+						self.suspend_failure(next_part, orientTransform, ('queue', next_item))
+					
+					if not checks[0]:
 						next_part_trans = next_part.transform(orientTransform)
-						next_part_trans.reset_part(self.rules)
+						next_part_trans.reset_part(self.rules, self.rules_tables)
 						
 						for conn in next_part_trans.connections:
-							conn.generate_rules_table(self.rules)
+							conn.generate_rules_table(self.rules, self.rules_tables)
 						
-						next_part_trans.id = len(self.aggregated_parts)
+						next_part_trans.id = self.return_next_part_id()
 
-						## parent-child tracking
-						self.aggregated_parts[next_data[1]].children.append(next_part_trans.id)
-						next_part_trans.parent = self.aggregated_parts[next_data[1]].id
+						## parent-child tracking (queue entries store the id of their parent part)
+						parent_part = self.aggregated_parts[self.return_part_index(next_data[1])]
+						parent_part.children.append(next_part_trans.id)
+						next_part_trans.parent = parent_part.id
 						next_part_trans.conn_on_parent = next_data[3]
 						next_part_trans.conn_to_parent = next_data[4]						
 						
 						## add part to aggregated_parts list
-						self.aggregated_parts.append(next_part_trans)
+						self.append_part(next_part_trans)
 
 						## add data to graph
 						self.graph.add_node(next_part_trans.id)
 						self.graph.add_edge(next_data[1], next_part_trans.id, next_data[3], next_data[4])
 
+						## reconsider placements rejected for missing supports or adjacencies around the new part
+						self.release_failures(next_part_trans)
+
 						## update catalog if using one
 						if use_catalog:
 							self.catalog.update(next_part_trans.name, -1)
@@ -939,16 +1726,7 @@ class Aggregation(object):
 						## compute all possible next parts and append to list
 						self.compute_next_w_field(next_part_trans)
 						added += 1
-					
-					## TO FIX --> do not remove rules when only caused by missing supports
-					if use_catalog:
-						self.aggregation_queue.pop(next_data_id)
-						self.queue_values.pop(next_data_id)
-					else:
-						self.aggregation_queue.pop()
-						self.queue_values.pop()
-					
-					self.queue_count -=1
+						self.update_checkpoint()
 				else:
 					msg = "Could not place " + str(num-added) + " parts"
 					return msg
\ No newline at end of file
@@ -9,9 +9,9 @@ This file is part of Wasp. https://github.com/ar0551/Wasp
 Attribute classes and utilities
 """
 
-from Rhino.Geometry import Point3d
-from Rhino.Geometry import Plane
-from Rhino.Geometry import Line
+from wasp.geometry import Point3d
+from wasp.geometry import Plane
+from wasp.geometry import Line
 
 #################################################################### Attribute ####################################################################
 class Attribute(object):
@@ -9,16 +9,28 @@ This file is part of Wasp. https://github.com/ar0551/Wasp
 Collider classes and utilities
 """
 
-from Rhino.Geometry.Intersect import Intersection
+from wasp.geometry import Intersection
+from wasp.geometry import Box
+
+from wasp import global_tolerance
 from wasp.core import Connection
 from wasp.utilities import mesh_from_data, mesh_to_data
 
+## python 3 compatibility
+try:
+	xrange
+except NameError:
+	xrange = range
+
 
 #################################################################### Collider ####################################################################
 class Collider(object):
 	
+	## counters of candidate geometry pairs processed by the collision checks (shared by all colliders)
+	stats = {'pairs': 0, 'bbox_rejected': 0, 'mesh_checked': 0, 'mesh_collisions': 0}
+	
 	## constructor
-	def __init__(self, _geo, _multiple=False, _check_all = False, _connections=[], _valid_connections = []):
+	def __init__(self, _geo, _multiple=False, _check_all = False, _connections=[], _valid_connections = [], _boxes = None):
 		self.geometry = _geo
 		self.multiple = _multiple
 		self.check_all = _check_all
@@ -28,6 +40,14 @@ class Collider(object):
 		for geo in self.geometry:
 			self.faces_count += geo.Faces.Count
 		
+		## oriented boxes of each collider geometry (computed once, then transformed together with the geometry)
+		if _boxes is None:
+			self.boxes = [Box(geo.GetBoundingBox(True)) for geo in self.geometry]
+		else:
+			self.boxes = _boxes
+		## world-aligned bounding boxes used for early rejection of collision pairs
+		self.bboxes = [box.BoundingBox for box in self.boxes]
+		
 		self.valid_connections = _valid_connections
 		
 		self.set_connections = False
@@ -39,6 +59,13 @@ class Collider(object):
 		return "WaspCollider"
 	
 
+	## reset the collision checks counters
+	@classmethod
+	def reset_stats(cls):
+		for key in cls.stats:
+			cls.stats[key] = 0
+	
+
 	## create class from data dictionary
 	@classmethod
 	def from_data(cls, data):
@@ -65,11 +92,19 @@ class Collider(object):
 	########################################################################### check if valid connections need to be transformed or re-generated!!!
 	def transform(self, trans, transform_connections = False, maintain_valid = False):
 		geometry_trans = []
+		boxes_trans = []
 		
-		for geo in self.geometry:
-			geo_trans = geo.Duplicate()
+		for i in xrange(len(self.geometry)):
+			geo_trans = self.geometry[i].Duplicate()
 			geo_trans.Transform(trans)
 			geometry_trans.append(geo_trans)
+			
+			box = self.boxes[i]
+			box_trans = Box(box.Plane, box.X, box.Y, box.Z)
+			## boxes can only follow similarity transformations, otherwise recompute them from the geometry
+			if not box_trans.Transform(trans):
+				box_trans = Box(geo_trans.GetBoundingBox(True))
+			boxes_trans.append(box_trans)
 		
 		connections_trans = []
 		if transform_connections:
@@ -78,9 +113,9 @@ class Collider(object):
 		
 		if maintain_valid:
 			valid_connection_trans = list(self.valid_connections)
-			coll_trans = Collider(geometry_trans, _multiple=self.multiple, _check_all=self.check_all, _connections=connections_trans, _valid_connections=valid_connection_trans)
+			coll_trans = Collider(geometry_trans, _multiple=self.multiple, _check_all=self.check_all, _connections=connections_trans, _valid_connections=valid_connection_trans, _boxes=boxes_trans)
 		else:
-			coll_trans = Collider(geometry_trans, _multiple=self.multiple, _check_all=self.check_all, _connections=connections_trans)
+			coll_trans = Collider(geometry_trans, _multiple=self.multiple, _check_all=self.check_all, _connections=connections_trans, _boxes=boxes_trans)
 		
 		return coll_trans
 	
@@ -92,16 +127,37 @@ class Collider(object):
 			geo_copy = geo.Duplicate()
 			geometry_copy.append(geo_copy)
 		
+		boxes_copy = [Box(box.Plane, box.X, box.Y, box.Z) for box in self.boxes]
+		
 		connections_copy = []
 		for conn in self.connections:
 			connections_copy.append(conn.copy())
 		
 		valid_connection_copy = list(self.valid_connections)
-		coll_copy = Collider(geometry_copy, _multiple=self.multiple, _check_all=self.check_all, _connections=connections_copy, _valid_connections=valid_connection_copy)
+		coll_copy = Collider(geometry_copy, _multiple=self.multiple, _check_all=self.check_all, _connections=connections_copy, _valid_connections=valid_connection_copy, _boxes=boxes_copy)
 		
 		return coll_copy
 	
 
+	## check collision between one geometry of the collider and one geometry of another collider
+	def check_geometry_pair(self, geo_id, other, other_geo_id):
+		Collider.stats['pairs'] += 1
+		bb1 = self.bboxes[geo_id]
+		bb2 = other.bboxes[other_geo_id]
+		## bounding boxes pre-rejection
+		if bb1.Max.X < bb2.Min.X - global_tolerance or bb1.Min.X > bb2.Max.X + global_tolerance or \
+			bb1.Max.Y < bb2.Min.Y - global_tolerance or bb1.Min.Y > bb2.Max.Y + global_tolerance or \
+			bb1.Max.Z < bb2.Min.Z - global_tolerance or bb1.Min.Z > bb2.Max.Z + global_tolerance:
+			Collider.stats['bbox_rejected'] += 1
+			return False
+		## exact mesh-mesh intersection
+		Collider.stats['mesh_checked'] += 1
+		if len(Intersection.MeshMeshFast(self.geometry[geo_id], other.geometry[other_geo_id])) > 0:
+			Collider.stats['mesh_collisions'] += 1
+			return True
+		return False
+	
+
 	## check collisions between collider and given part
 	def check_collisions_w_parts(self, parts):
 		## multiple collider with associated connections
@@ -109,11 +165,11 @@ class Collider(object):
 			valid_colliders = []
 			self.valid_connections = []
 			count = 0
-			for geo in self.geometry:
+			for geo_id in xrange(len(self.geometry)):
 				valid_coll = True
 				for part in parts:
-					for other_geo in part.collider.geometry:
-						if len(Intersection.MeshMeshFast(geo, other_geo)) > 0:
+					for other_geo_id in xrange(len(part.collider.geometry)):
+						if self.check_geometry_pair(geo_id, part.collider, other_geo_id):
 							valid_coll = False
 							break
 					if valid_coll == False:
@@ -131,10 +187,10 @@ class Collider(object):
 		
 		## simple collider
 		else:
-			for geo in self.geometry:
+			for geo_id in xrange(len(self.geometry)):
 				for part in parts:
-					for other_geo in part.collider.geometry:
-						if len(Intersection.MeshMeshFast(geo, other_geo)) > 0:
+					for other_geo_id in xrange(len(part.collider.geometry)):
+						if self.check_geometry_pair(geo_id, part.collider, other_geo_id):
 							return True
 			return False
 	
@@ -146,11 +202,11 @@ class Collider(object):
 			valid_colliders = []
 			count = 0
 			
-			for geo in self.geometry:
+			for geo_id in xrange(len(self.geometry)):
 				valid_coll = True
 				for id in ids:
-					for other_geo in parts[id].collider.geometry:
-						if len(Intersection.MeshMeshFast(geo, other_geo)) > 0:
+					for other_geo_id in xrange(len(parts[id].collider.geometry)):
+						if self.check_geometry_pair(geo_id, parts[id].collider, other_geo_id):
 							valid_coll = False
 							break
 				valid_colliders.append(valid_coll)
@@ -163,10 +219,10 @@ class Collider(object):
 		
 		## simple collider
 		else:
-			for geo in self.geometry:
+			for geo_id in xrange(len(self.geometry)):
 				for id in ids:
-					for other_geo in parts[id].collider.geometry:
-						if len(Intersection.MeshMeshFast(geo, other_geo)) > 0:
+					for other_geo_id in xrange(len(parts[id].collider.geometry)):
+						if self.check_geometry_pair(geo_id, parts[id].collider, other_geo_id):
 							return True
 			return False
 
@@ -9,13 +9,19 @@ This file is part of Wasp. https://github.com/ar0551/Wasp
 Connection class
 """
 
-from Rhino.Geometry import Plane
-from Rhino.Geometry import Vector3d
+from wasp.geometry import Plane
+from wasp.geometry import Vector3d
 
 from wasp.utilities import plane_from_data, plane_to_data
 
 import math
 
+## python 3 compatibility
+try:
+	xrange
+except NameError:
+	xrange = range
+
 #################################################################### Connection ####################################################################
 class Connection(object):
 	'''
@@ -33,7 +39,7 @@ class Connection(object):
 		type (str): Connection type (for automated rules generation)
 		part (str): Name of the part the connection belongs to
 		id (int): Connection ID (unique within each part)
-		rule_table ([]): List of Wasp rules compatible with this connection
+		rule_table ([]): List of Wasp rules compatible with this connection (possibly shared with other connections)
 		active_rules ([int]): Indexes of still active rules in the rule_table list
 	'''
 
@@ -108,13 +114,19 @@ class Connection(object):
 		return conn_copy
 	
 	## generate the rules-table for the connection
-	def generate_rules_table(self, rules):
+	def generate_rules_table(self, rules, rules_tables=None):
 		'''
 		Generates the Connection rule_table, given a set of rules
 
 		Args:
 			rules ([]): list of available rules
+			rules_tables (dict): optional rules grouped by part name and connection id (see generate_rules_tables), shared by reference
 		'''
+		if rules_tables is not None:
+			self.rules_table = rules_tables.get((self.part, self.id), [])
+			self.active_rules = list(xrange(len(self.rules_table)))
+			return
+		
 		count = 0
 		self.rules_table = []
 		self.active_rules = []
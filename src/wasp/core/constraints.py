@@ -9,8 +9,8 @@ This file is part of Wasp. https://github.com/ar0551/Wasp
 Constraints classes
 """
 
-from Rhino.Geometry.Intersect import Intersection
-from Rhino.Geometry import Vector3d, Point3d, Line, Plane
+from wasp.geometry import Intersection
+from wasp.geometry import Vector3d, Point3d, Line, Plane
 
 from wasp import global_tolerance
 from wasp.utilities import plane_from_data, plane_to_data, mesh_from_data, mesh_to_data
@@ -9,15 +9,59 @@ This file is part of Wasp. https://github.com/ar0551/Wasp
 Graph class and utilities
 """
 
+import math
 
 from wasp import global_tolerance
 
+## python 3 compatibility
+try:
+	xrange
+except NameError:
+	xrange = range
+
+
+## convert a node id read from file to int (JSON stores dictionary keys as strings)
+def node_id_from_data(id):
+	try:
+		return int(id)
+	except:
+		return id
+
+
+## return the keys of all cells of the given size within tolerance from a point (used to match connection origins)
+def tolerance_cell_keys(pt, cell_size, tolerance):
+	ranges = []
+	for coord in (pt.X, pt.Y, pt.Z):
+		min_key = int(math.floor((coord - tolerance) / cell_size))
+		max_key = int(math.floor((coord + tolerance) / cell_size))
+		ranges.append(range(min_key, max_key+1))
+	return [(i, j, k) for i in ranges[0] for j in ranges[1] for k in ranges[2]]
+
 
 #################################################################### Graph ####################################################################
 class Graph(object):
+	'''
+	Directed graph of an aggregation (nodes are part ids, edges connect parent and child parts).
+	Edge attributes are stored in parallel lists, indexed by forward and reverse adjacency dictionaries,
+	so that nodes are removed in O(degree) (removed edges are swapped with the last one).
+
+	Attributes:
+		out_edges (dict): Dictionary mapping each node to a dictionary {end_node: edge_index}
+		in_edges (dict): Dictionary mapping each edge end to a dictionary {start_node: edge_index}
+		edge_start ([]): Start node of each edge
+		edge_end ([]): End node of each edge
+		edge_conn_start ([int]): Connection id on the start node of each edge
+		edge_conn_end ([int]): Connection id on the end node of each edge
+	'''
 
 	def __init__(self):
-		self.graph_dict = {}
+		self.out_edges = {}
+		self.in_edges = {}
+
+		self.edge_start = []
+		self.edge_end = []
+		self.edge_conn_start = []
+		self.edge_conn_end = []
 
 		## CURRENTLY NOT IMPLEMENTED
 		self.nodes_attributes = {}
@@ -25,18 +69,23 @@ class Graph(object):
 
 	## override Rhino .ToString() method (display name of the class in Gh)
 	def ToString(self):
-		return "WaspGraph [nodes: %s, edges: %s]" % (len(self.graph_dict.keys()), self.count_edges())
-	
+		return "WaspGraph [nodes: %s, edges: %s]" % (len(self.out_edges), self.count_edges())
+
 
 	## create class from data dictionary
 	@classmethod
 	def from_data(cls, data):
 		g = cls()
-		g.graph_dict = data
+		for node in data:
+			g.add_node(node_id_from_data(node))
+		for node in data:
+			for neighbour in data[node]:
+				edge_dict = data[node][neighbour]
+				g.add_edge(node_id_from_data(node), node_id_from_data(neighbour), edge_dict['conn_start'], edge_dict['conn_end'])
 		return g
 
 
-	## return the data dictionary representing the field
+	## return the data dictionary representing the graph
 	def to_data(self, use_attributes=False):
 		data = {}
 		if use_attributes:
@@ -44,42 +93,50 @@ class Graph(object):
 		else:
 			data = self.graph_dict
 		return data
-	
+
+
+	## dictionary representation of the graph, in the form {start: {end: edge_dict}}
+	## the dictionary is built on each access, use get_edge_index and get_edge_attributes to look up single edges
+	@property
+	def graph_dict(self):
+		data = {}
+		for node in self.out_edges:
+			data[node] = {}
+			for neighbour, index in self.out_edges[node].items():
+				data[node][neighbour] = self.get_edge_attributes(index)
+		return data
+
 
 	## create a graph from a given aggregation
 	@classmethod
 	def from_aggregation(cls, aggr, full_graph=True):
 		g = cls()
-		
+
 		if full_graph:
-			for i in range(len(aggr.aggregated_parts)):
-				
-				if aggr.aggregated_parts[i].id not in g.graph_dict:
-					g.graph_dict[aggr.aggregated_parts[i].id] = {}
-				
-				## check for neighbours
-				neighbours = []
-				## find all parts within a neghibouring range
-				for i2 in range(len(aggr.aggregated_parts)):
-					if aggr.aggregated_parts[i].id != aggr.aggregated_parts[i2].id:
-						p_dist = aggr.aggregated_parts[i].center.DistanceTo(aggr.aggregated_parts[i2].center)
-						if p_dist < (aggr.aggregated_parts[i].dim + aggr.aggregated_parts[i2].dim) + global_tolerance:
-							neighbours.append(i2)
-				## check all connections for neighbouring parts
-				for i2 in range(len(aggr.aggregated_parts[i].connections)):
-					for i3 in neighbours:
-						if aggr.aggregated_parts[i3].id != aggr.aggregated_parts[i].id:
-							for i4 in range(len(aggr.aggregated_parts[i3].connections)):
-								c_dist = aggr.aggregated_parts[i].connections[i2].pln.Origin.DistanceTo(aggr.aggregated_parts[i3].connections[i4].pln.Origin)
-								if c_dist < global_tolerance:
-
-									edge_dict = {}
-									edge_dict["start"] = aggr.aggregated_parts[i].id
-									edge_dict["end"] = aggr.aggregated_parts[i3].id
-									edge_dict["conn_start"] = i2
-									edge_dict["conn_end"] = i4
-
-									g.graph_dict[aggr.aggregated_parts[i].id][aggr.aggregated_parts[i3].id] = edge_dict
+			parts = aggr.aggregated_parts
+			
+			## hash of connection origins, stored in all cells within tolerance (so that matching origins are found in a single cell)
+			cell_size = global_tolerance * 4
+			cells = {}
+			for i in xrange(len(parts)):
+				g.add_node(parts[i].id)
+				for i2 in xrange(len(parts[i].connections)):
+					for key in tolerance_cell_keys(parts[i].connections[i2].pln.Origin, cell_size, global_tolerance):
+						if key in cells:
+							cells[key].append((i, i2))
+						else:
+							cells[key] = [(i, i2)]
+			
+			## connect each connection to the overlapping connections of other parts (the last matching pair is kept for each couple of parts)
+			for i in xrange(len(parts)):
+				for i2 in xrange(len(parts[i].connections)):
+					origin = parts[i].connections[i2].pln.Origin
+					key = (int(math.floor(origin.X / cell_size)), int(math.floor(origin.Y / cell_size)), int(math.floor(origin.Z / cell_size)))
+					for i3, i4 in cells.get(key, []):
+						if parts[i3].id != parts[i].id:
+							c_dist = origin.DistanceTo(parts[i3].connections[i4].pln.Origin)
+							if c_dist < global_tolerance:
+								g.add_edge(parts[i].id, parts[i3].id, i2, i4, replace=True)
 		else:
 			g = aggr.graph
 
@@ -87,82 +144,128 @@ class Graph(object):
 
 	## add a new node
 	def add_node(self, id):
-		if id not in self.graph_dict:
-			self.graph_dict[id] = {}
-	
-
-	## add a new edges
-	def add_edge(self, start_id, end_id, start_conn, end_conn):
-		if start_id not in self.graph_dict:
-			self.graph_dict[start_id] = {}
-			
-		if end_id not in self.graph_dict[start_id]:
-			edge_dict = {}
-			edge_dict["start"] = start_id
-			edge_dict["end"] = end_id
-			edge_dict["conn_start"] = start_conn
-			edge_dict["conn_end"] = end_conn
-			self.graph_dict[start_id][end_id] = edge_dict		
-	
+		if id not in self.out_edges:
+			self.out_edges[id] = {}
+
+
+	## add a new edge (if an edge between the same nodes exists, its connections are replaced only if required)
+	def add_edge(self, start_id, end_id, start_conn, end_conn, replace=False):
+		if start_id not in self.out_edges:
+			self.out_edges[start_id] = {}
+
+		index = self.out_edges[start_id].get(end_id)
+		if index is None:
+			index = len(self.edge_start)
+			self.out_edges[start_id][end_id] = index
+			if end_id not in self.in_edges:
+				self.in_edges[end_id] = {}
+			self.in_edges[end_id][start_id] = index
+			self.edge_start.append(start_id)
+			self.edge_end.append(end_id)
+			self.edge_conn_start.append(start_conn)
+			self.edge_conn_end.append(end_conn)
+		elif replace:
+			self.edge_conn_start[index] = start_conn
+			self.edge_conn_end[index] = end_conn
+
+
+	## remove an edge given its index, moving the last edge in its place
+	def remove_edge_at(self, index):
+		start_id = self.edge_start[index]
+		end_id = self.edge_end[index]
+		del self.out_edges[start_id][end_id]
+		del self.in_edges[end_id][start_id]
+		if len(self.in_edges[end_id]) == 0:
+			del self.in_edges[end_id]
+
+		last = len(self.edge_start) - 1
+		if index != last:
+			last_start = self.edge_start[last]
+			last_end = self.edge_end[last]
+			self.edge_start[index] = last_start
+			self.edge_end[index] = last_end
+			self.edge_conn_start[index] = self.edge_conn_start[last]
+			self.edge_conn_end[index] = self.edge_conn_end[last]
+			self.out_edges[last_start][last_end] = index
+			self.in_edges[last_end][last_start] = index
+
+		self.edge_start.pop()
+		self.edge_end.pop()
+		self.edge_conn_start.pop()
+		self.edge_conn_end.pop()
+
+
 	## remove a node and all its relative edges
 	def remove_node(self, id):
-		# delete the node
-		if id in self.graph_dict:
-			del self.graph_dict[id]
-		
 		# delete the edges associated with the node
-		for node in self.graph_dict:
-			if id in self.graph_dict[node]:
-				del self.graph_dict[node][id]		
+		for neighbour in list(self.out_edges.get(id, {})):
+			self.remove_edge_at(self.out_edges[id][neighbour])
+		for neighbour in list(self.in_edges.get(id, {})):
+			if neighbour in self.in_edges.get(id, {}):
+				self.remove_edge_at(self.in_edges[id][neighbour])
 
+		# delete the node
+		if id in self.out_edges:
+			del self.out_edges[id]
 
-	## count the number of edges (!!! add check for duplicates)
+
+	## count the number of edges
 	def count_edges(self):
-		count = 0
-		for node in self.graph_dict:
-			for neighbour in self.graph_dict[node]:
-				count+=1
-		return count
-	
+		return len(self.edge_start)
+
 
 	## get a list of all nodes
 	def get_nodes(self):
-		return self.graph_dict.keys()
-	
+		return self.out_edges.keys()
+
+
+	## get the indexes of the edges starting from a node
+	def get_out_edges(self, id):
+		return list(self.out_edges.get(id, {}).values())
+
+
+	## get the index of the edge between two nodes (None if they are not connected)
+	def get_edge_index(self, start_id, end_id):
+		return self.out_edges.get(start_id, {}).get(end_id)
+
+
+	## get the attributes dictionary of an edge
+	def get_edge_attributes(self, index):
+		edge_dict = {}
+		edge_dict["start"] = self.edge_start[index]
+		edge_dict["end"] = self.edge_end[index]
+		edge_dict["conn_start"] = self.edge_conn_start[index]
+		edge_dict["conn_end"] = self.edge_conn_end[index]
+		return edge_dict
+
+
+	## get the edge attributes as parallel lists (start ids, end ids, start connections, end connections)
+	## the lists are returned without copying them, and must not be modified
+	def get_edge_arrays(self):
+		return self.edge_start, self.edge_end, self.edge_conn_start, self.edge_conn_end
+
 
 	## get a list of all edge pairs
 	def get_edges(self, flatten = True):
 		edges = []
 		if flatten:
-			for node in self.graph_dict:
-				for neighbour in self.graph_dict[node]:
-					edges.append([node, neighbour])
+			for i in range(len(self.edge_start)):
+				edges.append([self.edge_start[i], self.edge_end[i]])
 		else:
-			n_count = 0
-			for node in self.graph_dict:
-				edges.append([])
-				for neighbour in self.graph_dict[node]:
-					edges[n_count].append([node, neighbour])
-				n_count +=1
+			for node in self.out_edges:
+				edges.append([[node, neighbour] for neighbour in self.out_edges[node]])
 
 		return edges
-	
-	
+
+
 	## get a list of all edge attributes
 	def get_edges_attributes(self, flatten = True):
 		edges_attr = []
 		if flatten:
-			for node in self.graph_dict:
-				for neighbour in self.graph_dict[node]:
-					edges_attr.append(self.graph_dict[node][neighbour])
+			for i in range(len(self.edge_start)):
+				edges_attr.append(self.get_edge_attributes(i))
 		else:
-			n_count = 0
-			for node in self.graph_dict:
-				edges_attr.append([])
-				for neighbour in self.graph_dict[node]:
-					edges_attr[n_count].append(self.graph_dict[node][neighbour])
-				n_count +=1
+			for node in self.out_edges:
+				edges_attr.append([self.get_edge_attributes(self.out_edges[node][neighbour]) for neighbour in self.out_edges[node]])
 
 		return edges_attr
-
-
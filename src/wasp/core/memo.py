@@ -0,0 +1,81 @@
+"""
+(C) 2017-2020 Andrea Rossi <ghwasp@gmail.com>
+
+This file is part of Wasp. https://github.com/ar0551/Wasp
+@license GPL-3.0 <https://www.gnu.org/licenses/gpl.html>
+
+@version 0.5.001
+
+Memo of rejected placements
+"""
+
+from wasp.core.spatial import SpatialGrid
+
+
+#################################################################### Failure Memo ####################################################################
+class FailureMemo(object):
+	'''
+	Memo of placements rejected only because of missing supports or adjacencies, which can become valid when new parts are placed nearby.
+	Placements rejected by collisions, additional colliders, global constraints or orientation can never become valid again, so they are not stored.
+	Each rejected placement (site) is stored with the center and size of the rejected part, and released when a part is placed within reach.
+
+	Args:
+		_cell_size (float): Size of the grid cells of the spatial index of the sites
+
+	Attributes:
+		sites (dict): Dictionary mapping site ids to rejected placements, in the form (center, dim, data)
+		grid (SpatialGrid): Spatial index of the sites centers
+		next_id (int): Id of the next stored site
+	'''
+
+	## constructor
+	def __init__(self, _cell_size):
+		self.grid = SpatialGrid(_cell_size)
+		self.sites = {}
+		self.next_id = 0
+
+
+	## override Rhino .ToString() method (display name of the class in Gh)
+	def ToString(self):
+		return "WaspFailureMemo [sites: %s]" % (len(self.sites))
+
+
+	def __len__(self):
+		return len(self.sites)
+
+
+	## remove all sites
+	def clear(self):
+		self.grid = SpatialGrid(self.grid.cell_size)
+		self.sites = {}
+		self.next_id = 0
+
+
+	## store a rejected placement, returning its site id
+	def add(self, center, dim, data):
+		site_id = self.next_id
+		self.next_id += 1
+		self.restore(site_id, (center, dim, data))
+		return site_id
+
+
+	## store a site with a given id (used to undo its release)
+	def restore(self, site_id, site):
+		self.sites[site_id] = site
+		self.grid.add(site_id, site[0], site[1])
+
+
+	## remove a site, returning it
+	def remove(self, site_id):
+		self.grid.remove(site_id)
+		return self.sites.pop(site_id, None)
+
+
+	## remove and return all sites within reach of a part of the given dimension placed at the given point, in the form (site_id, site)
+	def release(self, pt, dim):
+		released = []
+		for site_id in self.grid.query_part(pt, dim):
+			site = self.sites[site_id]
+			if site[0].DistanceTo(pt) < site[1] + dim:
+				released.append((site_id, self.remove(site_id)))
+		return released
@@ -9,8 +9,8 @@ This file is part of Wasp. https://github.com/ar0551/Wasp
 Part classes and utilities
 """
 
-from Rhino.Geometry import Transform
-from Rhino.Geometry import Point3d
+from wasp.geometry import Transform
+from wasp.geometry import Point3d
 
 from wasp.utilities import mesh_from_data, mesh_to_data
 from wasp.utilities import transform_from_data, transform_to_data
@@ -19,34 +19,88 @@ from wasp.core.colliders import Collider
 from wasp.core.constraints import Adjacency_Constraint
 
 import random
+import weakref
+from collections import OrderedDict
+
+## python 3 compatibility
+try:
+	xrange
+except NameError:
+	xrange = range
+
+
+#################################################################### Geometry cache ####################################################################
+## lazy transformed parts with generated geometry, in order of generation (older ones are released first)
+geometry_cache = OrderedDict()
+geometry_cache_size = 20000
+
+
+## set the maximum number of lazy parts keeping their generated geometry in memory
+def set_geometry_cache_size(size):
+	global geometry_cache_size
+	geometry_cache_size = size
+	trim_geometry_cache()
+
+
+## register a lazy part which just generated its geometry
+def cache_part_geometry(part):
+	key = id(part)
+	if key in geometry_cache:
+		del geometry_cache[key]
+	geometry_cache[key] = weakref.ref(part)
+	trim_geometry_cache()
+
+
+## release the geometry of the oldest lazy parts exceeding the cache size
+def trim_geometry_cache():
+	while len(geometry_cache) > geometry_cache_size:
+		part_ref = geometry_cache.popitem(last=False)[1]
+		part = part_ref()
+		if part is not None:
+			part.release_geometry()
 
 
 #################################################################### Base Part ####################################################################
 class Part(object):
 	
 	## constructor
-	def __init__(self, name, geometry, connections, collider, attributes, dim=None, id=None, field=None):
+	def __init__(self, name, geometry, connections, collider, attributes, dim=None, id=None, field=None, base_part=None, base_trans=None):
 		
 		self.name = name
 		self.id = id
-		self.geo = geometry
 		
 		self.field = field
 		
-		self.connections = []
+		## lazy transformed part (geometry, collider and connections are generated from the base part only when requested)
+		self.base_part = base_part
+		self.base_trans = base_trans
+		
+		self._geo = geometry
+		self._collider = collider
+		self._connections = None
+		self._attributes = None
+		## rules tables given to a lazy part before its connections were generated (see reset_part)
+		self._rules_tables = None
+		
 		self.active_connections = []
-
-		count = 0
-		for conn in connections:
-			conn.part = self.name
-			conn.id = count
-			self.connections.append(conn)
-			self.active_connections.append(count)
-			count += 1
+		
+		if self.base_part is None:
+			self._connections = []
+			count = 0
+			for conn in connections:
+				conn.part = self.name
+				conn.id = count
+				self._connections.append(conn)
+				self.active_connections.append(count)
+				count += 1
+			self.center = self.geo.GetBoundingBox(False).Center
+		else:
+			self.active_connections = list(xrange(len(self.base_part.connections)))
+			center_trans = Point3d(self.base_part.center)
+			center_trans.Transform(self.base_trans)
+			self.center = center_trans
 		
 		self.transformation = Transform.Identity
-		self.center = self.geo.GetBoundingBox(False).Center
-		self.collider = collider
 		
 		##part size
 		if dim is not None:
@@ -56,7 +110,7 @@ class Part(object):
 			for coll_geo in self.collider.geometry:
 				for v in coll_geo.Vertices:
 					dist = self.center.DistanceTo(v)
-					if dist > max_collider_dist or max_collider_dist is None:
+					if max_collider_dist is None or dist > max_collider_dist:
 						max_collider_dist = dist
 			
 			self.dim = max_collider_dist
@@ -66,9 +120,10 @@ class Part(object):
 		self.conn_to_parent = None
 		self.children = []
 		
-		self.attributes = []
-		if len(attributes) > 0:
-			self.attributes = attributes
+		if self.base_part is None:
+			self._attributes = []
+			if len(attributes) > 0:
+				self._attributes = attributes
 		
 		self.is_constrained = False
 	
@@ -78,6 +133,71 @@ class Part(object):
 		return "WaspPart [name: %s, id: %s]" % (self.name, self.id)
 	
 
+	## part geometry (generated on first access for lazy parts)
+	@property
+	def geo(self):
+		if self._geo is None and self.base_part is not None:
+			self._geo = self.base_part.geo.Duplicate()
+			self._geo.Transform(self.base_trans)
+			cache_part_geometry(self)
+		return self._geo
+	
+	@geo.setter
+	def geo(self, value):
+		self._geo = value
+	
+
+	## part collider (generated on first access for lazy parts)
+	@property
+	def collider(self):
+		if self._collider is None and self.base_part is not None:
+			self._collider = self.base_part.collider.transform(self.base_trans)
+			cache_part_geometry(self)
+		return self._collider
+	
+	@collider.setter
+	def collider(self, value):
+		self._collider = value
+	
+
+	## part connections (generated on first access for lazy parts, never released as they store the rules state)
+	@property
+	def connections(self):
+		if self._connections is None and self.base_part is not None:
+			connections = [conn.transform(self.base_trans) for conn in self.base_part.connections]
+			if self._rules_tables is not None:
+				for conn in connections:
+					conn.generate_rules_table(None, self._rules_tables)
+				self._rules_tables = None
+			self._connections = connections
+		return self._connections
+	
+	@connections.setter
+	def connections(self, value):
+		self._connections = value
+	
+
+	## part attributes (generated on first access for lazy parts)
+	@property
+	def attributes(self):
+		if self._attributes is None and self.base_part is not None:
+			self._attributes = [attr.transform(self.base_trans) for attr in self.base_part.attributes]
+			cache_part_geometry(self)
+		return self._attributes
+	
+	@attributes.setter
+	def attributes(self, value):
+		self._attributes = value
+	
+
+	## release generated geometry of lazy parts (it will be generated again when requested)
+	def release_geometry(self):
+		if self.base_part is not None:
+			self._geo = None
+			self._collider = None
+			self._attributes = None
+	
+
 	## create class from data dictionary
 	@classmethod
 	def from_data(cls, data):
@@ -134,16 +254,31 @@ class Part(object):
 		return data	
 
 
-	## reset the part and connections according to new provided aggregation rules
-	def reset_part(self, rules):
+	## reset the part and connections according to new provided aggregation rules (optionally already grouped in rules tables)
+	def reset_part(self, rules, rules_tables=None):
+		## lazy parts whose connections were not generated yet keep the tables until they are (all rules of all connections are active)
+		if self._connections is None and self.base_part is not None and rules_tables is not None:
+			self._rules_tables = rules_tables
+			self.active_connections = list(xrange(len(self.base_part.connections)))
+			return
+		
 		count = 0
 		self.active_connections = []
 		for conn in self.connections:
-			conn.generate_rules_table(rules)
+			conn.generate_rules_table(rules, rules_tables)
 			self.active_connections.append(count)
 			count += 1
 	
 	
+	## return the rules table and the active rules of a connection (without generating the connections of lazy parts)
+	def return_connection_rules(self, conn_id):
+		if self._connections is None and self._rules_tables is not None:
+			rules_table = self._rules_tables.get((self.name, conn_id), [])
+			return rules_table, xrange(len(rules_table))
+		conn = self.connections[conn_id]
+		return conn.rules_table, conn.active_rules
+	
+	
 	## return a dictionary containing all part data
 	def return_part_data(self):
 		data_dict = {}
@@ -160,23 +295,17 @@ class Part(object):
 		return data_dict
 	
 
-	## return a transformed copy of the part
+	## return the base part and the transformation to apply to it in order to obtain this part transformed by trans
+	def return_base_transform(self, trans):
+		if self.base_part is not None:
+			return self.base_part, Transform.Multiply(trans, self.base_trans)
+		return self, trans
+	
+
+	## return a transformed copy of the part (lazy, geometry is generated only when requested)
 	def transform(self, trans, transform_sub_parts=False, maintain_parenting = False):
-		geo_trans = self.geo.Duplicate()
-		geo_trans.Transform(trans)
-		
-		collider_trans = self.collider.transform(trans)
-		
-		connections_trans = []
-		for conn in self.connections:
-			connections_trans.append(conn.transform(trans))
-		
-		attributes_trans = []
-		if len(self.attributes) > 0:
-			for attr in self.attributes:
-				attributes_trans.append(attr.transform(trans))
-		
-		part_trans = Part(self.name, geo_trans, connections_trans, collider_trans, attributes_trans, dim=self.dim, id=self.id, field=self.field)
+		base_part, base_trans = self.return_base_transform(trans)
+		part_trans = Part(self.name, None, None, None, [], dim=self.dim, id=self.id, field=self.field, base_part=base_part, base_trans=base_trans)
 
 		part_trans.transformation = Transform.Multiply(trans, self.transformation)
 
@@ -190,20 +319,23 @@ class Part(object):
 	
 	## return a copy of the part
 	def copy(self, maintain_parenting = False):
-		geo_copy = self.geo.Duplicate()
-		
-		collider_copy = self.collider.copy()
-		
-		connections_copy = []
-		for conn in self.connections:
-			connections_copy.append(conn.copy())
-		
-		attributes_copy = []
-		if len(self.attributes) > 0:
-			for attr in self.attributes:
-				attributes_copy.append(attr.copy())
-		
-		part_copy = Part(self.name, geo_copy, connections_copy, collider_copy, attributes_copy, dim=self.dim, id=self.id, field=self.field)
+		if self.base_part is not None:
+			part_copy = Part(self.name, None, None, None, [], dim=self.dim, id=self.id, field=self.field, base_part=self.base_part, base_trans=self.base_trans)
+		else:
+			geo_copy = self.geo.Duplicate()
+			
+			collider_copy = self.collider.copy()
+			
+			connections_copy = []
+			for conn in self.connections:
+				connections_copy.append(conn.copy())
+			
+			attributes_copy = []
+			if len(self.attributes) > 0:
+				for attr in self.attributes:
+					attributes_copy.append(attr.copy())
+			
+			part_copy = Part(self.name, geo_copy, connections_copy, collider_copy, attributes_copy, dim=self.dim, id=self.id, field=self.field)
 		part_copy.transformation = self.transformation
 
 		if maintain_parenting:
@@ -229,17 +361,24 @@ class Part(object):
 class AdvancedPart(Part):
 	
 	## constructor
-	def __init__(self, name, geometry, connections, collider, attributes, additional_collider, supports, dim = None, id=None, field=None, sub_parts=[], adjacency_const = [], orientation_const=[]):
+	def __init__(self, name, geometry, connections, collider, attributes, additional_collider, supports, dim = None, id=None, field=None, sub_parts=[], adjacency_const = [], orientation_const=[], base_part=None, base_trans=None):
 		
-		super(AdvancedPart, self).__init__(name, geometry, connections, collider, attributes, dim=dim, id=id, field=field)
+		super(AdvancedPart, self).__init__(name, geometry, connections, collider, attributes, dim=dim, id=id, field=field, base_part=base_part, base_trans=base_trans)
 		
 		self.add_collider = additional_collider
-		self.supports = supports
-		self.adjacency_const = adjacency_const
-		self.orientation_const = orientation_const
-
-		if self.add_collider is not None or len(self.supports) > 0 or len(self.adjacency_const) > 0 or len(self.orientation_const) > 0:
-			self.is_constrained = True 
+		
+		self._supports = None
+		self._adjacency_const = None
+		self._orientation_const = None
+		
+		if self.base_part is None:
+			self._supports = supports
+			self._adjacency_const = adjacency_const
+			self._orientation_const = orientation_const
+			if self.add_collider is not None or len(self.supports) > 0 or len(self.adjacency_const) > 0 or len(self.orientation_const) > 0:
+				self.is_constrained = True
+		else:
+			self.is_constrained = True
 		
 		## hierarchical sub-parts
 		self.sub_parts = sub_parts
@@ -253,6 +392,54 @@ class AdvancedPart(Part):
 		return "WaspAdvPart [name: %s, id: %s]" % (self.name, self.id)
 	
 
+	## part supports (generated on first access for lazy parts)
+	@property
+	def supports(self):
+		if self._supports is None and self.base_part is not None:
+			self._supports = [sup.transform(self.base_trans) for sup in self.base_part.supports]
+			cache_part_geometry(self)
+		return self._supports
+	
+	@supports.setter
+	def supports(self, value):
+		self._supports = value
+	
+
+	## part adjacency constraints (generated on first access for lazy parts)
+	@property
+	def adjacency_const(self):
+		if self._adjacency_const is None and self.base_part is not None:
+			self._adjacency_const = [ac.transform(self.base_trans) for ac in self.base_part.adjacency_const]
+			cache_part_geometry(self)
+		return self._adjacency_const
+	
+	@adjacency_const.setter
+	def adjacency_const(self, value):
+		self._adjacency_const = value
+	
+
+	## part orientation constraints (generated on first access for lazy parts)
+	@property
+	def orientation_const(self):
+		if self._orientation_const is None and self.base_part is not None:
+			self._orientation_const = [oc.transform(self.base_trans) for oc in self.base_part.orientation_const]
+			cache_part_geometry(self)
+		return self._orientation_const
+	
+	@orientation_const.setter
+	def orientation_const(self, value):
+		self._orientation_const = value
+	
+
+	## release generated geometry of lazy parts (it will be generated again when requested)
+	def release_geometry(self):
+		super(AdvancedPart, self).release_geometry()
+		if self.base_part is not None:
+			self._supports = None
+			self._adjacency_const = None
+			self._orientation_const = None
+	
+
 	## create class from data dictionary
 	@classmethod
 	def from_data(cls, data):
@@ -350,77 +537,51 @@ class AdvancedPart(Part):
 		return data_dict
 	
 
-	## return a transformed copy of the part
+	## return a transformed copy of the part (lazy, geometry is generated only when requested)
 	def transform(self, trans, transform_sub_parts=False, sub_level = 0, maintain_parenting = False):
-		geo_trans = self.geo.Duplicate()
-		geo_trans.Transform(trans)
-		
-		collider_trans = self.collider.transform(trans)
-		
-		connections_trans = []
-		for conn in self.connections:
-			connections_trans.append(conn.transform(trans))
-		
-		attributes_trans = []
-		if len(self.attributes) > 0:
-			for attr in self.attributes:
-				attributes_trans.append(attr.transform(trans))
+		base_part, base_trans = self.return_base_transform(trans)
 		
+		## additional collider is transformed immediately, as it stores the valid connections computed at placement time
 		add_collider_trans = None
 		if(self.add_collider != None):
 			add_collider_trans = self.add_collider.transform(trans, transform_connections=True, maintain_valid=True)
-			
-		supports_trans = []
-		if len(self.supports) > 0:
-			for sup in self.supports:
-				sup_trans = sup.transform(trans)
-				supports_trans.append(sup_trans)
-
-		adjacency_const_trans = []
-		if len(self.adjacency_const) > 0:
-			for ac in self.adjacency_const:
-				ac_trans = ac.transform(trans)
-				adjacency_const_trans.append(ac_trans)
 		
-		orient_const_trans = []
-		if len(self.orientation_const) > 0:
-			for oc in self.orientation_const:
-				oc_trans = oc.transform(trans)
-				orient_const_trans.append(oc_trans)
-
+		sub_parts_trans = self.sub_parts
 		if transform_sub_parts and len(self.sub_parts) > 0 and sub_level > 0:
 			sub_parts_trans = []
 			for sp in self.sub_parts:
 				sp_trans = sp.transform(trans, transform_sub_parts = True, sub_level = sub_level - 1)
 				sub_parts_trans.append(sp_trans)
-			part_trans = AdvancedPart(self.name, geo_trans, connections_trans, collider_trans, attributes_trans, add_collider_trans, supports_trans, dim=self.dim, id=self.id, field=self.field, sub_parts=sub_parts_trans, adjacency_const = adjacency_const_trans, orientation_const=orient_const_trans)
-			part_trans.transformation = Transform.Multiply(trans, self.transformation)
-			part_trans.is_constrained = True
-			
-			if maintain_parenting:
-				part_trans.parent = self.parent
-				part_trans.conn_on_parent = self.conn_on_parent
-				part_trans.conn_to_parent = self.conn_to_parent
-				part_trans.children = self.children
-
-			return part_trans
 		
-		else:
-			part_trans = AdvancedPart(self.name, geo_trans, connections_trans, collider_trans, attributes_trans, add_collider_trans, supports_trans, dim=self.dim, id=self.id, field=self.field, sub_parts=self.sub_parts, adjacency_const = adjacency_const_trans, orientation_const=orient_const_trans)
-			part_trans.transformation = Transform.Multiply(trans, self.transformation)
-			part_trans.is_constrained = True
-			
-			if maintain_parenting:
-				part_trans.parent = self.parent
-				part_trans.conn_on_parent = self.conn_on_parent
-				part_trans.conn_to_parent = self.conn_to_parent
-				part_trans.children = self.children
+		part_trans = AdvancedPart(self.name, None, None, None, [], add_collider_trans, [], dim=self.dim, id=self.id, field=self.field, sub_parts=sub_parts_trans, base_part=base_part, base_trans=base_trans)
+		part_trans.transformation = Transform.Multiply(trans, self.transformation)
+		
+		if maintain_parenting:
+			part_trans.parent = self.parent
+			part_trans.conn_on_parent = self.conn_on_parent
+			part_trans.conn_to_parent = self.conn_to_parent
+			part_trans.children = self.children
 
-			return part_trans
+		return part_trans
 	
 	
 	## return a copy of the part		
 	def copy(self, maintain_parenting = False):
+		if self.base_part is not None:
+			add_collider_copy = None
+			if(self.add_collider != None):
+				add_collider_copy = self.add_collider.copy()
+			part_copy = AdvancedPart(self.name, None, None, None, [], add_collider_copy, [], dim=self.dim, id=self.id, field=self.field, sub_parts=self.sub_parts, base_part=self.base_part, base_trans=self.base_trans)
+			part_copy.transformation = self.transformation
+			
+			if maintain_parenting:
+				part_copy.parent = self.parent
+				part_copy.conn_on_parent = self.conn_on_parent
+				part_copy.conn_to_parent = self.conn_to_parent
+				part_copy.children = self.children
+			
+			return part_copy
+		
 		geo_copy = self.geo.Duplicate()
 		
 		collider_copy = self.collider.copy()
@@ -490,6 +651,27 @@ class AdvancedPart(Part):
 
 ################################################################# Parts Catalog ##################################################################
 class PartCatalog(object):
+	'''
+	Catalog of the parts available to an aggregation, drawn with probability proportional to their amounts.
+	Amounts are stored in a Fenwick tree (binary indexed tree), so weighted draws and updates take O(log n).
+	Adaptive catalogs keep the total constant by scaling all amounts, which is stored as a common scale factor.
+
+	Args:
+		_parts ([str]): Names of the parts
+		_amounts ([float]): Amounts of each part
+		_is_limited (bool): Whether the amounts decrease as parts are placed
+		_is_adaptive (bool): Whether the amounts are rescaled to keep the total constant as parts are placed (if not limited)
+
+	Attributes:
+		names ([str]): Names of the parts, in drawing order
+		indexes (dict): Dictionary mapping each part name to its index
+		weights ([float]): Amounts of each part, divided by the scale factor
+		tree ([float]): Fenwick tree of the weights
+		scale (float): Scale factor of the weights
+		parts_total (float): Total amount of parts
+		is_empty (bool): Whether no part is available
+	'''
+
 	##constructor
 	def __init__(self, _parts, _amounts, _is_limited=True, _is_adaptive=False):
 		
@@ -498,12 +680,12 @@ class PartCatalog(object):
 		self.is_limited = _is_limited
 		self.is_adaptive = _is_adaptive
 		
-		self.dict = {}
+		amounts_dict = {}
 		for i in xrange(len(self.parts)):
-			self.dict[self.parts[i]] = _amounts[i]
+			amounts_dict[self.parts[i]] = _amounts[i]
+		self.set_amounts(amounts_dict)
 		
 		self.is_empty = False
-		self.parts_total = sum(self.dict.values())
 	
 
 	## override Rhino .ToString() method (display name of the class in Gh)
@@ -527,9 +709,83 @@ class PartCatalog(object):
 		return data	
 	
 
+	## return the current state of the catalog (used by aggregation checkpoints)
+	def state_to_data(self):
+		data = {}
+		data['dict'] = self.dict
+		data['names'] = self.names
+		data['weights'] = self.weights
+		data['scale'] = self.scale
+		data['parts_total'] = self.parts_total
+		data['is_empty'] = self.is_empty
+		return data
+	
+
+	## restore a state returned by state_to_data
+	def state_from_data(self, data):
+		if 'weights' in data:
+			self.names = list(data['names'])
+			self.indexes = dict((self.names[i], i) for i in xrange(len(self.names)))
+			self.weights = list(data['weights'])
+			self.scale = data['scale']
+			self.build_tree()
+		else:
+			self.set_amounts(data['dict'])
+		self.parts_total = data['parts_total']
+		self.is_empty = data['is_empty']
+	
+
+	## current amount of each part
+	@property
+	def dict(self):
+		return dict((self.names[i], self.weights[i] * self.scale) for i in xrange(len(self.names)))
+	
+
+	## set the amounts of all parts (the drawing order follows the dictionary order, as in previous versions)
+	def set_amounts(self, amounts_dict):
+		self.names = list(amounts_dict.keys())
+		self.indexes = dict((self.names[i], i) for i in xrange(len(self.names)))
+		self.weights = [amounts_dict[name] for name in self.names]
+		self.scale = 1
+		self.parts_total = sum(self.weights)
+		self.build_tree()
+	
+
+	## build the Fenwick tree of the weights
+	def build_tree(self):
+		self.tree = [0] + list(self.weights)
+		for i in xrange(1, len(self.tree)):
+			parent = i + (i & -i)
+			if parent < len(self.tree):
+				self.tree[parent] += self.tree[i]
+	
+
+	## add a value to the weight of the part at the given index
+	def add_weight(self, index, value):
+		self.weights[index] += value
+		i = index + 1
+		while i < len(self.tree):
+			self.tree[i] += value
+			i += i & -i
+	
+
+	## return the index of the first part whose cumulative weight is greater than the given value (len(names) if none)
+	def find_weight(self, value):
+		pos = 0
+		step = 1
+		while step * 2 < len(self.tree):
+			step *= 2
+		while step > 0:
+			if pos + step < len(self.tree) and self.tree[pos + step] <= value:
+				pos += step
+				value -= self.tree[pos]
+			step //= 2
+		return pos
+	
+
 	## return a random part type
 	def return_random_part(self):
-		choices = [key for key in self.dict.keys() if self.dict[key] > 0]
+		choices = [self.names[i] for i in xrange(len(self.names)) if self.weights[i] > 0]
 		if len(choices) > 0:
 			return random.choice(choices)
 		else:
@@ -543,32 +799,29 @@ class PartCatalog(object):
 			self.is_empty = True
 			return None
 		n = random.uniform(0, self.parts_total)
-		for key in self.dict:
-			if n < self.dict[key]:
-				return key
-			n = n - self.dict[key]
+		index = self.find_weight(n / self.scale)
+		if index < len(self.names):
+			return self.names[index]
 		return None
 
 	## add or remove parts from the catalog	
 	def update(self, part_name, difference):
 		if self.is_limited:
-			self.dict[part_name] += difference
-			self.parts_total = sum(self.dict.values())
+			self.add_weight(self.indexes[part_name], difference)
+			self.parts_total += difference
 			if self.parts_total == 0:
 				self.is_empty = True
 			else:
 				self.is_empty = False
 		elif self.is_adaptive:
-			self.dict[part_name] += difference
-			prev_parts_total = self.parts_total
-			self.parts_total = sum(self.dict.values())
-			for key in self.dict:
-				self.dict[key] = (self.dict[key] * prev_parts_total) / (self.parts_total)
-			self.parts_total = sum(self.dict.values())
+			## scale all amounts to keep the total constant
+			self.add_weight(self.indexes[part_name], float(difference) / self.scale)
+			self.scale = self.scale * float(self.parts_total) / (self.parts_total + difference)
 		else:
 			pass
 	
 	## return a copy of the catalog
 	def copy(self):
-		amounts = [self.dict[part] for part in self.parts]
+		amounts_dict = self.dict
+		amounts = [amounts_dict[part] for part in self.parts]
 		return PartCatalog(self.parts, amounts, _is_limited=self.is_limited, _is_adaptive=self.is_adaptive)
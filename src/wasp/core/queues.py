@@ -0,0 +1,194 @@
+"""
+(C) 2017-2020 Andrea Rossi <ghwasp@gmail.com>
+
+This file is part of Wasp. https://github.com/ar0551/Wasp
+@license GPL-3.0 <https://www.gnu.org/licenses/gpl.html>
+
+@version 0.5.001
+
+Aggregation queue classes
+"""
+
+import heapq
+
+
+#################################################################### Aggregation Queue ####################################################################
+class AggregationQueue(object):
+	'''
+	Priority queue of possible next placements, sorted by field value.
+	Entries with the same value are returned in insertion order.
+	Each entry is stored both in a global heap and in a heap specific to its part name, removed entries are invalidated lazily.
+	Items are also indexed by the parent part of their entry, so that the entries generated by a part are removed without scanning the heap.
+
+	Attributes:
+		heap ([]): Binary heap with all entries, in the form [-value, order, entry, valid]
+		sub_heaps (dict): Dictionary of binary heaps with the entries of each part name
+		parent_items (dict): Dictionary mapping each parent part id (entry[1]) to the list of its items (possibly invalidated)
+		count (int): Number of valid entries in the queue
+	'''
+
+	## constructor
+	def __init__(self):
+		self.heap = []
+		self.sub_heaps = {}
+		self.parent_items = {}
+		self.count = 0
+		self.order = 0
+
+
+	## override Rhino .ToString() method (display name of the class in Gh)
+	def ToString(self):
+		return "WaspAggregationQueue [count: %s]" % (self.count)
+
+
+	def __len__(self):
+		return self.count
+
+
+	## remove all entries
+	def clear(self):
+		self.heap = []
+		self.sub_heaps = {}
+		self.parent_items = {}
+		self.count = 0
+		self.order = 0
+
+
+	## add a new entry (entry[0] must be the name of the part to place, entry[1] the id of its parent part)
+	def push(self, value, entry):
+		item = [-value, self.order, entry, True]
+		self.order += 1
+		self.add_item(item)
+
+
+	## add an item to the global heap, to the heap of its part name and to the items of its parent
+	def add_item(self, item):
+		entry = item[2]
+		heapq.heappush(self.heap, item)
+		if entry[0] not in self.sub_heaps:
+			self.sub_heaps[entry[0]] = []
+		heapq.heappush(self.sub_heaps[entry[0]], item)
+		if entry[1] not in self.parent_items:
+			self.parent_items[entry[1]] = []
+		self.parent_items[entry[1]].append(item)
+		self.count += 1
+
+
+	## return the heap of the given part name (or the global heap), after discarding invalidated items on top
+	def clean_heap(self, part_name=None):
+		if part_name is None:
+			heap = self.heap
+		else:
+			heap = self.sub_heaps.get(part_name)
+			if heap is None:
+				return None
+		while len(heap) > 0 and not heap[0][3]:
+			heapq.heappop(heap)
+		return heap
+
+
+	## return the entry with highest value (optionally for a given part name) without removing it
+	def peek(self, part_name=None):
+		heap = self.clean_heap(part_name)
+		if heap is None or len(heap) == 0:
+			return None
+		return heap[0][2]
+
+
+	## return the highest value in the queue (optionally for a given part name)
+	def peek_value(self, part_name=None):
+		heap = self.clean_heap(part_name)
+		if heap is None or len(heap) == 0:
+			return None
+		return -heap[0][0]
+
+
+	## check if the queue contains entries for the given part name
+	def contains(self, part_name):
+		return self.peek(part_name) is not None
+
+
+	## remove and return the entry with highest value (optionally for a given part name)
+	def pop(self, part_name=None):
+		item = self.pop_item(part_name)
+		if item is None:
+			return None
+		return item[2]
+
+
+	## remove and return the heap item with highest value (optionally for a given part name)
+	def pop_item(self, part_name=None):
+		heap = self.clean_heap(part_name)
+		if heap is None or len(heap) == 0:
+			return None
+		item = heapq.heappop(heap)
+		item[3] = False
+		self.count -= 1
+		return item
+
+
+	## re-insert a previously removed item, keeping its original position among entries with equal value
+	def push_item(self, item):
+		self.add_item([item[0], item[1], item[2], True])
+
+
+	## invalidate all entries satisfying the given condition (scanning the whole heap)
+	def remove_where(self, condition):
+		removed = 0
+		for item in self.heap:
+			if item[3] and condition(item[2]):
+				item[3] = False
+				removed += 1
+		self.count -= removed
+		self.compact_if_sparse()
+		return removed
+
+
+	## invalidate all entries generated by the given parent part, returning their number
+	def remove_parent(self, parent_id):
+		removed = 0
+		for item in self.parent_items.pop(parent_id, []):
+			if item[3]:
+				item[3] = False
+				removed += 1
+		self.count -= removed
+		self.compact_if_sparse()
+		return removed
+
+
+	## invalidate a given entry (found by identity among the items of its parent), returning the number of removed items
+	def remove_entry(self, entry):
+		removed = 0
+		for item in self.parent_items.get(entry[1], []):
+			if item[3] and item[2] is entry:
+				item[3] = False
+				removed += 1
+		self.count -= removed
+		self.compact_if_sparse()
+		return removed
+
+
+	## rebuild heaps if they are mostly made of invalidated items
+	def compact_if_sparse(self):
+		if len(self.heap) > 2 * self.count + 64:
+			self.compact()
+
+
+	## rebuild all heaps and parent indexes, discarding invalidated items
+	def compact(self):
+		self.heap = [item for item in self.heap if item[3]]
+		heapq.heapify(self.heap)
+		for name in self.sub_heaps:
+			sub_heap = [item for item in self.sub_heaps[name] if item[3]]
+			heapq.heapify(sub_heap)
+			self.sub_heaps[name] = sub_heap
+		self.parent_items = {}
+		for item in self.heap:
+			if item[2][1] not in self.parent_items:
+				self.parent_items[item[2][1]] = []
+			self.parent_items[item[2][1]].append(item)
+
+
+	## return all valid entries, sorted from highest to lowest value
+	def sorted_entries(self):
+		return [item[2] for item in sorted(self.heap) if item[3]]
@@ -28,7 +28,7 @@ class Rule(object):
 	## create class from data dictionary
 	@classmethod
 	def from_data(cls, data):
-		return cls(data['part1'], int(data['conn1']), data['part1'], int(data['conn1']), _active = data['active'])
+		return cls(data['part1'], int(data['conn1']), data['part2'], int(data['conn2']), _active = data['active'])
 
 		
 	## return the data dictionary representing the rule
@@ -39,4 +39,16 @@ class Rule(object):
 		data['part2'] = self.part2
 		data['conn2'] = self.conn2
 		data['active'] = self.active
-		return data	
\ No newline at end of file
+		return data	
+
+
+## group rules by first part name and connection id, in the form (part1, conn1): [rules] (keeping the rules order)
+def generate_rules_tables(rules):
+	rules_tables = {}
+	for rule in rules:
+		key = (rule.part1, rule.conn1)
+		if key in rules_tables:
+			rules_tables[key].append(rule)
+		else:
+			rules_tables[key] = [rule]
+	return rules_tables
\ No newline at end of file
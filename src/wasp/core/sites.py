@@ -0,0 +1,126 @@
+"""
+(C) 2017-2020 Andrea Rossi <ghwasp@gmail.com>
+
+This file is part of Wasp. https://github.com/ar0551/Wasp
+@license GPL-3.0 <https://www.gnu.org/licenses/gpl.html>
+
+@version 0.5.001
+
+Open sites index of aggregations
+"""
+
+import random
+
+
+#################################################################### Open Sites ####################################################################
+class OpenSites(object):
+	'''
+	Index of the open sites of an aggregation (active rules of active connections, where new parts might be placed),
+	supporting constant time insertion, removal and uniform sampling, among all sites or among the sites placing a given part.
+	Sites are stored in lists, removed sites are swapped with the last one.
+
+	Attributes:
+		sites ([]): List of sites, in the form (part_index, conn_id, rule_id), with the index of the part in the aggregated parts list
+		positions (dict): Dictionary mapping each site to its position in the sites list
+		buckets (dict): Dictionary mapping the name of the placed part (part2 of the rule) to the list of its sites
+		bucket_positions (dict): Dictionary mapping each site to its bucket name and position in the bucket list
+	'''
+
+	## constructor
+	def __init__(self):
+		self.sites = []
+		self.positions = {}
+		self.buckets = {}
+		self.bucket_positions = {}
+
+
+	## override Rhino .ToString() method (display name of the class in Gh)
+	def ToString(self):
+		return "WaspOpenSites [count: %s, parts: %s]" % (len(self.sites), len(self.buckets))
+
+
+	def __len__(self):
+		return len(self.sites)
+
+
+	def __contains__(self, site):
+		return site in self.positions
+
+
+	## create class from data dictionary
+	@classmethod
+	def from_data(cls, data):
+		open_sites = cls()
+		open_sites.sites = [tuple(site) for site in data['sites']]
+		for i in range(len(open_sites.sites)):
+			open_sites.positions[open_sites.sites[i]] = i
+		for name in data['buckets']:
+			bucket = [tuple(site) for site in data['buckets'][name]]
+			open_sites.buckets[name] = bucket
+			for i in range(len(bucket)):
+				open_sites.bucket_positions[bucket[i]] = (name, i)
+		return open_sites
+
+
+	## return the data dictionary representing the open sites (lists are stored in their sampling order)
+	def to_data(self):
+		data = {}
+		data['sites'] = [list(site) for site in self.sites]
+		data['buckets'] = {}
+		for name in self.buckets:
+			data['buckets'][name] = [list(site) for site in self.buckets[name]]
+		return data
+
+
+	## remove all sites
+	def clear(self):
+		self.sites = []
+		self.positions = {}
+		self.buckets = {}
+		self.bucket_positions = {}
+
+
+	## add a site placing the given part (if not already present)
+	def add(self, site, part_name):
+		if site not in self.positions:
+			self.positions[site] = len(self.sites)
+			self.sites.append(site)
+			if part_name not in self.buckets:
+				self.buckets[part_name] = []
+			self.bucket_positions[site] = (part_name, len(self.buckets[part_name]))
+			self.buckets[part_name].append(site)
+
+
+	## remove a site (if present)
+	def remove(self, site):
+		pos = self.positions.pop(site, None)
+		if pos is not None:
+			last = self.sites.pop()
+			if pos < len(self.sites):
+				self.sites[pos] = last
+				self.positions[last] = pos
+
+			part_name, pos = self.bucket_positions.pop(site)
+			bucket = self.buckets[part_name]
+			last = bucket.pop()
+			if pos < len(bucket):
+				bucket[pos] = last
+				self.bucket_positions[last] = (part_name, pos)
+
+
+	## return the number of sites (optionally placing a given part)
+	def count(self, part_name = None):
+		if part_name is None:
+			return len(self.sites)
+		return len(self.buckets.get(part_name, []))
+
+
+	## return a random site, optionally among the ones placing a given part (None if empty)
+	def sample(self, part_name = None):
+		if part_name is None:
+			sites = self.sites
+		else:
+			sites = self.buckets.get(part_name, [])
+		if len(sites) == 0:
+			return None
+		return sites[random.randint(0, len(sites)-1)]
@@ -0,0 +1,130 @@
+"""
+(C) 2017-2020 Andrea Rossi <ghwasp@gmail.com>
+
+This file is part of Wasp. https://github.com/ar0551/Wasp
+@license GPL-3.0 <https://www.gnu.org/licenses/gpl.html>
+
+@version 0.5.001
+
+Spatial index classes and utilities
+"""
+
+import math
+
+## python 3 compatibility
+try:
+	xrange
+except NameError:
+	xrange = range
+
+
+#################################################################### Spatial Grid ####################################################################
+class SpatialGrid(object):
+	'''
+	Uniform-grid spatial hash storing the centers of the aggregated parts, used as broad phase for collision and neighbourhood queries.
+
+	Args:
+		_cell_size (float): Size of the grid cells (ideally close to the maximum interaction distance between parts)
+
+	Attributes:
+		cell_size (float): Size of the grid cells
+		cells (dict): Dictionary mapping (i,j,k) cell keys to the list of indexes stored in the cell
+		keys (dict): Dictionary mapping each stored index to its cell key
+		max_dim (float): Largest dimension of the stored parts (used to extend queries)
+		end (int): Index following the highest stored index (used to trim the grid)
+	'''
+
+	## constructor
+	def __init__(self, _cell_size):
+		if _cell_size is None or _cell_size <= 0:
+			_cell_size = 1.0
+		self.cell_size = float(_cell_size)
+		self.cells = {}
+		self.keys = {}
+		self.max_dim = 0.0
+		self.end = 0
+
+
+	## override Rhino .ToString() method (display name of the class in Gh)
+	def ToString(self):
+		return "WaspSpatialGrid [cell: %s, count: %s]" % (self.cell_size, len(self.keys))
+
+
+	## create a grid from a list of parts
+	@classmethod
+	def from_parts(cls, parts, cell_size=None):
+		if cell_size is None:
+			cell_size = 0.0
+			for part in parts:
+				if part.dim > cell_size:
+					cell_size = part.dim
+			cell_size *= 2
+		grid = cls(cell_size)
+		for i in xrange(len(parts)):
+			grid.add(i, parts[i].center, parts[i].dim)
+		return grid
+
+
+	## return the number of stored indexes
+	@property
+	def count(self):
+		return len(self.keys)
+
+
+	## return the cell key of a given point
+	def cell_key(self, pt):
+		return (int(math.floor(pt.X / self.cell_size)), int(math.floor(pt.Y / self.cell_size)), int(math.floor(pt.Z / self.cell_size)))
+
+
+	## add an index to the grid
+	def add(self, index, pt, dim=0.0):
+		key = self.cell_key(pt)
+		if key in self.cells:
+			self.cells[key].append(index)
+		else:
+			self.cells[key] = [index]
+		self.keys[index] = key
+		if index >= self.end:
+			self.end = index + 1
+		if dim > self.max_dim:
+			self.max_dim = dim
+
+
+	## remove an index from the grid
+	def remove(self, index):
+		if index in self.keys:
+			key = self.keys.pop(index)
+			cell = self.cells[key]
+			cell.remove(index)
+			if len(cell) == 0:
+				del self.cells[key]
+
+
+	## remove all indexes equal or greater than the given one (used when trimming the aggregation)
+	## only the indexes between num and the highest stored one are visited, so trimming costs O(removed) when indexes are contiguous
+	def trim(self, num):
+		for index in xrange(num, self.end):
+			self.remove(index)
+		self.end = min(self.end, max(num, 0))
+
+
+	## return all stored indexes whose cell might be within the given radius from a point (sorted by index)
+	def query(self, pt, radius):
+		s = self.cell_size
+		min_key = (int(math.floor((pt.X - radius) / s)), int(math.floor((pt.Y - radius) / s)), int(math.floor((pt.Z - radius) / s)))
+		max_key = (int(math.floor((pt.X + radius) / s)), int(math.floor((pt.Y + radius) / s)), int(math.floor((pt.Z + radius) / s)))
+		found = []
+		for i in xrange(min_key[0], max_key[0]+1):
+			for j in xrange(min_key[1], max_key[1]+1):
+				for k in xrange(min_key[2], max_key[2]+1):
+					cell = self.cells.get((i,j,k))
+					if cell is not None:
+						found.extend(cell)
+		found.sort()
+		return found
+
+
+	## return all stored indexes which might interact with a part of the given dimension placed at the given point
+	def query_part(self, pt, dim):
+		return self.query(pt, dim + self.max_dim)
+
@@ -0,0 +1,104 @@
+"""
+(C) 2017-2020 Andrea Rossi <ghwasp@gmail.com>
+
+This file is part of Wasp. https://github.com/ar0551/Wasp
+@license GPL-3.0 <https://www.gnu.org/licenses/gpl.html>
+
+@version 0.5.001
+
+Streaming save and load of aggregations
+"""
+
+import json
+
+from wasp.utilities import transform_to_list
+
+
+## identifier and version of the stream format
+STREAM_FORMAT = 'wasp_aggregation_stream'
+STREAM_VERSION = 1
+
+
+#################################################################### Aggregation Stream Writer ####################################################################
+class AggregationStreamWriter(object):
+	'''
+	Writes an aggregation as newline-delimited JSON records, which can be appended while the aggregation grows.
+	The first record is a header with the aggregation settings (type 'header', see Aggregation.header_to_data),
+	followed by one record for each placed part (type 'part': name, id, parent, conn_on_parent, conn_to_parent, transform as 12 floats)
+	and one record for each call to remove_elements (type 'remove': count).
+
+	Args:
+		_file_path (str): Path of the file to write
+		_aggregation (Aggregation): Aggregation to write (the header and the already placed parts are written immediately)
+		_flush_every (int): Number of records after which the file is flushed to disk
+
+	Attributes:
+		file_path (str): Path of the file
+		records_count (int): Number of records written
+	'''
+
+	## constructor
+	def __init__(self, _file_path, _aggregation, _flush_every = 100):
+		self.file_path = _file_path
+		self.flush_every = _flush_every
+		self.records_count = 0
+		self.file = open(self.file_path, 'w')
+
+		header = _aggregation.header_to_data()
+		header['type'] = 'header'
+		header['format'] = STREAM_FORMAT
+		header['version'] = STREAM_VERSION
+		header['count'] = len(_aggregation.aggregated_parts)
+		self.write_record(header)
+
+		for part in _aggregation.aggregated_parts:
+			self.write_part(part)
+		self.file.flush()
+
+
+	## override Rhino .ToString() method (display name of the class in Gh)
+	def ToString(self):
+		return "WaspAggregationStreamWriter [file: %s, records: %s]" % (self.file_path, self.records_count)
+
+
+	## write a single record as a line of JSON
+	def write_record(self, record):
+		self.file.write(json.dumps(record))
+		self.file.write('\n')
+		self.records_count += 1
+		if self.records_count % self.flush_every == 0:
+			self.file.flush()
+
+
+	## write the placement of a part
+	def write_part(self, part):
+		record = {}
+		record['type'] = 'part'
+		record['name'] = part.name
+		record['id'] = part.id
+		## some aggregation methods store the parent part instead of its id
+		record['parent'] = getattr(part.parent, 'id', part.parent)
+		record['conn_on_parent'] = part.conn_on_parent
+		record['conn_to_parent'] = part.conn_to_parent
+		record['transform'] = transform_to_list(part.transformation)
+		self.write_record(record)
+
+
+	## write the removal of all parts after the first num
+	def write_remove(self, num):
+		self.write_record({'type': 'remove', 'count': num})
+
+
+	## flush and close the file
+	def close(self):
+		if not self.file.closed:
+			self.file.close()
+
+
+## read the records of an aggregation stream one at a time (the file is read lazily, line by line)
+def read_aggregation_stream(file_path):
+	with open(file_path, 'r') as f:
+		for line in f:
+			line = line.strip()
+			if len(line) > 0:
+				yield json.loads(line)
@@ -9,4 +9,6 @@ This file is part of Wasp. https://github.com/ar0551/Wasp
 Voxel fields generation modules
 """
 
-from .field import *
\ No newline at end of file
+from .field import *
+from .meshing import *
+from .contours import *
\ No newline at end of file
@@ -0,0 +1,190 @@
+"""
+(C) 2017-2020 Andrea Rossi <ghwasp@gmail.com>
+
+This file is part of Wasp. https://github.com/ar0551/Wasp
+@license GPL-3.0 <https://www.gnu.org/licenses/gpl.html>
+
+@version 0.5.001
+
+Isolines extraction from slices of voxel fields
+"""
+
+from wasp.field.meshing import VOXEL_FACE_AXES
+
+## NumPy is optional (not available in IronPython), plain loops are used as fallback
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
+## python 3 compatibility
+try:
+	xrange
+except NameError:
+	xrange = range
+
+
+## corners of the marching squares cells, as grid offsets (u, v), counter-clockwise
+SQUARE_CORNERS = ((0,0), (1,0), (1,1), (0,1))
+## edges of the marching squares cells, as grid offset of the lower end point and direction (0: u, 1: v)
+SQUARE_EDGES = ((0,0,0), (1,0,1), (0,1,0), (0,0,1))
+
+
+## compute the segments of each marching squares case (bit i of the case is set if corner i is inside), as pairs of cell edges
+## segments separate the inside corners on ambiguous cells (as the faces of marching cubes cells), and are oriented counter-clockwise around the inside values
+def marching_squares_table():
+	table = []
+	for case in range(16):
+		inside = [(case >> c) & 1 == 1 for c in range(4)]
+		## crossed edges met walking around the cell, flagged if the walk enters the inside
+		crossings = []
+		for i in range(4):
+			if inside[i] != inside[(i+1) % 4]:
+				crossings.append((i, inside[(i+1) % 4]))
+		segments = []
+		for i in range(len(crossings)):
+			if crossings[i][1]:
+				segments.append((crossings[(i+1) % len(crossings)][0], crossings[i][0]))
+		table.append(segments)
+	return table
+
+
+MARCHING_SQUARES_TABLE = marching_squares_table()
+
+
+## join segments sharing their end points into chains (segments are oriented, so each point starts and ends at most one segment)
+## segments are given as pairs of point ids, chains are returned as lists of point ids (closed chains repeat their first point at the end)
+def join_segments(segments):
+	next_ids = {}
+	for start, end in segments:
+		next_ids[start] = end
+	ends = set(end for start, end in segments)
+
+	chains = []
+	## open chains first (starting from points not ending any segment), then closed ones
+	starts = [start for start, end in segments if start not in ends] + [start for start, end in segments]
+	for start in starts:
+		if start not in next_ids:
+			continue
+		chain = [start]
+		point = next_ids.pop(start)
+		chain.append(point)
+		while point in next_ids:
+			point = next_ids.pop(point)
+			chain.append(point)
+		chains.append(chain)
+	return chains
+
+
+## compute the isolines of the given values (in z-y-x order) on slices perpendicular to an axis (0: x, 1: y, 2: z), for all given slices and iso values at once
+## slices are grid indexes along the axis, crossing points are linearly interpolated on the grid edges
+## isolines are returned as nested lists in the form isolines[slice][iso], each containing chains of grid coordinates (x, y, z)
+def isolines_np(values, count, axis, slices, isos):
+	x_count, y_count, z_count = count
+	axes = VOXEL_FACE_AXES[axis]
+	grid = np.asarray(values, dtype=float).reshape(z_count, y_count, x_count)
+	## values of each slice, in v-u order
+	planes = [grid.transpose(2,0,1), grid.transpose(1,2,0), grid][axis][np.asarray(slices, dtype=int)]
+	isos_array = np.asarray(isos, dtype=float)
+	u_count = count[axes[1]]
+	v_count = count[axes[2]]
+	group_size = u_count * v_count * 2
+
+	## case index of all cells of all slices and iso values, in iso-slice-v-u order
+	inside = (planes[None,:,:,:] > isos_array[:,None,None,None]).astype(np.int8)
+	cases = inside[:,:,:-1,:-1] | (inside[:,:,:-1,1:] << 1) | (inside[:,:,1:,1:] << 2) | (inside[:,:,1:,:-1] << 3)
+
+	## segments of the crossed cells, as edge ids (2 * (point index + group index * slice size) + direction)
+	ci, cs, cv, cu = np.nonzero((cases != 0) & (cases != 15))
+	cell_cases = cases[ci, cs, cv, cu]
+	table = np.full((16, 2, 2), -1, dtype=int)
+	for case in range(16):
+		if len(MARCHING_SQUARES_TABLE[case]) > 0:
+			table[case, :len(MARCHING_SQUARES_TABLE[case])] = MARCHING_SQUARES_TABLE[case]
+	edge_offsets = np.array([(du + dv*u_count) * 2 + direction for du, dv, direction in SQUARE_EDGES])
+	cell_bases = (ci*len(slices) + cs) * group_size + (cu + cv*u_count) * 2
+	cell_ids, segment_ids = np.nonzero(table[cell_cases, :, 0] >= 0)
+	edge_ids = cell_bases[cell_ids][:,None] + edge_offsets[table[cell_cases[cell_ids], segment_ids]]
+
+	## one point for each crossed edge, linearly interpolated between its end points
+	edges, segments = np.unique(edge_ids, return_inverse=True)
+	groups = edges // group_size
+	directions = edges % 2
+	starts = (edges % group_size) // 2
+	u = starts % u_count
+	v = starts // u_count
+	slice_ids = groups % len(slices)
+	start_values = planes[slice_ids, v, u]
+	end_values = planes[slice_ids, v + directions, u + 1 - directions]
+	t = (isos_array[groups // len(slices)] - start_values) / (end_values - start_values)
+	coords = np.zeros((len(edges), 3))
+	coords[:,axes[0]] = np.asarray(slices)[slice_ids]
+	coords[:,axes[1]] = u + t*(1 - directions)
+	coords[:,axes[2]] = v + t*directions
+	coords = coords.tolist()
+	groups = groups.tolist()
+
+	isolines = [[[] for iso in isos] for s in slices]
+	for chain in join_segments(segments.reshape(-1,2).tolist()):
+		group = groups[chain[0]]
+		isolines[group % len(slices)][group // len(slices)].append([coords[i] for i in chain])
+	return isolines
+
+
+## compute the isolines of the given values (in z-y-x order) on slices perpendicular to an axis, without NumPy
+## isolines are returned as nested lists in the form isolines[slice][iso], each containing chains of grid coordinates (x, y, z)
+def isolines(values, count, axis, slices, isos):
+	axes = VOXEL_FACE_AXES[axis]
+	value_steps = (1, count[0], count[0]*count[1])
+	u_count = count[axes[1]]
+	v_count = count[axes[2]]
+	p_step, u_step, v_step = [value_steps[a] for a in axes]
+
+	isolines = []
+	for p in slices:
+		slice_isolines = []
+		for iso in isos:
+			point_ids = {}
+			coords = []
+			segments = []
+			for v in xrange(v_count-1):
+				for u in xrange(u_count-1):
+					i = p*p_step + u*u_step + v*v_step
+					corner_values = (values[i], values[i + u_step], values[i + u_step + v_step], values[i + v_step])
+					case = 0
+					for c in range(4):
+						if corner_values[c] > iso:
+							case |= 1 << c
+					for segment in MARCHING_SQUARES_TABLE[case]:
+						ids = []
+						for e in segment:
+							du, dv, direction = SQUARE_EDGES[e]
+							key = ((u + du) + (v + dv)*u_count) * 2 + direction
+							point_id = point_ids.get(key)
+							if point_id is None:
+								start_value = corner_values[SQUARE_CORNERS.index((du, dv))]
+								end_value = corner_values[SQUARE_CORNERS.index((du + 1 - direction, dv + direction))]
+								t = (iso - start_value) / (end_value - start_value)
+								pt = [0, 0, 0]
+								pt[axes[0]] = p
+								pt[axes[1]] = u + du + t*(1 - direction)
+								pt[axes[2]] = v + dv + t*direction
+								point_id = len(coords)
+								point_ids[key] = point_id
+								coords.append(pt)
+							ids.append(point_id)
+						segments.append(ids)
+			slice_isolines.append([[coords[i] for i in chain] for chain in join_segments(segments)])
+		isolines.append(slice_isolines)
+	return isolines
+
+
+## compute the isolines of the given values (in z-y-x order) on slices perpendicular to an axis (0: x, 1: y, 2: z), for all given slices and iso values
+## values higher than the iso value are inside, isolines run counter-clockwise around them (seen from the positive direction of the axis)
+## isolines are returned as nested lists in the form isolines[slice][iso], each containing chains of grid coordinates (x, y, z)
+def isolines_from_values(values, count, axis, slices, isos):
+	if len(slices) == 0 or len(isos) == 0:
+		return [[[] for iso in isos] for s in slices]
+	if np is not None:
+		return isolines_np(values, count, axis, slices, isos)
+	return isolines(values, count, axis, slices, isos)
@@ -11,22 +11,57 @@ Classes and utilities for voxel fields generation
 
 
 import math
+from array import array
 
-from Rhino.Geometry import BoundingBox
-from Rhino.Geometry import Vector3d, Point3d
-from Rhino.Geometry import Plane, Box
-from Rhino.Geometry import Transform
-from Rhino.Geometry import Mesh
+from wasp.geometry import BoundingBox
+from wasp.geometry import Vector3d, Point3d
+from wasp.geometry import Plane, Box
+from wasp.geometry import Transform
+from wasp.geometry import Mesh, Polyline
 
 from wasp import global_tolerance
 from wasp.utilities import mesh_from_data, mesh_to_data, plane_from_data, plane_to_data
+from wasp.field.meshing import mesh_from_voxels, mesh_from_iso_values
+from wasp.field.contours import isolines_from_values
+
+## NumPy is optional (not available in IronPython), typed arrays are used as fallback
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
+## python 3 compatibility
+try:
+	xrange
+except NameError:
+	xrange = range
 
 
 #################################################################### Field ####################################################################
 class Field(object):
+	'''
+	Voxel field, storing a value for each point of a regular grid.
+	Values are stored in a flat array, in the same z-y-x order of the field points (NumPy array when available, typed array otherwise).
+
+	Args:
+		name (str): Field name
+		pts ([Point3d]): Field points
+		count ([int]): Number of points in x, y and z direction
+		resolution (float): Distance between the field points
+		plane (Plane): Field plane (origin at the first field point)
+		values ([]): Field values (float or Vector3d)
+		boundaries ([Mesh]): Boundary geometries (values outside the boundaries are set to 0)
+		interpolate (bool): True to sample values with trilinear interpolation between the field points (otherwise the value of the voxel containing the point is returned)
+
+	Attributes:
+		values: Flat array of field values (index = x + y*x_count + z*x_count*y_count)
+		boundary_mask (bytearray): Cached inside/outside flags of the field points with respect to the boundaries
+		cell_coefficients: Cached trilinear interpolation coefficients of the cells, in a flat array (8 for each cell, cells have the same index of their first point)
+		is_tensor_field (bool): True if the values are vectors (stored in a list)
+	'''
 	
 	## constructor
-	def __init__(self, name, pts, count, resolution, plane = Plane.WorldXY, values = [], boundaries = []):
+	def __init__(self, name, pts, count, resolution, plane = Plane.WorldXY, values = [], boundaries = [], interpolate = False):
 		
 		self.name = name
 		self.pts = pts
@@ -39,8 +74,20 @@ class Field(object):
 		self.y_count = count[1]
 		self.z_count = count[2]
 		
-		self.vals = []
+		## plane origin and axes, used to compute the grid coordinates of a point
+		self.origin = (self.plane.Origin.X, self.plane.Origin.Y, self.plane.Origin.Z)
+		self.axes = [(axis.X, axis.Y, axis.Z) for axis in (self.plane.XAxis, self.plane.YAxis, self.plane.ZAxis)]
+		
+		self.values = None
 		self.boundaries = boundaries
+		self.boundary_mask = None
+		
+		## cached index of the highest value and indexes sorted by decreasing value
+		self.max_index = None
+		self.sorted_indexes = None
+		
+		self.interpolate = interpolate
+		self.cell_coefficients = None
 		
 		self.is_tensor_field = False
 
@@ -103,7 +150,7 @@ class Field(object):
 		for bl in data["boundaries"]:
 			boundaries_in.append(mesh_from_data(bl))
 		
-		field = cls(data["name"], pts_in, data["count"], data["resolution"], plane = plane_from_data(data['plane']), boundaries = boundaries_in)
+		field = cls(data["name"], pts_in, data["count"], data["resolution"], plane = plane_from_data(data['plane']), boundaries = boundaries_in, interpolate = data.get('interpolate', False))
 
 		## set values
 		field.set_values(data["values"])
@@ -119,6 +166,7 @@ class Field(object):
 		data['resolution'] = self.resolution
 		data['plane'] = plane_to_data(self.plane)
 		data['values'] = self.return_values_list()
+		data['interpolate'] = self.interpolate
 		data['boundaries'] = []
 		for bou in self.boundaries:
 			data['boundaries'].append(mesh_to_data(bou))
@@ -136,18 +184,38 @@ class Field(object):
 		for bt in boundaries_trans:
 			bt.Transform(trans)
 		
-		field_trans = Field(self.name, pts_trans, self.return_count_vec(), self.resolution, plane=plane_trans, values=self.return_values_list(), boundaries = boundaries_trans)
+		field_trans = Field(self.name, pts_trans, self.return_count_vec(), self.resolution, plane=plane_trans, boundaries = boundaries_trans, interpolate = self.interpolate)
+		## points and boundaries are transformed together, so values are already masked and the mask is still valid
+		field_trans.boundary_mask = self.boundary_mask
+		if self.values is not None:
+			field_trans.set_values(self.copy_values())
 		return field_trans
 	
 
+	## return a copy of the values array
+	def copy_values(self):
+		if self.is_tensor_field:
+			return [Vector3d(v) for v in self.values]
+		elif np is not None:
+			return self.values.copy()
+		return array('d', self.values)
+	
+
 	## return values as flattened list
 	def return_values_list(self):
-		values_list = []
-		for z in range(0, self.z_count):
-			for y in range(0, self.y_count):
-				for x in range(0, self.x_count):
-					values_list.append(self.vals[z][y][x])
-		return values_list
+		if self.values is None:
+			return []
+		if self.is_tensor_field:
+			return list(self.values)
+		return self.values.tolist()
+	
+
+	## return values as nested lists, in the form vals[z][y][x] (kept for compatibility, use return_value for single values)
+	@property
+	def vals(self):
+		values_list = self.return_values_list()
+		xy_count = self.x_count * self.y_count
+		return [[values_list[z*xy_count + y*self.x_count : z*xy_count + (y+1)*self.x_count] for y in range(self.y_count)] for z in range(self.z_count)]
 	
 
 	## return xyz counts vector
@@ -160,6 +228,16 @@ class Field(object):
 		return [[pt.X, pt.Y, pt.Z] for pt in self.pts]
 	
 
+	## return the flat index of the given grid coordinates
+	def return_index(self, x, y, z):
+		return x + y*self.x_count + z*self.x_count*self.y_count
+	
+
+	## return the value at the given grid coordinates
+	def return_value(self, x, y, z):
+		return self.values[x + y*self.x_count + z*self.x_count*self.y_count]
+	
+
 	## set values in an empty field
 	def set_values(self, values, use_boundaries = False):
 		try:
@@ -168,212 +246,267 @@ class Field(object):
 		except:
 			self.is_tensor_field = False
 		
-		pts_count = 0
-		
 		if len(values) > 0:
-			for z in range(0, self.z_count):
-				self.vals.append([])
-				for y in range(0, self.y_count):
-					self.vals[z].append([])
-					for x in range(0, self.x_count):
-						if use_boundaries and len(self.boundaries) > 0:
-							inside = False
-							for bou in self.boundaries:
-								if bou.IsPointInside(self.pts[pts_count], global_tolerance, True) == True:
-									self.vals[z][y].append(values[pts_count])
-									inside = True
-									break
-							if inside == False:
-								if self.is_tensor_field:
-									self.vals[z][y].append(Vector3d(0,0,0))
-								else:
-									self.vals[z][y].append(0.0)
-						else:
-							self.vals[z][y].append(values[pts_count])
-						pts_count += 1
-
-
-	## return value associated to the closest point of the field to the given point
+			if self.is_tensor_field:
+				self.values = list(values)
+			elif np is not None:
+				self.values = np.array(values, dtype=float)
+			else:
+				self.values = array('d', values)
+			
+			if use_boundaries and len(self.boundaries) > 0:
+				self.apply_boundary_mask()
+			
+			self.max_index = None
+			self.sorted_indexes = None
+			self.cell_coefficients = None
+	
+
+	## compute (once) which field points are inside the boundaries
+	def return_boundary_mask(self):
+		if self.boundary_mask is None:
+			mask = bytearray(len(self.pts))
+			for i in xrange(len(self.pts)):
+				for bou in self.boundaries:
+					if bou.IsPointInside(self.pts[i], global_tolerance, True) == True:
+						mask[i] = 1
+						break
+			self.boundary_mask = mask
+		return self.boundary_mask
+	
+
+	## set to 0 all values outside the boundaries
+	def apply_boundary_mask(self):
+		mask = self.return_boundary_mask()
+		if self.is_tensor_field:
+			for i in xrange(len(self.values)):
+				if mask[i] == 0:
+					self.values[i] = Vector3d(0,0,0)
+		elif np is not None:
+			self.values[np.frombuffer(bytes(mask), dtype=np.uint8) == 0] = 0.0
+		else:
+			for i in xrange(len(self.values)):
+				if mask[i] == 0:
+					self.values[i] = 0.0
+	
+
+	## return the grid coordinates of the voxel containing the given point (clamped to the field size)
+	def return_pt_coords(self, pt):
+		dx = pt.X - self.origin[0]
+		dy = pt.Y - self.origin[1]
+		dz = pt.Z - self.origin[2]
+		coords = []
+		for axis, count in zip(self.axes, (self.x_count, self.y_count, self.z_count)):
+			c = int(math.floor((dx*axis[0] + dy*axis[1] + dz*axis[2]) / self.resolution))
+			coords.append(min(max(c, 0), count-1))
+		return coords
+	
+
+	## return the continuous grid coordinates of the given point (clamped to the field size)
+	def return_pt_grid_coords(self, pt):
+		dx = pt.X - self.origin[0]
+		dy = pt.Y - self.origin[1]
+		dz = pt.Z - self.origin[2]
+		coords = []
+		for axis, count in zip(self.axes, (self.x_count, self.y_count, self.z_count)):
+			c = (dx*axis[0] + dy*axis[1] + dz*axis[2]) / self.resolution
+			coords.append(min(max(c, 0.0), count-1))
+		return coords
+	
+
+	## return the continuous grid coordinates of the given points as an (n,3) array (clamped to the field size)
+	def return_pts_grid_coords(self, pts):
+		coords = np.array([(pt.X, pt.Y, pt.Z) for pt in pts], dtype=float) - np.array(self.origin)
+		grid_coords = np.dot(coords, np.array(self.axes).T) / self.resolution
+		return np.clip(grid_coords, 0, np.array([self.x_count-1, self.y_count-1, self.z_count-1]), out=grid_coords)
+	
+
+	## compute (once) the trilinear interpolation coefficients of each cell, in the form (a0, ax, ay, az, axy, ayz, axz, axyz)
+	## each cell spans from a field point to the next ones along x, y and z (cells beyond the last points repeat the boundary values)
+	def return_cell_coefficients(self):
+		if self.cell_coefficients is None:
+			magnitudes = self.return_magnitudes()
+			if np is not None:
+				grid = np.pad(np.asarray(magnitudes, dtype=float).reshape(self.z_count, self.y_count, self.x_count), ((0,1),(0,1),(0,1)), mode='edge')
+				c000 = grid[:-1,:-1,:-1]
+				c100 = grid[:-1,:-1,1:]
+				c010 = grid[:-1,1:,:-1]
+				c110 = grid[:-1,1:,1:]
+				c001 = grid[1:,:-1,:-1]
+				c101 = grid[1:,:-1,1:]
+				c011 = grid[1:,1:,:-1]
+				c111 = grid[1:,1:,1:]
+				self.cell_coefficients = np.stack((c000, c100 - c000, c010 - c000, c001 - c000, c110 - c010 - c100 + c000,
+					c011 - c001 - c010 + c000, c101 - c001 - c100 + c000, c111 - c011 - c101 - c110 + c100 + c001 + c010 - c000), axis=-1).reshape(-1)
+			else:
+				coefficients = array('d')
+				for z in xrange(self.z_count):
+					z1 = min(z+1, self.z_count-1)
+					for y in xrange(self.y_count):
+						y1 = min(y+1, self.y_count-1)
+						for x in xrange(self.x_count):
+							x1 = min(x+1, self.x_count-1)
+							c000 = magnitudes[self.return_index(x, y, z)]
+							c100 = magnitudes[self.return_index(x1, y, z)]
+							c010 = magnitudes[self.return_index(x, y1, z)]
+							c110 = magnitudes[self.return_index(x1, y1, z)]
+							c001 = magnitudes[self.return_index(x, y, z1)]
+							c101 = magnitudes[self.return_index(x1, y, z1)]
+							c011 = magnitudes[self.return_index(x, y1, z1)]
+							c111 = magnitudes[self.return_index(x1, y1, z1)]
+							coefficients.extend((c000, c100 - c000, c010 - c000, c001 - c000, c110 - c010 - c100 + c000,
+								c011 - c001 - c010 + c000, c101 - c001 - c100 + c000, c111 - c011 - c101 - c110 + c100 + c001 + c010 - c000))
+				self.cell_coefficients = coefficients
+		return self.cell_coefficients
+	
+
+	## return the index of the cell containing the given point and the local coordinates of the point in the cell
+	def return_pt_cell(self, pt):
+		coords = self.return_pt_grid_coords(pt)
+		cell = [int(math.floor(c)) for c in coords]
+		return self.return_index(cell[0], cell[1], cell[2]), coords[0] - cell[0], coords[1] - cell[1], coords[2] - cell[2]
+	
+
+	## return the trilinear interpolation of the values (or of their magnitudes, for tensor fields) at the given point
+	def return_pt_interpolated_val(self, pt):
+		i, u, v, w = self.return_pt_cell(pt)
+		a = self.return_cell_coefficients()[i*8:i*8+8]
+		return a[0] + a[1]*u + a[2]*v + a[3]*w + a[4]*u*v + a[5]*v*w + a[6]*u*w + a[7]*u*v*w
+	
+
+	## return the gradient of the interpolated values at the given point (computed from the cell coefficients, in world coordinates)
+	def return_pt_gradient(self, pt):
+		i, u, v, w = self.return_pt_cell(pt)
+		a = self.return_cell_coefficients()[i*8:i*8+8]
+		grad = ((a[1] + a[4]*v + a[6]*w + a[7]*v*w) / self.resolution, (a[2] + a[4]*u + a[5]*w + a[7]*u*w) / self.resolution, (a[3] + a[5]*v + a[6]*u + a[7]*u*v) / self.resolution)
+		return Vector3d(*[grad[0]*self.axes[0][j] + grad[1]*self.axes[1][j] + grad[2]*self.axes[2][j] for j in range(3)])
+	
+
+	## return the gradients of the interpolated values at the given points
+	def return_pts_gradient(self, pts):
+		if len(pts) == 0:
+			return []
+		if np is None:
+			return [self.return_pt_gradient(pt) for pt in pts]
+		
+		grid_coords = self.return_pts_grid_coords(pts)
+		cells = np.floor(grid_coords).astype(int)
+		u, v, w = (grid_coords - cells).T
+		a = self.return_cell_coefficients().reshape(-1,8)[cells[:,0] + cells[:,1]*self.x_count + cells[:,2]*self.x_count*self.y_count]
+		grad = np.stack((a[:,1] + a[:,4]*v + a[:,6]*w + a[:,7]*v*w, a[:,2] + a[:,4]*u + a[:,5]*w + a[:,7]*u*w, a[:,3] + a[:,5]*v + a[:,6]*u + a[:,7]*u*v), axis=1) / self.resolution
+		return [Vector3d(g[0], g[1], g[2]) for g in np.dot(grad, np.array(self.axes)).tolist()]
+	
+
+	## return value associated to the closest point of the field to the given point (interpolated if required)
 	def return_pt_val(self, pt):
-		pt_trans = self.plane.RemapToPlaneSpace(pt)[1]
+		if self.interpolate and not self.is_tensor_field:
+			return self.return_pt_interpolated_val(pt)
+		x, y, z = self.return_pt_coords(pt)
+		return self.values[x + y*self.x_count + z*self.x_count*self.y_count]
+	
+
+	## return values associated to the closest points of the field to the given points (interpolated if required)
+	def return_pts_val(self, pts):
+		if len(pts) == 0:
+			return []
+		if np is None:
+			return [self.return_pt_val(pt) for pt in pts]
 		
-		x = int(math.floor(pt_trans.X/self.resolution))
-		y = int(math.floor(pt_trans.Y/self.resolution))
-		z = int(math.floor(pt_trans.Z/self.resolution))
+		if self.interpolate and not self.is_tensor_field:
+			grid_coords = self.return_pts_grid_coords(pts)
+			cells = np.floor(grid_coords).astype(int)
+			u, v, w = (grid_coords - cells).T
+			a = self.return_cell_coefficients().reshape(-1,8)[cells[:,0] + cells[:,1]*self.x_count + cells[:,2]*self.x_count*self.y_count]
+			return (a[:,0] + a[:,1]*u + a[:,2]*v + a[:,3]*w + a[:,4]*u*v + a[:,5]*v*w + a[:,6]*u*w + a[:,7]*u*v*w).tolist()
 		
-		value = self.vals[z][y][x]
-		return value
+		coords = np.array([(pt.X, pt.Y, pt.Z) for pt in pts], dtype=float) - np.array(self.origin)
+		grid_coords = np.floor(np.dot(coords, np.array(self.axes).T) / self.resolution).astype(int)
+		np.clip(grid_coords, 0, np.array([self.x_count-1, self.y_count-1, self.z_count-1]), out=grid_coords)
+		indexes = grid_coords[:,0] + grid_coords[:,1]*self.x_count + grid_coords[:,2]*self.x_count*self.y_count
+		if self.is_tensor_field:
+			return [self.values[i] for i in indexes]
+		return self.values[indexes].tolist()
+	
+
+	## check which of the given points are inside the field box
+	def return_pts_inside(self, pts):
+		if np is None or len(pts) == 0:
+			return [self.bbox.Contains(pt) for pt in pts]
+		
+		box_plane = self.bbox.Plane
+		box_origin = np.array([box_plane.Origin.X, box_plane.Origin.Y, box_plane.Origin.Z])
+		box_axes = np.array([[axis.X, axis.Y, axis.Z] for axis in (box_plane.XAxis, box_plane.YAxis, box_plane.ZAxis)])
+		box_min = np.array([self.bbox.X.Min, self.bbox.Y.Min, self.bbox.Z.Min])
+		box_max = np.array([self.bbox.X.Max, self.bbox.Y.Max, self.bbox.Z.Max])
+		
+		coords = np.dot(np.array([(pt.X, pt.Y, pt.Z) for pt in pts], dtype=float) - box_origin, box_axes.T)
+		return np.all((coords >= box_min) & (coords <= box_max), axis=1).tolist()
+	
+
+	## return the magnitude of each value (vector length for tensor fields)
+	def return_magnitudes(self):
+		if self.is_tensor_field:
+			return [v.Length for v in self.values]
+		return self.values
+	
+
+	## return the index of the highest value (first one in case of equal values), computed once
+	def return_max_index(self):
+		if self.max_index is None:
+			magnitudes = self.return_magnitudes()
+			if np is not None:
+				self.max_index = int(np.argmax(magnitudes))
+			else:
+				self.max_index = max(xrange(len(magnitudes)), key=magnitudes.__getitem__)
+		return self.max_index
+	
 
+	## return the indexes of all values sorted by decreasing value (keeping the original order for equal values), computed once
+	def return_sorted_indexes(self):
+		if self.sorted_indexes is None:
+			magnitudes = self.return_magnitudes()
+			if np is not None:
+				self.sorted_indexes = np.argsort(-np.asarray(magnitudes, dtype=float), kind='stable').tolist()
+			else:
+				self.sorted_indexes = sorted(xrange(len(magnitudes)), key=lambda i: -magnitudes[i])
+		return self.sorted_indexes
+	
 
 	## find and return highest value in the field ########################### TO FIX FOR ORIENTABLE FIELD!!!
 	def return_highest_pt(self, constraints = None):
-		max_val = -1
-		max_coords = None
+		magnitudes = self.return_magnitudes()
 		max_count = -1
-		count = 0
-		highest_pt = None
 		
-		for z in range(0, self.z_count):
-			for y in range(0, self.y_count):
-				for x in range(0, self.x_count):
-					value = self.vals[z][y][x]
-					## tensor field aggregation (WIP)
-					if self.is_tensor_field:
-						if value.Length > max_val:
-							if constraints is not None:
-								constraint_check = False
-								pt = Point3d(x*self.resolution, y*self.resolution, z*self.resolution)
-								pt += self.bbox.Min
-								for constraint in constraints:
-									if constraint.check_soft(pt) == False:
-										constraint_check = True
-										break
-								if constraint_check == False:
-									max_val = value.Length
-									max_coords = (x,y,z)
-							else:
-								max_val = value.Length
-								max_coords = (x,y,z)
-					else:
-						if value > max_val:
-							if constraints is not None:
-								constraint_check = False
-								#pt = Point3d(x*self.resolution, y*self.resolution, z*self.resolution)
-								#pt += self.bbox.Min
-								pt = self.pts[count]
-								for constraint in constraints:
-									if constraint.check_soft(pt) == False:
-										constraint_check = True
-										break
-								if constraint_check == False:
-									max_val = value
-									max_coords = (x,y,z)
-									max_count = count
-							else:
-								max_val = value
-								max_coords = (x,y,z)
-								max_count = count
-					count += 1
+		if constraints is None:
+			if magnitudes[self.return_max_index()] > -1:
+				max_count = self.return_max_index()
+		else:
+			## scan values from the highest, until one satisfies all constraints
+			for index in self.return_sorted_indexes():
+				if magnitudes[index] <= -1:
+					break
+				pt = self.pts[index]
+				constraint_check = False
+				for constraint in constraints:
+					if constraint.check_soft(pt) == False:
+						constraint_check = True
+						break
+				if constraint_check == False:
+					max_count = index
+					break
 
 		highest_pt = Plane(self.pts[max_count], self.plane.XAxis, self.plane.YAxis)
 		return highest_pt
 	
 
-	def compute_voxel_mesh(self, iso, cap = True):
-		voxel_mesh = Mesh()
-		for z in xrange(self.z_count):
-			for y in xrange(self.y_count):
-				for x in xrange(self.x_count):
-					if self.vals[z][y][x] > iso:
-						if x == 0:
-							if cap:
-								index = voxel_mesh.Vertices.Count
-								voxel_mesh.Vertices.Add(x,y,z)
-								voxel_mesh.Vertices.Add(x,y+1,z)
-								voxel_mesh.Vertices.Add(x,y+1,z+1)
-								voxel_mesh.Vertices.Add(x,y,z+1)
-								voxel_mesh.Faces.AddFace(index + 2, index + 1, index + 0)
-								voxel_mesh.Faces.AddFace(index + 3, index + 2, index + 0)
-						elif self.vals[z][y][x-1] < iso:
-							index = voxel_mesh.Vertices.Count
-							voxel_mesh.Vertices.Add(x,y,z)
-							voxel_mesh.Vertices.Add(x,y+1,z)
-							voxel_mesh.Vertices.Add(x,y+1,z+1)
-							voxel_mesh.Vertices.Add(x,y,z+1)
-							voxel_mesh.Faces.AddFace(index + 2, index + 1, index + 0)
-							voxel_mesh.Faces.AddFace(index + 3, index + 2, index + 0)
-							
-						if x == self.x_count-1:
-							if cap:
-								index = voxel_mesh.Vertices.Count
-								voxel_mesh.Vertices.Add(x+1,y,z)
-								voxel_mesh.Vertices.Add(x+1,y+1,z)
-								voxel_mesh.Vertices.Add(x+1,y+1,z+1)
-								voxel_mesh.Vertices.Add(x+1,y,z+1)
-								voxel_mesh.Faces.AddFace(index + 0, index + 1, index + 2)
-								voxel_mesh.Faces.AddFace(index + 0, index + 2, index + 3)
-						elif self.vals[z][y][x+1] < iso:
-							index = voxel_mesh.Vertices.Count
-							voxel_mesh.Vertices.Add(x+1,y,z)
-							voxel_mesh.Vertices.Add(x+1,y+1,z)
-							voxel_mesh.Vertices.Add(x+1,y+1,z+1)
-							voxel_mesh.Vertices.Add(x+1,y,z+1)
-							voxel_mesh.Faces.AddFace(index + 0, index + 1, index + 2)
-							voxel_mesh.Faces.AddFace(index + 0, index + 2, index + 3)
-							
-						if y == 0:
-							if cap:
-								index = voxel_mesh.Vertices.Count
-								voxel_mesh.Vertices.Add(x,y,z)
-								voxel_mesh.Vertices.Add(x+1,y,z)
-								voxel_mesh.Vertices.Add(x+1,y,z+1)
-								voxel_mesh.Vertices.Add(x,y,z+1)
-								voxel_mesh.Faces.AddFace(index + 0, index + 1, index + 2)
-								voxel_mesh.Faces.AddFace(index + 0, index + 2, index + 3)
-						elif self.vals[z][y-1][x] < iso:
-							index = voxel_mesh.Vertices.Count
-							voxel_mesh.Vertices.Add(x,y,z)
-							voxel_mesh.Vertices.Add(x+1,y,z)
-							voxel_mesh.Vertices.Add(x+1,y,z+1)
-							voxel_mesh.Vertices.Add(x,y,z+1)
-							voxel_mesh.Faces.AddFace(index + 0, index + 1, index + 2)
-							voxel_mesh.Faces.AddFace(index + 0, index + 2, index + 3)
-							
-						if y == self.y_count - 1:
-							if cap:
-								index = voxel_mesh.Vertices.Count
-								voxel_mesh.Vertices.Add(x,y+1,z)
-								voxel_mesh.Vertices.Add(x+1,y+1,z)
-								voxel_mesh.Vertices.Add(x+1,y+1,z+1)
-								voxel_mesh.Vertices.Add(x,y+1,z+1)
-								voxel_mesh.Faces.AddFace(index + 2, index + 1, index + 0)
-								voxel_mesh.Faces.AddFace(index + 3, index + 2, index + 0)
-						elif self.vals[z][y+1][x] < iso:
-							index = voxel_mesh.Vertices.Count
-							voxel_mesh.Vertices.Add(x,y+1,z)
-							voxel_mesh.Vertices.Add(x+1,y+1,z)
-							voxel_mesh.Vertices.Add(x+1,y+1,z+1)
-							voxel_mesh.Vertices.Add(x,y+1,z+1)
-							voxel_mesh.Faces.AddFace(index + 2, index + 1, index + 0)
-							voxel_mesh.Faces.AddFace(index + 3, index + 2, index + 0)
-							
-						if z == 0:
-							if cap:
-								index = voxel_mesh.Vertices.Count
-								voxel_mesh.Vertices.Add(x,y,z)
-								voxel_mesh.Vertices.Add(x+1,y,z)
-								voxel_mesh.Vertices.Add(x+1,y+1,z)
-								voxel_mesh.Vertices.Add(x,y+1,z)
-								voxel_mesh.Faces.AddFace(index + 2, index + 1, index + 0)
-								voxel_mesh.Faces.AddFace(index + 3, index + 2, index + 0)
-						elif self.vals[z-1][y][x] < iso:
-							index = voxel_mesh.Vertices.Count
-							voxel_mesh.Vertices.Add(x,y,z)
-							voxel_mesh.Vertices.Add(x+1,y,z)
-							voxel_mesh.Vertices.Add(x+1,y+1,z)
-							voxel_mesh.Vertices.Add(x,y+1,z)
-							voxel_mesh.Faces.AddFace(index + 2, index + 1, index + 0)
-							voxel_mesh.Faces.AddFace(index + 3, index + 2, index + 0)
-							
-						if z == self.z_count - 1:
-							if cap:
-								index = voxel_mesh.Vertices.Count
-								voxel_mesh.Vertices.Add(x,y,z+1)
-								voxel_mesh.Vertices.Add(x+1,y,z+1)
-								voxel_mesh.Vertices.Add(x+1,y+1,z+1)
-								voxel_mesh.Vertices.Add(x,y+1,z+1)
-								voxel_mesh.Faces.AddFace(index + 0, index + 1, index + 2)
-								voxel_mesh.Faces.AddFace(index + 0, index + 2, index + 3)
-						elif self.vals[z+1][y][x] < iso:
-							index = voxel_mesh.Vertices.Count
-							voxel_mesh.Vertices.Add(x,y,z+1)
-							voxel_mesh.Vertices.Add(x+1,y,z+1)
-							voxel_mesh.Vertices.Add(x+1,y+1,z+1)
-							voxel_mesh.Vertices.Add(x,y+1,z+1)
-							voxel_mesh.Faces.AddFace(index + 0, index + 1, index + 2)
-							voxel_mesh.Faces.AddFace(index + 0, index + 2, index + 3)
-							
-		voxel_mesh.Weld(math.pi)
+	## compute the voxel mesh of the values higher than the iso value (see wasp.field.meshing.mesh_from_voxels)
+	def compute_voxel_mesh(self, iso, cap = True, merge = False):
+		magnitudes = self.return_magnitudes()
+		if np is not None:
+			solid = np.asarray(magnitudes, dtype=float) > iso
+		else:
+			solid = [v > iso for v in magnitudes]
+		voxel_mesh = mesh_from_voxels(solid, self.return_count_vec(), cap, merge)
 
 		scale_transform = Transform.Scale(Point3d(0,0,0), self.resolution) 
 		voxel_mesh.Transform(scale_transform)
@@ -385,4 +518,45 @@ class Field(object):
 		voxel_mesh.Translate(-self.resolution/2, -self.resolution/2, -self.resolution/2)
 
 		voxel_mesh.RebuildNormals()
-		return voxel_mesh
\ No newline at end of file
+		return voxel_mesh
+	
+
+	## compute the smooth iso-surface mesh of the values at the iso value, with marching cubes (see wasp.field.meshing.mesh_from_iso_values)
+	def compute_iso_mesh(self, iso, cap = True):
+		iso_mesh = mesh_from_iso_values(self.return_magnitudes(), self.return_count_vec(), iso, cap)
+
+		scale_transform = Transform.Scale(Point3d(0,0,0), self.resolution)
+		iso_mesh.Transform(scale_transform)
+
+		s_pt = self.bbox.PointAt(0,0,0)
+		s_plane = Plane(s_pt, self.plane.XAxis, self.plane.YAxis)
+		orient_transform = Transform.PlaneToPlane(Plane.WorldXY, s_plane)
+		iso_mesh.Transform(orient_transform)
+
+		iso_mesh.RebuildNormals()
+		return iso_mesh	
+
+	## return the grid index of the slice at the given parameter (0 to 1) along an axis (0: x, 1: y, 2: z)
+	def return_slice_index(self, t, axis):
+		count = self.return_count_vec()[axis]
+		return min(max(int(math.floor(count*t)), 0), count-1)
+	
+
+	## compute the isolines of the values on slices of the field, for all given slices and iso values at once (see wasp.field.contours.isolines_from_values)
+	## slices are grid indexes along the axis (0: x, 1: y, 2: z), isolines are returned as nested lists of polylines in the form isolines[slice][iso]
+	def compute_isolines(self, isos, slices, axis = 2):
+		grid_isolines = isolines_from_values(self.return_magnitudes(), self.return_count_vec(), axis, slices, isos)
+
+		s_pt = self.bbox.PointAt(0,0,0)
+		origin = (s_pt.X, s_pt.Y, s_pt.Z)
+		x_axis, y_axis, z_axis = [[c*self.resolution for c in axis_vec] for axis_vec in self.axes]
+		isolines = []
+		for slice_isolines in grid_isolines:
+			isolines.append([])
+			for iso_isolines in slice_isolines:
+				polylines = []
+				for chain in iso_isolines:
+					pts = [Point3d(origin[0] + x*x_axis[0] + y*y_axis[0] + z*z_axis[0], origin[1] + x*x_axis[1] + y*y_axis[1] + z*z_axis[1], origin[2] + x*x_axis[2] + y*y_axis[2] + z*z_axis[2]) for x, y, z in chain]
+					polylines.append(Polyline(pts))
+				isolines[-1].append(polylines)
+		return isolines
\ No newline at end of file
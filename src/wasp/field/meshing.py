@@ -0,0 +1,370 @@
+"""
+(C) 2017-2020 Andrea Rossi <ghwasp@gmail.com>
+
+This file is part of Wasp. https://github.com/ar0551/Wasp
+@license GPL-3.0 <https://www.gnu.org/licenses/gpl.html>
+
+@version 0.5.001
+
+Iso-surface meshing of voxel fields
+"""
+
+from wasp.geometry import Mesh
+
+## NumPy is optional (not available in IronPython), plain loops are used as fallback
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
+## python 3 compatibility
+try:
+	xrange
+except NameError:
+	xrange = range
+
+
+## axes of the voxel faces, in the form (normal, u, v) (u and v are ordered so that u x v = normal)
+VOXEL_FACE_AXES = ((0, 1, 2), (1, 2, 0), (2, 0, 1))
+
+
+## merge runs of faces with the same extent in consecutive rows into rectangles
+## runs are given in the form (row, start, end) sorted by row, rectangles are returned in the form (start, end, row_start, row_end)
+def merge_face_runs(runs):
+	rects = []
+	open_rects = {}
+	for row, start, end in runs:
+		rect = open_rects.get((start, end))
+		if rect is not None and rect[3] == row:
+			rect[3] = row + 1
+		else:
+			if rect is not None:
+				rects.append(rect)
+			open_rects[(start, end)] = [start, end, row, row + 1]
+	rects.extend(open_rects.values())
+	rects.sort()
+	return rects
+
+
+## return the lattice ids of the corners of a voxel face rectangle (counter-clockwise around the face normal)
+def voxel_quad(axes, p, u0, u1, v0, v1, lattice_steps, positive):
+	step_p = lattice_steps[axes[0]]
+	step_u = lattice_steps[axes[1]]
+	step_v = lattice_steps[axes[2]]
+	base = p*step_p
+	quad = (base + u0*step_u + v0*step_v, base + u1*step_u + v0*step_v, base + u1*step_u + v1*step_v, base + u0*step_u + v1*step_v)
+	if positive:
+		return quad
+	return (quad[0], quad[3], quad[2], quad[1])
+
+
+## compute the faces of the solid voxels facing empty voxels (or the field boundary if cap is True), using array shifts
+## faces are returned as an (n,4) array of vertex ids on the lattice of voxel corners
+def voxel_quads_np(solid, count, cap = True, merge = False):
+	x_count, y_count, z_count = count
+	lattice_steps = (1, x_count+1, (x_count+1)*(y_count+1))
+
+	## solid flags in z-y-x order, padded with empty voxels (or with a copy of the boundary voxels when boundary faces are not capped)
+	padded = np.pad(np.asarray(solid, dtype=bool).reshape(z_count, y_count, x_count), 1, mode='constant' if cap else 'edge')
+	## solid flags of each axis, in v-u-normal order
+	axis_solids = [padded[1:-1,1:-1,:], padded[1:-1,:,1:-1].transpose(2,0,1), padded[:,1:-1,1:-1].transpose(1,2,0)]
+
+	quads = []
+	for axis in range(3):
+		axes = VOXEL_FACE_AXES[axis]
+		axis_solid = axis_solids[axis]
+		lower = axis_solid[:,:,:-1]
+		upper = axis_solid[:,:,1:]
+		for positive, faces in ((True, lower & ~upper), (False, upper & ~lower)):
+			if merge:
+				for p in np.nonzero(faces.any(axis=(0,1)))[0].tolist():
+					## runs of faces along u in each row, found as steps of the padded face flags
+					steps = np.diff(np.pad(faces[:,:,p], ((0,0),(1,1)), mode='constant').astype(np.int8), axis=1)
+					starts = np.nonzero(steps == 1)
+					ends = np.nonzero(steps == -1)[1]
+					runs = zip(starts[0].tolist(), starts[1].tolist(), ends.tolist())
+					for u0, u1, v0, v1 in merge_face_runs(runs):
+						quads.append(voxel_quad(axes, p, u0, u1, v0, v1, lattice_steps, positive))
+			else:
+				v, u, p = np.nonzero(faces)
+				base = p*lattice_steps[axes[0]] + u*lattice_steps[axes[1]] + v*lattice_steps[axes[2]]
+				corners = [base, base + lattice_steps[axes[1]], base + lattice_steps[axes[1]] + lattice_steps[axes[2]], base + lattice_steps[axes[2]]]
+				if not positive:
+					corners = [corners[0], corners[3], corners[2], corners[1]]
+				quads.append(np.stack(corners, axis=1))
+
+	if merge:
+		return np.array(quads, dtype=int).reshape(-1,4)
+	return np.concatenate(quads)
+
+
+## compute the faces of the solid voxels facing empty voxels (or the field boundary if cap is True), without NumPy
+## faces are returned as a list of tuples of vertex ids on the lattice of voxel corners
+def voxel_quads(solid, count, cap = True, merge = False):
+	lattice_steps = (1, count[0]+1, (count[0]+1)*(count[1]+1))
+	value_steps = (1, count[0], count[0]*count[1])
+
+	quads = []
+	for axis in range(3):
+		axes = VOXEL_FACE_AXES[axis]
+		p_count, u_count, v_count = [count[a] for a in axes]
+		p_step, u_step, v_step = [value_steps[a] for a in axes]
+		for positive in (True, False):
+			for p in xrange(p_count+1):
+				## faces on the field boundary
+				if (p == 0 or p == p_count) and not cap:
+					continue
+				runs = []
+				for v in xrange(v_count):
+					start = None
+					for u in xrange(u_count+1):
+						face = False
+						if u < u_count:
+							i = u*u_step + v*v_step
+							lower = solid[i + (p-1)*p_step] if p > 0 else False
+							upper = solid[i + p*p_step] if p < p_count else False
+							face = (lower and not upper) if positive else (upper and not lower)
+						if face and start is None:
+							start = u
+						elif not face and start is not None:
+							runs.append((v, start, u))
+							start = None
+				if merge:
+					rects = merge_face_runs(runs)
+				else:
+					rects = [(u0, u0+1, v, v+1) for v, start, end in runs for u0 in xrange(start, end)]
+				for u0, u1, v0, v1 in rects:
+					quads.append(voxel_quad(axes, p, u0, u1, v0, v1, lattice_steps, positive))
+	return quads
+
+
+## create the voxel mesh of the given solid flags (in z-y-x order), with vertices at the voxel corners in grid units
+## vertices are shared between faces through their lattice id, so no weld is needed
+## if merge is True, adjacent coplanar faces are merged greedily into rectangles (vertices might lie on the edges of larger faces)
+def mesh_from_voxels(solid, count, cap = True, merge = False):
+	mesh = Mesh()
+	x_lattice = count[0] + 1
+	xy_lattice = (count[0] + 1) * (count[1] + 1)
+
+	if np is not None:
+		quads = voxel_quads_np(solid, count, cap, merge)
+		lattice_ids, faces = np.unique(quads, return_inverse=True)
+		faces = faces.reshape(-1,4).tolist()
+		lattice_ids = lattice_ids.tolist()
+	else:
+		quads = voxel_quads(solid, count, cap, merge)
+		vertex_ids = {}
+		lattice_ids = []
+		faces = []
+		for quad in quads:
+			face = []
+			for lattice_id in quad:
+				vertex_id = vertex_ids.get(lattice_id)
+				if vertex_id is None:
+					vertex_id = len(lattice_ids)
+					vertex_ids[lattice_id] = vertex_id
+					lattice_ids.append(lattice_id)
+				face.append(vertex_id)
+			faces.append(face)
+
+	for lattice_id in lattice_ids:
+		mesh.Vertices.Add(lattice_id % x_lattice, (lattice_id % xy_lattice) // x_lattice, lattice_id // xy_lattice)
+	for face in faces:
+		mesh.Faces.AddFace(face[0], face[1], face[2], face[3])
+	return mesh
+
+
+## corners of the marching cubes cells, as grid offsets (x, y, z)
+CUBE_CORNERS = ((0,0,0), (1,0,0), (1,1,0), (0,1,0), (0,0,1), (1,0,1), (1,1,1), (0,1,1))
+## edges of the marching cubes cells, as pairs of corners (from the lower to the higher grid point)
+CUBE_EDGES = ((0,1), (1,2), (3,2), (0,3), (4,5), (5,6), (7,6), (4,7), (0,4), (1,5), (2,6), (3,7))
+## faces of the marching cubes cells, as corners ordered counter-clockwise when seen from outside the cell
+CUBE_FACES = ((0,3,2,1), (4,5,6,7), (0,1,5,4), (3,7,6,2), (0,4,7,3), (1,2,6,5))
+
+
+## compute the triangles of each marching cubes case (bit i of the case is set if corner i is inside), as triples of cell edges
+## the segments of the iso-surface on each cell face are found first, separating the inside corners on ambiguous faces (so that neighbour cells always agree),
+## then they are joined in closed loops, triangulated as fans (triangles are oriented towards the outside values)
+## the fan of each loop starts from a vertex not sharing any face with the other ones, so that no diagonal lies on a cell face
+def marching_cubes_table():
+	edge_ids = {}
+	for i in range(len(CUBE_EDGES)):
+		edge_ids[CUBE_EDGES[i]] = i
+		edge_ids[CUBE_EDGES[i][::-1]] = i
+	face_edges = [set(edge_ids[(face[i], face[(i+1) % 4])] for i in range(4)) for face in CUBE_FACES]
+
+	table = []
+	for case in range(256):
+		inside = [(case >> c) & 1 == 1 for c in range(8)]
+		next_edges = {}
+		for face in CUBE_FACES:
+			## crossed edges met walking around the face, flagged if the walk enters the inside
+			crossings = []
+			for i in range(4):
+				if inside[face[i]] != inside[face[(i+1) % 4]]:
+					crossings.append((edge_ids[(face[i], face[(i+1) % 4])], inside[face[(i+1) % 4]]))
+			## each segment goes from the crossing entering the inside to the following one
+			for i in range(len(crossings)):
+				if crossings[i][1]:
+					next_edges[crossings[i][0]] = crossings[(i+1) % len(crossings)][0]
+
+		triangles = []
+		while len(next_edges) > 0:
+			loop = [min(next_edges)]
+			edge = next_edges.pop(loop[0])
+			while edge != loop[0]:
+				loop.append(edge)
+				edge = next_edges.pop(edge)
+			for i in range(len(loop)):
+				diagonals = [loop[(i+j) % len(loop)] for j in range(2, len(loop)-1)]
+				if not any(loop[i] in edges and e in edges for edges in face_edges for e in diagonals):
+					loop = loop[i:] + loop[:i]
+					break
+			for i in range(1, len(loop)-1):
+				triangles.append((loop[0], loop[i], loop[i+1]))
+		table.append(triangles)
+	return table
+
+
+MARCHING_CUBES_TABLE = marching_cubes_table()
+
+
+## compute the iso-surface triangles of the given values (in z-y-x order) with marching cubes, processing all cells in one array pass
+## values higher than the iso value are inside, if cap is True the surface is closed on the field boundary
+## vertices are returned as an (n,3) array of grid coordinates (one for each crossed grid edge), triangles as an (n,3) array of vertex ids
+def marching_cubes_np(values, count, iso, cap = True):
+	x_count, y_count, z_count = count
+	grid = np.asarray(values, dtype=float).reshape(z_count, y_count, x_count)
+	if cap:
+		## pad the field with outside values (vertices on the padding edges are moved to the boundary points)
+		grid = np.pad(grid, 1, mode='constant', constant_values=min(iso, float(grid.min())) - 1.0)
+	grid_count = (grid.shape[2], grid.shape[1], grid.shape[0])
+	grid_steps = (1, grid_count[0], grid_count[0]*grid_count[1])
+	values_flat = grid.reshape(-1)
+
+	## case index of all cells
+	inside = grid > iso
+	cells_shape = (grid_count[2]-1, grid_count[1]-1, grid_count[0]-1)
+	cases = np.zeros(cells_shape, dtype=np.int32)
+	for c in range(8):
+		x, y, z = CUBE_CORNERS[c]
+		cases |= inside[z:z+cells_shape[0], y:y+cells_shape[1], x:x+cells_shape[2]].astype(np.int32) << c
+
+	## triangles of the cells crossed by the iso-surface, as grid edge ids (3 * start point index + axis)
+	cz, cy, cx = np.nonzero((cases != 0) & (cases != 255))
+	cell_cases = cases[cz, cy, cx]
+	cell_bases = cx + cy*grid_steps[1] + cz*grid_steps[2]
+	table_size = max(len(triangles) for triangles in MARCHING_CUBES_TABLE)
+	table = np.full((256, table_size, 3), -1, dtype=int)
+	for case in range(256):
+		if len(MARCHING_CUBES_TABLE[case]) > 0:
+			table[case, :len(MARCHING_CUBES_TABLE[case])] = MARCHING_CUBES_TABLE[case]
+	edge_offsets = np.array([CUBE_CORNERS[a][0]*grid_steps[0] + CUBE_CORNERS[a][1]*grid_steps[1] + CUBE_CORNERS[a][2]*grid_steps[2] for a, b in CUBE_EDGES])
+	edge_axes = np.array([[CUBE_CORNERS[b][i] - CUBE_CORNERS[a][i] for i in range(3)].index(1) for a, b in CUBE_EDGES])
+	cell_ids, triangle_ids = np.nonzero(table[cell_cases, :, 0] >= 0)
+	cell_edges = table[cell_cases[cell_ids], triangle_ids]
+	edge_ids = (cell_bases[cell_ids][:,None] + edge_offsets[cell_edges]) * 3 + edge_axes[cell_edges]
+
+	## one vertex for each crossed edge, linearly interpolated between its end points
+	edges, triangles = np.unique(edge_ids, return_inverse=True)
+	starts = edges // 3
+	axes = edges % 3
+	steps = np.array(grid_steps)[axes]
+	start_values = values_flat[starts]
+	t = (iso - start_values) / (values_flat[starts + steps] - start_values)
+	vertices = np.stack((starts % grid_count[0], (starts // grid_count[0]) % grid_count[1], starts // grid_steps[2]), axis=1).astype(float)
+	vertices[np.arange(len(edges)), axes] += t
+	triangles = triangles.reshape(-1,3)
+
+	if cap:
+		vertices -= 1.0
+		clipped = np.clip(vertices, 0, np.array(count) - 1)
+		## vertices moved to the boundary points are merged with the ones of the same point
+		moved = np.any(clipped != vertices, axis=1)
+		if np.any(moved):
+			points = clipped.astype(int)
+			keys = np.where(moved, len(values_flat)*3 + points[:,0] + points[:,1]*x_count + points[:,2]*x_count*y_count, edges)
+			keys, first, vertex_ids = np.unique(keys, return_index=True, return_inverse=True)
+			triangles = vertex_ids.reshape(-1)[triangles]
+			clipped = clipped[first]
+			## triangles collapsed on a boundary point are removed
+			triangles = triangles[(triangles[:,0] != triangles[:,1]) & (triangles[:,1] != triangles[:,2]) & (triangles[:,2] != triangles[:,0])]
+		vertices = clipped
+	return vertices, triangles
+
+
+## compute the iso-surface triangles of the given values (in z-y-x order) with marching cubes, without NumPy
+## vertices are returned as a list of grid coordinates (one for each crossed grid edge), triangles as a list of vertex ids triples
+def marching_cubes(values, count, iso, cap = True):
+	x_count, y_count, z_count = count
+	xy_count = x_count * y_count
+	outside_value = min(iso, min(values)) - 1.0
+	## cells are iterated from -1 when capping, so that they include the (outside) values beyond the boundary
+	start = -1 if cap else 0
+	end = 0 if cap else -1
+
+	vertex_ids = {}
+	vertices = []
+	triangles = []
+	for z in xrange(start, z_count + end):
+		for y in xrange(start, y_count + end):
+			for x in xrange(start, x_count + end):
+				corner_values = []
+				case = 0
+				for c in range(8):
+					px = x + CUBE_CORNERS[c][0]
+					py = y + CUBE_CORNERS[c][1]
+					pz = z + CUBE_CORNERS[c][2]
+					if 0 <= px < x_count and 0 <= py < y_count and 0 <= pz < z_count:
+						v = values[px + py*x_count + pz*xy_count]
+					else:
+						v = outside_value
+					corner_values.append(v)
+					if v > iso:
+						case |= 1 << c
+				if case == 0 or case == 255:
+					continue
+
+				for triangle in MARCHING_CUBES_TABLE[case]:
+					ids = []
+					for e in triangle:
+						a, b = CUBE_EDGES[e]
+						pt = [x + CUBE_CORNERS[a][0], y + CUBE_CORNERS[a][1], z + CUBE_CORNERS[a][2]]
+						axis = [CUBE_CORNERS[b][i] - CUBE_CORNERS[a][i] for i in range(3)].index(1)
+						key = (pt[0], pt[1], pt[2], axis)
+						if corner_values[a] <= outside_value:
+							## edges from outside the field are moved to their boundary point
+							pt[axis] += 1
+							key = (pt[0], pt[1], pt[2], -1)
+						elif corner_values[b] <= outside_value:
+							key = (pt[0], pt[1], pt[2], -1)
+						else:
+							pt[axis] += (iso - corner_values[a]) / (corner_values[b] - corner_values[a])
+						vertex_id = vertex_ids.get(key)
+						if vertex_id is None:
+							vertex_id = len(vertices)
+							vertex_ids[key] = vertex_id
+							vertices.append(pt)
+						ids.append(vertex_id)
+					## triangles collapsed on a boundary point are skipped
+					if ids[0] != ids[1] and ids[1] != ids[2] and ids[2] != ids[0]:
+						triangles.append(ids)
+	return vertices, triangles
+
+
+## create the iso-surface mesh of the given values (in z-y-x order) with marching cubes, with vertices in grid units
+## values higher than the iso value are inside (triangles face the lower values), if cap is True the surface is closed on the field boundary
+def mesh_from_iso_values(values, count, iso, cap = True):
+	mesh = Mesh()
+	if np is not None:
+		vertices, triangles = marching_cubes_np(values, count, iso, cap)
+		vertices = vertices.tolist()
+		triangles = triangles.tolist()
+	else:
+		vertices, triangles = marching_cubes(values, count, iso, cap)
+
+	for v in vertices:
+		mesh.Vertices.Add(v[0], v[1], v[2])
+	for triangle in triangles:
+		mesh.Faces.AddFace(triangle[0], triangle[1], triangle[2])
+	return mesh
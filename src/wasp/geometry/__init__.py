@@ -6,5 +6,28 @@ This file is part of Wasp. https://github.com/ar0551/Wasp
 
 @version 0.5.001
 
-WIP - Wasp geometry library for interoperability between different softwares
-"""
\ No newline at end of file
+Geometry backend used by the Wasp engine.
+RhinoCommon is used when available (inside Rhino/Grasshopper), otherwise a NumPy implementation
+of the same classes is loaded, so that the engine can run in any Python interpreter.
+The NumPy backend can be forced by setting the WASP_GEOMETRY_BACKEND environment variable to 'numpy'.
+"""
+
+import os
+
+
+GEOMETRY_BACKEND = None
+
+if os.environ.get('WASP_GEOMETRY_BACKEND', 'rhino').lower() != 'numpy':
+	try:
+		from Rhino.Geometry import Point3d, Vector3d, Plane, Transform, Interval
+		from Rhino.Geometry import BoundingBox, Box, Mesh, Line, LineCurve, Polyline
+		from Rhino.Geometry.Intersect import Intersection
+		GEOMETRY_BACKEND = 'rhino'
+	except ImportError:
+		pass
+
+if GEOMETRY_BACKEND is None:
+	from wasp.geometry.numpy_backend import Point3d, Vector3d, Plane, Transform, Interval
+	from wasp.geometry.numpy_backend import BoundingBox, Box, Mesh, Line, LineCurve, Polyline
+	from wasp.geometry.numpy_backend import Intersection
+	GEOMETRY_BACKEND = 'numpy'
@@ -0,0 +1,1325 @@
+"""
+(C) 2017-2020 Andrea Rossi <ghwasp@gmail.com>
+
+This file is part of Wasp. https://github.com/ar0551/Wasp
+@license GPL-3.0 <https://www.gnu.org/licenses/gpl.html>
+
+@version 0.5.001
+
+NumPy implementation of the geometry classes used by Wasp (subset of the RhinoCommon API)
+"""
+
+import math
+
+import numpy as np
+
+
+## distance below which two geometries are considered touching rather than intersecting
+EPSILON = 1e-6
+
+## skewed direction used for ray casting (avoids hitting mesh edges on axis-aligned geometry)
+RAY_DIRECTION = np.array([0.5773491, 0.5773525, 0.5773486])
+
+
+#################################################################### Utilities ####################################################################
+class _ClassProperty(object):
+	## static property returning a new value at each access (as RhinoCommon value types)
+	def __init__(self, getter):
+		self.getter = getter
+
+	def __get__(self, instance, owner):
+		return self.getter(owner)
+
+
+## return the coordinates of a point or vector as a numpy array
+def _to_array(pt):
+	return np.array([pt.X, pt.Y, pt.Z], dtype=float)
+
+
+## row-wise dot product
+def _dot(a, b):
+	return np.einsum('...i,...i->...', a, b)
+
+
+## closest points on a set of triangles (a, b, c arrays of shape (n,3)) to a point (Ericson, Real-Time Collision Detection 5.1.5)
+def _closest_points_on_triangles(p, a, b, c):
+	ab = b - a
+	ac = c - a
+	ap = p - a
+	bp = p - b
+	cp = p - c
+	d1 = _dot(ab, ap)
+	d2 = _dot(ac, ap)
+	d3 = _dot(ab, bp)
+	d4 = _dot(ac, bp)
+	d5 = _dot(ab, cp)
+	d6 = _dot(ac, cp)
+	va = d3*d6 - d5*d4
+	vb = d5*d2 - d1*d6
+	vc = d1*d4 - d3*d2
+
+	with np.errstate(divide='ignore', invalid='ignore'):
+		## regions are applied from the lowest to the highest priority
+		denom = va + vb + vc
+		denom[denom == 0] = 1.0
+		result = a + ab * (vb / denom)[:,None] + ac * (vc / denom)[:,None]
+
+		w = (d4 - d3) / ((d4 - d3) + (d5 - d6))
+		mask = (va <= 0) & (d4 - d3 >= 0) & (d5 - d6 >= 0)
+		result = np.where(mask[:,None], b + (c - b) * np.nan_to_num(w)[:,None], result)
+
+		w = d2 / (d2 - d6)
+		mask = (vb <= 0) & (d2 >= 0) & (d6 <= 0)
+		result = np.where(mask[:,None], a + ac * np.nan_to_num(w)[:,None], result)
+
+		mask = (d6 >= 0) & (d5 <= d6)
+		result = np.where(mask[:,None], c, result)
+
+		v = d1 / (d1 - d3)
+		mask = (vc <= 0) & (d1 >= 0) & (d3 <= 0)
+		result = np.where(mask[:,None], a + ab * np.nan_to_num(v)[:,None], result)
+
+		mask = (d3 >= 0) & (d4 <= d3)
+		result = np.where(mask[:,None], b, result)
+
+		mask = (d1 <= 0) & (d2 <= 0)
+		result = np.where(mask[:,None], a, result)
+
+	return result
+
+
+## intersect rays or segments with triangles (Moller-Trumbore), returning the hit mask and the line parameters
+def _ray_triangles(origin, direction, a, b, c):
+	e1 = b - a
+	e2 = c - a
+	pvec = np.cross(direction, e2)
+	det = _dot(e1, pvec)
+	valid = np.abs(det) > 1e-14
+	inv_det = np.where(valid, 1.0 / np.where(valid, det, 1.0), 0.0)
+	tvec = origin - a
+	u = _dot(tvec, pvec) * inv_det
+	qvec = np.cross(tvec, e1)
+	v = _dot(direction, qvec) * inv_det
+	t = _dot(e2, qvec) * inv_det
+	hit = valid & (u >= 0) & (v >= 0) & (u + v <= 1)
+	return hit, t
+
+
+## intersect the edges of the first set of triangles with the paired triangles of the second set (arrays of shape (n,3,3))
+## edges touching or lying on the other triangle plane within EPSILON are not counted as intersections
+def _edges_triangles(tri_edges, tri_faces):
+	p0 = tri_edges
+	p1 = np.roll(tri_edges, -1, axis=1)
+	a = tri_faces[:,0][:,None,:]
+	b = tri_faces[:,1][:,None,:]
+	c = tri_faces[:,2][:,None,:]
+
+	normal = np.cross(b - a, c - a)
+	length = np.sqrt(_dot(normal, normal))
+	valid = length > 1e-14
+	normal = normal / np.where(valid, length, 1.0)[...,None]
+
+	d0 = _dot(p0 - a, normal)
+	d1 = _dot(p1 - a, normal)
+	crossing = valid & (((d0 > EPSILON) & (d1 < -EPSILON)) | ((d0 < -EPSILON) & (d1 > EPSILON)))
+	t = d0 / np.where(crossing, d0 - d1, 1.0)
+	pts = p0 + (p1 - p0) * t[...,None]
+
+	## barycentric coordinates of the crossing points
+	v0 = b - a
+	v1 = c - a
+	v2 = pts - a
+	d00 = _dot(v0, v0)
+	d01 = _dot(v0, v1)
+	d11 = _dot(v1, v1)
+	d20 = _dot(v2, v0)
+	d21 = _dot(v2, v1)
+	denom = d00 * d11 - d01 * d01
+	denom = np.where(denom == 0, 1.0, denom)
+	v = (d11 * d20 - d01 * d21) / denom
+	w = (d00 * d21 - d01 * d20) / denom
+	inside = (v >= -1e-12) & (w >= -1e-12) & (v + w <= 1 + 1e-12)
+	return crossing & inside, pts
+
+
+#################################################################### Point3d / Vector3d ####################################################################
+class _Coordinates(object):
+
+	__slots__ = ('X', 'Y', 'Z')
+
+	## constructor (accepts x, y, z values or another point/vector)
+	def __init__(self, x=0.0, y=0.0, z=0.0):
+		if hasattr(x, 'X'):
+			x, y, z = x.X, x.Y, x.Z
+		self.X = float(x)
+		self.Y = float(y)
+		self.Z = float(z)
+
+	def ToString(self):
+		return "%s,%s,%s" % (self.X, self.Y, self.Z)
+
+	def __repr__(self):
+		return "%s(%s)" % (type(self).__name__, self.ToString())
+
+	def __getitem__(self, index):
+		return (self.X, self.Y, self.Z)[index]
+
+	def __len__(self):
+		return 3
+
+	def __eq__(self, other):
+		return type(self) == type(other) and self.X == other.X and self.Y == other.Y and self.Z == other.Z
+
+	def __ne__(self, other):
+		return not self.__eq__(other)
+
+	def __hash__(self):
+		return hash((self.X, self.Y, self.Z))
+
+	def __neg__(self):
+		return type(self)(-self.X, -self.Y, -self.Z)
+
+	def __mul__(self, factor):
+		return type(self)(self.X*factor, self.Y*factor, self.Z*factor)
+
+	__rmul__ = __mul__
+
+	def __truediv__(self, factor):
+		return type(self)(self.X/factor, self.Y/factor, self.Z/factor)
+
+	__div__ = __truediv__
+
+	## distance to another point
+	def DistanceTo(self, other):
+		return math.sqrt((self.X-other.X)**2 + (self.Y-other.Y)**2 + (self.Z-other.Z)**2)
+
+	## check if all coordinates are zero
+	@property
+	def IsZero(self):
+		return self.X == 0 and self.Y == 0 and self.Z == 0
+
+
+class Point3d(_Coordinates):
+	'''
+	Point in 3d space. As in RhinoCommon, points are values: properties and constructors of other classes always return copies.
+	'''
+
+	__slots__ = ()
+
+	Origin = _ClassProperty(lambda cls: cls(0,0,0))
+
+	def __add__(self, other):
+		return Point3d(self.X+other.X, self.Y+other.Y, self.Z+other.Z)
+
+	def __sub__(self, other):
+		if isinstance(other, Vector3d):
+			return Point3d(self.X-other.X, self.Y-other.Y, self.Z-other.Z)
+		return Vector3d(self.X-other.X, self.Y-other.Y, self.Z-other.Z)
+
+	## apply a transformation to the point
+	def Transform(self, xform):
+		m = xform.m.tolist()
+		x, y, z = self.X, self.Y, self.Z
+		w = m[3][0]*x + m[3][1]*y + m[3][2]*z + m[3][3]
+		if w == 0:
+			w = 1.0
+		self.X = (m[0][0]*x + m[0][1]*y + m[0][2]*z + m[0][3]) / w
+		self.Y = (m[1][0]*x + m[1][1]*y + m[1][2]*z + m[1][3]) / w
+		self.Z = (m[2][0]*x + m[2][1]*y + m[2][2]*z + m[2][3]) / w
+
+
+class Vector3d(_Coordinates):
+	'''
+	Vector in 3d space. The product of two vectors is their dot product, as in RhinoCommon.
+	'''
+
+	__slots__ = ()
+
+	Zero = _ClassProperty(lambda cls: cls(0,0,0))
+	XAxis = _ClassProperty(lambda cls: cls(1,0,0))
+	YAxis = _ClassProperty(lambda cls: cls(0,1,0))
+	ZAxis = _ClassProperty(lambda cls: cls(0,0,1))
+
+	def __add__(self, other):
+		if isinstance(other, Point3d):
+			return Point3d(self.X+other.X, self.Y+other.Y, self.Z+other.Z)
+		return Vector3d(self.X+other.X, self.Y+other.Y, self.Z+other.Z)
+
+	def __sub__(self, other):
+		return Vector3d(self.X-other.X, self.Y-other.Y, self.Z-other.Z)
+
+	def __mul__(self, other):
+		if isinstance(other, Vector3d):
+			return self.X*other.X + self.Y*other.Y + self.Z*other.Z
+		return Vector3d(self.X*other, self.Y*other, self.Z*other)
+
+	__rmul__ = __mul__
+
+	@property
+	def Length(self):
+		return math.sqrt(self.X*self.X + self.Y*self.Y + self.Z*self.Z)
+
+	@property
+	def SquareLength(self):
+		return self.X*self.X + self.Y*self.Y + self.Z*self.Z
+
+	## scale the vector to unit length (returns False for zero-length vectors)
+	def Unitize(self):
+		length = self.Length
+		if length == 0:
+			return False
+		self.X /= length
+		self.Y /= length
+		self.Z /= length
+		return True
+
+	## reverse the vector direction
+	def Reverse(self):
+		self.X = -self.X
+		self.Y = -self.Y
+		self.Z = -self.Z
+		return True
+
+	## apply a transformation to the vector (translations are ignored)
+	def Transform(self, xform):
+		m = xform.m.tolist()
+		x, y, z = self.X, self.Y, self.Z
+		self.X = m[0][0]*x + m[0][1]*y + m[0][2]*z
+		self.Y = m[1][0]*x + m[1][1]*y + m[1][2]*z
+		self.Z = m[2][0]*x + m[2][1]*y + m[2][2]*z
+
+	## set the vector perpendicular to the given one
+	def PerpendicularTo(self, other):
+		x, y, z = abs(other.X), abs(other.Y), abs(other.Z)
+		if x <= y and x <= z:
+			self.X, self.Y, self.Z = 0.0, -other.Z, other.Y
+		elif y <= z:
+			self.X, self.Y, self.Z = -other.Z, 0.0, other.X
+		else:
+			self.X, self.Y, self.Z = -other.Y, other.X, 0.0
+		return not self.IsZero
+
+	## cross product of two vectors
+	@staticmethod
+	def CrossProduct(a, b):
+		return Vector3d(a.Y*b.Z - a.Z*b.Y, a.Z*b.X - a.X*b.Z, a.X*b.Y - a.Y*b.X)
+
+	## angle between two vectors (in the range 0-2pi if measured in a plane, otherwise 0-pi)
+	@staticmethod
+	def VectorAngle(a, b, plane=None):
+		if plane is None:
+			la = a.Length
+			lb = b.Length
+			if la == 0 or lb == 0:
+				return float('nan')
+			return math.acos(min(1.0, max(-1.0, (a*b) / (la*lb))))
+		pa = Point3d(plane.Origin + a)
+		pb = Point3d(plane.Origin + b)
+		ua = plane.RemapToPlaneSpace(pa)[1]
+		ub = plane.RemapToPlaneSpace(pb)[1]
+		angle = math.atan2(ub.Y, ub.X) - math.atan2(ua.Y, ua.X)
+		if angle < 0:
+			angle += 2*math.pi
+		return angle
+
+
+#################################################################### Interval ####################################################################
+class Interval(object):
+	'''
+	Numeric domain between two values.
+	'''
+
+	def __init__(self, t0, t1=None):
+		if isinstance(t0, Interval):
+			t0, t1 = t0.T0, t0.T1
+		self.T0 = float(t0)
+		self.T1 = float(t1)
+
+	def ToString(self):
+		return "%s,%s" % (self.T0, self.T1)
+
+	def __repr__(self):
+		return "Interval(%s)" % self.ToString()
+
+	def __getitem__(self, index):
+		return (self.T0, self.T1)[index]
+
+	@property
+	def Min(self):
+		return min(self.T0, self.T1)
+
+	@property
+	def Max(self):
+		return max(self.T0, self.T1)
+
+	@property
+	def Length(self):
+		return self.T1 - self.T0
+
+	@property
+	def Mid(self):
+		return (self.T0 + self.T1) / 2.0
+
+	## check if the value is inside the interval
+	def IncludesParameter(self, t, strict=False):
+		if strict:
+			return self.Min < t < self.Max
+		return self.Min <= t <= self.Max
+
+	## extend the interval to include the given value
+	def Grow(self, t):
+		if self.T0 <= self.T1:
+			self.T0 = min(self.T0, t)
+			self.T1 = max(self.T1, t)
+		else:
+			self.T1 = min(self.T1, t)
+			self.T0 = max(self.T0, t)
+		return True
+
+
+#################################################################### Transform ####################################################################
+class Transform(object):
+	'''
+	4x4 transformation matrix.
+
+	Args:
+		diagonal (float or Transform): Value of the diagonal (0 for a zero matrix, 1 for identity), or transformation to copy
+
+	Attributes:
+		m (numpy.ndarray): 4x4 matrix (also accessible through the M00..M33 properties)
+	'''
+
+	def __init__(self, diagonal=0.0):
+		if isinstance(diagonal, Transform):
+			self.m = diagonal.m.copy()
+		else:
+			self.m = np.eye(4) * float(diagonal)
+
+	def ToString(self):
+		return "R0=(%s), R1=(%s), R2=(%s), R3=(%s)" % tuple(", ".join(str(v) for v in row) for row in self.m.tolist())
+
+	def __repr__(self):
+		return "Transform(%s)" % self.ToString()
+
+	def __mul__(self, other):
+		if isinstance(other, Transform):
+			return Transform.Multiply(self, other)
+		result = type(other)(other)
+		result.Transform(self)
+		return result
+
+	Identity = _ClassProperty(lambda cls: cls(1.0))
+
+	@property
+	def IsIdentity(self):
+		return bool(np.array_equal(self.m, np.eye(4)))
+
+	## multiply two transformations (b is applied first)
+	@staticmethod
+	def Multiply(a, b):
+		t = Transform()
+		t.m = np.dot(a.m, b.m)
+		return t
+
+	## orient from a plane to another
+	@staticmethod
+	def PlaneToPlane(plane0, plane1):
+		t = Transform()
+		t.m = np.dot(plane1._frame(), np.linalg.inv(plane0._frame()))
+		return t
+
+	## translation by a vector (or by x, y, z values)
+	@staticmethod
+	def Translation(x, y=None, z=None):
+		if y is None:
+			x, y, z = x.X, x.Y, x.Z
+		t = Transform(1.0)
+		t.m[0,3] = x
+		t.m[1,3] = y
+		t.m[2,3] = z
+		return t
+
+	## uniform scale from an anchor point
+	@staticmethod
+	def Scale(anchor, factor):
+		t = Transform(1.0)
+		t.m[0,0] = t.m[1,1] = t.m[2,2] = factor
+		t.m[0,3] = anchor.X * (1 - factor)
+		t.m[1,3] = anchor.Y * (1 - factor)
+		t.m[2,3] = anchor.Z * (1 - factor)
+		return t
+
+	## rotation around an axis passing through a center point (angle in radians)
+	@staticmethod
+	def Rotation(angle, axis, center):
+		u = _to_array(axis)
+		u = u / np.linalg.norm(u)
+		k = np.array([[0, -u[2], u[1]], [u[2], 0, -u[0]], [-u[1], u[0], 0]])
+		r = np.eye(3) + math.sin(angle) * k + (1 - math.cos(angle)) * np.dot(k, k)
+		c = _to_array(center)
+		t = Transform(1.0)
+		t.m[:3,:3] = r
+		t.m[:3,3] = c - np.dot(r, c)
+		return t
+
+	## return the inverse transformation, in the form (success, inverse)
+	def TryGetInverse(self):
+		t = Transform()
+		try:
+			t.m = np.linalg.inv(self.m)
+		except np.linalg.LinAlgError:
+			return False, Transform()
+		return True, t
+
+	## return the uniform scale factor if the transformation is a similarity, otherwise None
+	def _similarity_scale(self):
+		if not np.array_equal(self.m[3], [0,0,0,1]):
+			return None
+		r = self.m[:3,:3]
+		rtr = np.dot(r.T, r)
+		scale2 = rtr[0,0]
+		if scale2 <= 0 or not np.allclose(rtr, np.eye(3) * scale2, rtol=1e-9, atol=1e-12):
+			return None
+		return math.sqrt(scale2)
+
+
+## generate the M00..M33 properties of the Transform class
+def _matrix_property(i, j):
+	def getter(self):
+		return float(self.m[i,j])
+	def setter(self, value):
+		self.m[i,j] = value
+	return property(getter, setter)
+
+for _i in range(4):
+	for _j in range(4):
+		setattr(Transform, "M%d%d" % (_i, _j), _matrix_property(_i, _j))
+
+
+#################################################################### Plane ####################################################################
+class Plane(object):
+	'''
+	Oriented plane, defined by an origin and orthonormal X, Y and Z axes.
+	Can be created from another plane, from origin and normal, or from origin, X and Y directions (as in RhinoCommon, the axes are orthonormalized).
+	'''
+
+	def __init__(self, origin, x_axis=None, y_axis=None):
+		if isinstance(origin, Plane):
+			self._origin = Point3d(origin._origin)
+			self._x = Vector3d(origin._x)
+			self._y = Vector3d(origin._y)
+			self._z = Vector3d(origin._z)
+			return
+		if y_axis is None:
+			normal = Vector3d(x_axis)
+			x_axis = Vector3d()
+			x_axis.PerpendicularTo(normal)
+			y_axis = Vector3d.CrossProduct(normal, x_axis)
+		self._origin = Point3d(origin)
+		self._set_axes(x_axis, y_axis)
+
+	def ToString(self):
+		return "Origin=%s XAxis=%s, YAxis=%s, ZAxis=%s" % (self._origin.ToString(), self._x.ToString(), self._y.ToString(), self._z.ToString())
+
+	def __repr__(self):
+		return "Plane(%s)" % self.ToString()
+
+	## set orthonormal axes from X and Y directions
+	def _set_axes(self, x_axis, y_axis):
+		x = Vector3d(x_axis)
+		x.Unitize()
+		z = Vector3d.CrossProduct(x, y_axis)
+		z.Unitize()
+		self._x = x
+		self._y = Vector3d.CrossProduct(z, x)
+		self._z = z
+
+	## 4x4 matrix mapping the world XY plane to this plane
+	def _frame(self):
+		f = np.eye(4)
+		f[:3,0] = _to_array(self._x)
+		f[:3,1] = _to_array(self._y)
+		f[:3,2] = _to_array(self._z)
+		f[:3,3] = _to_array(self._origin)
+		return f
+
+	WorldXY = _ClassProperty(lambda cls: cls(Point3d(0,0,0), Vector3d(1,0,0), Vector3d(0,1,0)))
+	WorldYZ = _ClassProperty(lambda cls: cls(Point3d(0,0,0), Vector3d(0,1,0), Vector3d(0,0,1)))
+	WorldZX = _ClassProperty(lambda cls: cls(Point3d(0,0,0), Vector3d(0,0,1), Vector3d(1,0,0)))
+
+	@property
+	def Origin(self):
+		return Point3d(self._origin)
+
+	@Origin.setter
+	def Origin(self, value):
+		self._origin = Point3d(value)
+
+	@property
+	def XAxis(self):
+		return Vector3d(self._x)
+
+	@property
+	def YAxis(self):
+		return Vector3d(self._y)
+
+	@property
+	def ZAxis(self):
+		return Vector3d(self._z)
+
+	@property
+	def Normal(self):
+		return Vector3d(self._z)
+
+	## apply a transformation to the plane
+	def Transform(self, xform):
+		x_end = self._origin + self._x
+		y_end = self._origin + self._y
+		self._origin.Transform(xform)
+		x_end.Transform(xform)
+		y_end.Transform(xform)
+		self._set_axes(x_end - self._origin, y_end - self._origin)
+		return True
+
+	## reverse the plane orientation (swaps X and Y axes)
+	def Flip(self):
+		self._x, self._y = self._y, self._x
+		self._z.Reverse()
+
+	## return the coordinates of a point in the plane space, in the form (success, point)
+	def RemapToPlaneSpace(self, pt):
+		dx = pt.X - self._origin.X
+		dy = pt.Y - self._origin.Y
+		dz = pt.Z - self._origin.Z
+		x, y, z = self._x, self._y, self._z
+		return True, Point3d(dx*x.X + dy*x.Y + dz*x.Z, dx*y.X + dy*y.Y + dz*y.Z, dx*z.X + dy*z.Y + dz*z.Z)
+
+	## return the point at the given plane coordinates
+	def PointAt(self, u, v, w=0.0):
+		o, x, y, z = self._origin, self._x, self._y, self._z
+		return Point3d(o.X + u*x.X + v*y.X + w*z.X, o.Y + u*x.Y + v*y.Y + w*z.Y, o.Z + u*x.Z + v*y.Z + w*z.Z)
+
+	## signed distance of a point from the plane
+	def DistanceTo(self, pt):
+		return self.RemapToPlaneSpace(pt)[1].Z
+
+	## projection of a point on the plane
+	def ClosestPoint(self, pt):
+		uvw = self.RemapToPlaneSpace(pt)[1]
+		return self.PointAt(uvw.X, uvw.Y)
+
+
+#################################################################### BoundingBox ####################################################################
+class BoundingBox(object):
+	'''
+	World-aligned bounding box. Can be created from min and max points, from a list of points or from the 6 min and max coordinates.
+	'''
+
+	def __init__(self, *args):
+		if len(args) == 6:
+			self._min = [float(v) for v in args[:3]]
+			self._max = [float(v) for v in args[3:]]
+		elif len(args) == 2 and hasattr(args[0], 'X'):
+			self._min = [args[0].X, args[0].Y, args[0].Z]
+			self._max = [args[1].X, args[1].Y, args[1].Z]
+		else:
+			coords = np.array([[pt.X, pt.Y, pt.Z] for pt in args[0]], dtype=float).reshape(-1,3)
+			if len(coords) == 0:
+				self._min = [1.0, 0.0, 0.0]
+				self._max = [-1.0, 0.0, 0.0]
+			else:
+				self._min = coords.min(axis=0).tolist()
+				self._max = coords.max(axis=0).tolist()
+
+	def ToString(self):
+		return "%s - %s" % (self.Min.ToString(), self.Max.ToString())
+
+	def __repr__(self):
+		return "BoundingBox(%s)" % self.ToString()
+
+	Empty = _ClassProperty(lambda cls: cls(1.0, 0.0, 0.0, -1.0, 0.0, 0.0))
+
+	@property
+	def Min(self):
+		return Point3d(*self._min)
+
+	@Min.setter
+	def Min(self, value):
+		self._min = [value.X, value.Y, value.Z]
+
+	@property
+	def Max(self):
+		return Point3d(*self._max)
+
+	@Max.setter
+	def Max(self, value):
+		self._max = [value.X, value.Y, value.Z]
+
+	@property
+	def IsValid(self):
+		return all(self._min[i] <= self._max[i] for i in range(3))
+
+	@property
+	def Center(self):
+		return Point3d(*[(self._min[i] + self._max[i]) / 2.0 for i in range(3)])
+
+	@property
+	def Diagonal(self):
+		return Vector3d(*[self._max[i] - self._min[i] for i in range(3)])
+
+	@property
+	def Volume(self):
+		d = self.Diagonal
+		return d.X * d.Y * d.Z
+
+	## check if a point is inside the box (boundary included, unless strict)
+	def Contains(self, pt, strict=False):
+		c = (pt.X, pt.Y, pt.Z)
+		if strict:
+			return all(self._min[i] < c[i] < self._max[i] for i in range(3))
+		return all(self._min[i] <= c[i] <= self._max[i] for i in range(3))
+
+	## extend the box to include a point or another box
+	def Union(self, other):
+		if isinstance(other, BoundingBox):
+			if not other.IsValid:
+				return
+			pts = [other.Min, other.Max]
+		else:
+			pts = [other]
+		for pt in pts:
+			c = (pt.X, pt.Y, pt.Z)
+			if not self.IsValid:
+				self._min = list(c)
+				self._max = list(c)
+			for i in range(3):
+				self._min[i] = min(self._min[i], c[i])
+				self._max[i] = max(self._max[i], c[i])
+
+	## grow the box in all directions
+	def Inflate(self, amount):
+		self._min = [v - amount for v in self._min]
+		self._max = [v + amount for v in self._max]
+
+	## return the 8 corners (bottom counter-clockwise, then top counter-clockwise)
+	def GetCorners(self):
+		x0, y0, z0 = self._min
+		x1, y1, z1 = self._max
+		return [Point3d(x0,y0,z0), Point3d(x1,y0,z0), Point3d(x1,y1,z0), Point3d(x0,y1,z0),
+				Point3d(x0,y0,z1), Point3d(x1,y0,z1), Point3d(x1,y1,z1), Point3d(x0,y1,z1)]
+
+	## replace the box with the bounding box of its transformed corners
+	def Transform(self, xform):
+		corners = self.GetCorners()
+		for pt in corners:
+			pt.Transform(xform)
+		self.__init__(corners)
+		return True
+
+
+#################################################################### Box ####################################################################
+class Box(object):
+	'''
+	Box oriented along a plane. Can be created from a BoundingBox, from a plane and three intervals,
+	or from a plane and the geometry (points or mesh) to contain.
+	'''
+
+	def __init__(self, plane, x=None, y=None, z=None):
+		if isinstance(plane, BoundingBox):
+			bbox = plane
+			self._plane = Plane.WorldXY
+			self._x = Interval(bbox._min[0], bbox._max[0])
+			self._y = Interval(bbox._min[1], bbox._max[1])
+			self._z = Interval(bbox._min[2], bbox._max[2])
+			return
+
+		self._plane = Plane(plane)
+		if isinstance(x, Interval):
+			self._x = Interval(x)
+			self._y = Interval(y)
+			self._z = Interval(z)
+			return
+
+		if isinstance(x, BoundingBox):
+			bmin, bmax = x._min, x._max
+		else:
+			if isinstance(x, Mesh):
+				coords = x._vertex_array()
+			else:
+				coords = np.array([[pt.X, pt.Y, pt.Z] for pt in x], dtype=float).reshape(-1,3)
+			local = np.dot(coords - _to_array(self._plane._origin), self._plane_axes().T)
+			bmin = local.min(axis=0).tolist()
+			bmax = local.max(axis=0).tolist()
+		self._x = Interval(bmin[0], bmax[0])
+		self._y = Interval(bmin[1], bmax[1])
+		self._z = Interval(bmin[2], bmax[2])
+
+	def ToString(self):
+		return "Box(%s, %s, %s)" % (self._x.ToString(), self._y.ToString(), self._z.ToString())
+
+	def __repr__(self):
+		return self.ToString()
+
+	## 3x3 array with the plane axes as rows
+	def _plane_axes(self):
+		return np.array([_to_array(self._plane._x), _to_array(self._plane._y), _to_array(self._plane._z)])
+
+	@property
+	def Plane(self):
+		return Plane(self._plane)
+
+	@Plane.setter
+	def Plane(self, value):
+		self._plane = Plane(value)
+
+	@property
+	def X(self):
+		return Interval(self._x)
+
+	@X.setter
+	def X(self, value):
+		self._x = Interval(value)
+
+	@property
+	def Y(self):
+		return Interval(self._y)
+
+	@Y.setter
+	def Y(self, value):
+		self._y = Interval(value)
+
+	@property
+	def Z(self):
+		return Interval(self._z)
+
+	@Z.setter
+	def Z(self, value):
+		self._z = Interval(value)
+
+	@property
+	def Center(self):
+		return self._plane.PointAt(self._x.Mid, self._y.Mid, self._z.Mid)
+
+	@property
+	def Volume(self):
+		return abs(self._x.Length * self._y.Length * self._z.Length)
+
+	@property
+	def BoundingBox(self):
+		return BoundingBox(self.GetCorners())
+
+	## return the point at the given normalized box coordinates
+	def PointAt(self, u, v, w):
+		return self._plane.PointAt(self._x.T0 + u*self._x.Length, self._y.T0 + v*self._y.Length, self._z.T0 + w*self._z.Length)
+
+	## return the 8 corners (bottom counter-clockwise, then top counter-clockwise)
+	def GetCorners(self):
+		x0, x1 = self._x.Min, self._x.Max
+		y0, y1 = self._y.Min, self._y.Max
+		z0, z1 = self._z.Min, self._z.Max
+		pln = self._plane
+		return [pln.PointAt(x0,y0,z0), pln.PointAt(x1,y0,z0), pln.PointAt(x1,y1,z0), pln.PointAt(x0,y1,z0),
+				pln.PointAt(x0,y0,z1), pln.PointAt(x1,y0,z1), pln.PointAt(x1,y1,z1), pln.PointAt(x0,y1,z1)]
+
+	## check if a point is inside the box (boundary included)
+	def Contains(self, pt):
+		local = self._plane.RemapToPlaneSpace(pt)[1]
+		return self._x.IncludesParameter(local.X) and self._y.IncludesParameter(local.Y) and self._z.IncludesParameter(local.Z)
+
+	## extend the box to include a point
+	def Union(self, pt):
+		local = self._plane.RemapToPlaneSpace(pt)[1]
+		self._x.Grow(local.X)
+		self._y.Grow(local.Y)
+		self._z.Grow(local.Z)
+
+	## apply a transformation to the box (only similarity transformations are supported, otherwise returns False)
+	def Transform(self, xform):
+		scale = xform._similarity_scale()
+		if scale is None:
+			return False
+		self._plane.Transform(xform)
+		if scale != 1.0:
+			self._x = Interval(self._x.T0*scale, self._x.T1*scale)
+			self._y = Interval(self._y.T0*scale, self._y.T1*scale)
+			self._z = Interval(self._z.T0*scale, self._z.T1*scale)
+		return True
+
+
+#################################################################### Line ####################################################################
+class Line(object):
+	'''
+	Line segment between two points. Can be created from two points or from the 6 coordinates.
+	'''
+
+	def __init__(self, *args):
+		if len(args) == 6:
+			self._from = Point3d(args[0], args[1], args[2])
+			self._to = Point3d(args[3], args[4], args[5])
+		else:
+			self._from = Point3d(args[0])
+			self._to = Point3d(args[1])
+
+	def ToString(self):
+		return "%s,%s" % (self._from.ToString(), self._to.ToString())
+
+	def __repr__(self):
+		return "Line(%s)" % self.ToString()
+
+	@property
+	def From(self):
+		return Point3d(self._from)
+
+	@From.setter
+	def From(self, value):
+		self._from = Point3d(value)
+
+	@property
+	def To(self):
+		return Point3d(self._to)
+
+	@To.setter
+	def To(self, value):
+		self._to = Point3d(value)
+
+	FromX = property(lambda self: self._from.X)
+	FromY = property(lambda self: self._from.Y)
+	FromZ = property(lambda self: self._from.Z)
+	ToX = property(lambda self: self._to.X)
+	ToY = property(lambda self: self._to.Y)
+	ToZ = property(lambda self: self._to.Z)
+
+	@property
+	def Direction(self):
+		return self._to - self._from
+
+	@property
+	def Length(self):
+		return self._from.DistanceTo(self._to)
+
+	## return the point at the given parameter (0 at start, 1 at end)
+	def PointAt(self, t):
+		return Point3d(self._from.X + t*(self._to.X - self._from.X), self._from.Y + t*(self._to.Y - self._from.Y), self._from.Z + t*(self._to.Z - self._from.Z))
+
+	## return the closest point on the line (or on the segment)
+	def ClosestPoint(self, pt, limit_to_finite_segment=True):
+		d = self.Direction
+		length2 = d.SquareLength
+		if length2 == 0:
+			return Point3d(self._from)
+		t = ((pt - self._from) * d) / length2
+		if limit_to_finite_segment:
+			t = min(1.0, max(0.0, t))
+		return self.PointAt(t)
+
+	## apply a transformation to the line
+	def Transform(self, xform):
+		self._from.Transform(xform)
+		self._to.Transform(xform)
+		return True
+
+	## return the line as a curve
+	def ToNurbsCurve(self):
+		return LineCurve(self)
+
+
+class LineCurve(object):
+	'''
+	Curve representation of a line (domain 0-1), returned by Line.ToNurbsCurve.
+	'''
+
+	def __init__(self, line, to_pt=None):
+		if to_pt is not None:
+			line = Line(line, to_pt)
+		self.Line = Line(line.From, line.To)
+
+	@property
+	def PointAtStart(self):
+		return self.Line.From
+
+	@property
+	def PointAtEnd(self):
+		return self.Line.To
+
+	@property
+	def Domain(self):
+		return Interval(0.0, 1.0)
+
+	def PointAt(self, t):
+		return self.Line.PointAt(t)
+
+	def Transform(self, xform):
+		return self.Line.Transform(xform)
+
+	def ToNurbsCurve(self):
+		return LineCurve(self.Line)
+
+
+class Polyline(list):
+	'''
+	List of points forming a polyline.
+	'''
+
+	@property
+	def Count(self):
+		return len(self)
+
+	@property
+	def IsClosed(self):
+		return len(self) > 2 and self[0].DistanceTo(self[-1]) == 0
+
+	@property
+	def Length(self):
+		return sum(self[i].DistanceTo(self[i+1]) for i in range(len(self)-1))
+
+
+#################################################################### Mesh ####################################################################
+class MeshFace(object):
+	'''
+	Triangular or quad mesh face (for triangles, D is equal to C).
+	'''
+
+	__slots__ = ('A', 'B', 'C', 'D')
+
+	def __init__(self, a, b, c, d=None):
+		self.A = int(a)
+		self.B = int(b)
+		self.C = int(c)
+		self.D = int(c) if d is None else int(d)
+
+	def __repr__(self):
+		return "MeshFace(%s,%s,%s,%s)" % (self.A, self.B, self.C, self.D)
+
+	@property
+	def IsQuad(self):
+		return self.C != self.D
+
+	@property
+	def IsTriangle(self):
+		return self.C == self.D
+
+
+class MeshVertexList(object):
+	'''
+	Vertices of a mesh (accessed through Mesh.Vertices).
+	'''
+
+	def __init__(self, mesh):
+		self.mesh = mesh
+
+	def __len__(self):
+		return self.Count
+
+	@property
+	def Count(self):
+		return len(self.mesh._vertices) + len(self.mesh._new_vertices)
+
+	def __getitem__(self, index):
+		return Point3d(*self.mesh._vertex_array()[index].tolist())
+
+	def __setitem__(self, index, pt):
+		self.mesh._vertex_array()[index] = [pt.X, pt.Y, pt.Z]
+		self.mesh._invalidate()
+
+	def __iter__(self):
+		for v in self.mesh._vertex_array().tolist():
+			yield Point3d(v[0], v[1], v[2])
+
+	## add a vertex (from a point or x, y, z values), returning its index
+	def Add(self, x, y=None, z=None):
+		if y is None:
+			x, y, z = x.X, x.Y, x.Z
+		self.mesh._new_vertices.append((float(x), float(y), float(z)))
+		self.mesh._invalidate()
+		return self.Count - 1
+
+
+class MeshFaceList(object):
+	'''
+	Faces of a mesh (accessed through Mesh.Faces).
+	'''
+
+	def __init__(self, mesh):
+		self.mesh = mesh
+
+	def __len__(self):
+		return self.Count
+
+	@property
+	def Count(self):
+		return len(self.mesh._faces) + len(self.mesh._new_faces)
+
+	def __getitem__(self, index):
+		return MeshFace(*self.mesh._face_array()[index].tolist())
+
+	def __iter__(self):
+		for f in self.mesh._face_array().tolist():
+			yield MeshFace(*f)
+
+	## add a triangular or quad face, returning its index
+	def AddFace(self, a, b, c, d=None):
+		if d is None:
+			d = c
+		self.mesh._new_faces.append((int(a), int(b), int(c), int(d)))
+		self.mesh._invalidate()
+		return self.Count - 1
+
+
+class Mesh(object):
+	'''
+	Polygon mesh with triangular and quad faces. Vertices and faces are stored in numpy arrays
+	(vertices and faces added one at a time are buffered and merged on first use).
+	'''
+
+	def __init__(self):
+		self._vertices = np.zeros((0,3), dtype=float)
+		self._faces = np.zeros((0,4), dtype=int)
+		self._new_vertices = []
+		self._new_faces = []
+		self._triangles = None
+		self.Vertices = MeshVertexList(self)
+		self.Faces = MeshFaceList(self)
+
+	def ToString(self):
+		return "Mesh [vertices: %s, faces: %s]" % (self.Vertices.Count, self.Faces.Count)
+
+	def __repr__(self):
+		return self.ToString()
+
+	## discard cached data after the mesh is modified
+	def _invalidate(self):
+		self._triangles = None
+
+	## return the vertices as an (n,3) array
+	def _vertex_array(self):
+		if len(self._new_vertices) > 0:
+			self._vertices = np.vstack((self._vertices, np.array(self._new_vertices, dtype=float)))
+			self._new_vertices = []
+		return self._vertices
+
+	## return the faces as an (n,4) array
+	def _face_array(self):
+		if len(self._new_faces) > 0:
+			self._faces = np.vstack((self._faces, np.array(self._new_faces, dtype=int)))
+			self._new_faces = []
+		return self._faces
+
+	## return the mesh triangles as an (n,3,3) array and the index of the face of each triangle (quads are split along the AC diagonal)
+	def _triangle_arrays(self):
+		if self._triangles is None:
+			vertices = self._vertex_array()
+			faces = self._face_array()
+			quads = np.nonzero(faces[:,2] != faces[:,3])[0]
+			indexes = np.vstack((faces[:,:3], faces[quads][:,[0,2,3]]))
+			face_ids = np.concatenate((np.arange(len(faces)), quads))
+			self._triangles = (vertices[indexes], face_ids)
+		return self._triangles
+
+	@property
+	def IsValid(self):
+		faces = self._face_array()
+		return len(faces) > 0 and int(faces.min()) >= 0 and int(faces.max()) < self.Vertices.Count
+
+	## return a copy of the mesh
+	def Duplicate(self):
+		mesh = Mesh()
+		mesh._vertices = self._vertex_array().copy()
+		mesh._faces = self._face_array().copy()
+		mesh._triangles = self._triangles
+		return mesh
+
+	## apply a transformation to the mesh
+	def Transform(self, xform):
+		vertices = self._vertex_array()
+		transformed = np.dot(vertices, xform.m[:3,:3].T) + xform.m[:3,3]
+		w = np.dot(vertices, xform.m[3,:3]) + xform.m[3,3]
+		if not np.all(w == 1.0):
+			transformed /= np.where(w == 0, 1.0, w)[:,None]
+		self._vertices = transformed
+		self._invalidate()
+		return True
+
+	## move the mesh by a vector (or by x, y, z values)
+	def Translate(self, x, y=None, z=None):
+		if y is None:
+			x, y, z = x.X, x.Y, x.Z
+		self._vertices = self._vertex_array() + np.array([x, y, z], dtype=float)
+		self._invalidate()
+		return True
+
+	## add the vertices and faces of another mesh
+	def Append(self, other):
+		offset = self.Vertices.Count
+		self._vertices = np.vstack((self._vertex_array(), other._vertex_array()))
+		self._faces = np.vstack((self._face_array(), other._face_array() + offset))
+		self._invalidate()
+
+	## normals are not stored (kept for compatibility with RhinoCommon)
+	def RebuildNormals(self):
+		pass
+
+	## merge coincident vertices (normals are not stored, so the angle is ignored)
+	def Weld(self, angle_tolerance):
+		vertices = self._vertex_array()
+		if len(vertices) == 0:
+			return
+		unique, inverse = np.unique(vertices, axis=0, return_inverse=True)
+		inverse = inverse.reshape(-1)
+		self._vertices = unique
+		self._faces = inverse[self._face_array()]
+		self._invalidate()
+
+	## return the world-aligned bounding box (or the bounding box in the coordinates of the given plane)
+	def GetBoundingBox(self, accurate_or_plane=True):
+		vertices = self._vertex_array()
+		if len(vertices) == 0:
+			return BoundingBox.Empty
+		if isinstance(accurate_or_plane, Plane):
+			axes = np.array([_to_array(accurate_or_plane._x), _to_array(accurate_or_plane._y), _to_array(accurate_or_plane._z)])
+			vertices = np.dot(vertices - _to_array(accurate_or_plane._origin), axes.T)
+		bmin = vertices.min(axis=0).tolist()
+		bmax = vertices.max(axis=0).tolist()
+		return BoundingBox(bmin[0], bmin[1], bmin[2], bmax[0], bmax[1], bmax[2])
+
+	## return the closest point on the mesh to the given point
+	def ClosestPoint(self, pt):
+		triangles = self._triangle_arrays()[0]
+		if len(triangles) == 0:
+			return Point3d(pt)
+		p = _to_array(pt)
+		closest = _closest_points_on_triangles(p, triangles[:,0], triangles[:,1], triangles[:,2])
+		dist = _dot(closest - p, closest - p)
+		return Point3d(*closest[int(np.argmin(dist))].tolist())
+
+	## check if a point is inside a closed mesh (points closer than the tolerance to the mesh are inside only if not strictly_in)
+	def IsPointInside(self, pt, tolerance, strictly_in):
+		triangles = self._triangle_arrays()[0]
+		if len(triangles) == 0:
+			return False
+		p = _to_array(pt)
+		a, b, c = triangles[:,0], triangles[:,1], triangles[:,2]
+		closest = _closest_points_on_triangles(p, a, b, c)
+		if np.min(_dot(closest - p, closest - p)) <= tolerance * tolerance:
+			return not strictly_in
+		hit, t = _ray_triangles(p, RAY_DIRECTION, a, b, c)
+		return int(np.count_nonzero(hit & (t > 0))) % 2 == 1
+
+
+#################################################################### Intersection ####################################################################
+class Intersection(object):
+	'''
+	Intersection functions between meshes, lines and planes.
+	'''
+
+	## maximum size of the arrays of triangle pairs tested at once
+	pairs_chunk_size = 1 << 20
+
+	## return the intersection segments between two meshes (coplanar and touching faces are not reported)
+	@staticmethod
+	def MeshMeshFast(mesh_a, mesh_b):
+		tri_a = mesh_a._triangle_arrays()[0]
+		tri_b = mesh_b._triangle_arrays()[0]
+		if len(tri_a) == 0 or len(tri_b) == 0:
+			return []
+
+		min_a = tri_a.min(axis=1) - EPSILON
+		max_a = tri_a.max(axis=1) + EPSILON
+		min_b = tri_b.min(axis=1)
+		max_b = tri_b.max(axis=1)
+
+		segments = []
+		chunk = max(1, Intersection.pairs_chunk_size // len(tri_b))
+		for start in range(0, len(tri_a), chunk):
+			## triangle pairs with overlapping bounding boxes
+			overlap = np.all((min_a[start:start+chunk,None,:] <= max_b[None,:,:]) & (max_a[start:start+chunk,None,:] >= min_b[None,:,:]), axis=2)
+			ids_a, ids_b = np.nonzero(overlap)
+			if len(ids_a) == 0:
+				continue
+			pairs_a = tri_a[ids_a + start]
+			pairs_b = tri_b[ids_b]
+
+			hits_ab, pts_ab = _edges_triangles(pairs_a, pairs_b)
+			hits_ba, pts_ba = _edges_triangles(pairs_b, pairs_a)
+			hits = np.hstack((hits_ab, hits_ba))
+			pts = np.hstack((pts_ab, pts_ba))
+			for pair_id in np.nonzero(np.any(hits, axis=1))[0]:
+				pair_pts = pts[pair_id][hits[pair_id]]
+				segments.append(Line(Point3d(*pair_pts[0].tolist()), Point3d(*pair_pts[-1].tolist())))
+		return segments
+
+	## return the intersection points between a mesh and a line, sorted along the line, and the intersected faces ids
+	@staticmethod
+	def MeshLine(mesh, line):
+		triangles, face_ids = mesh._triangle_arrays()
+		if len(triangles) == 0:
+			return [], []
+		start = _to_array(line._from)
+		direction = _to_array(line._to) - start
+		hit, t = _ray_triangles(start, direction, triangles[:,0], triangles[:,1], triangles[:,2])
+		hit &= (t >= 0) & (t <= 1)
+		ids = np.nonzero(hit)[0]
+		ids = ids[np.argsort(t[ids], kind='stable')]
+		pts = [Point3d(*(start + direction * t[i]).tolist()) for i in ids]
+		return pts, [int(face_ids[i]) for i in ids]
+
+	## return the polylines where the plane cuts the mesh, or None if there is no intersection
+	@staticmethod
+	def MeshPlane(mesh, plane):
+		vertices = mesh._vertex_array()
+		faces = mesh._face_array()
+		if len(faces) == 0:
+			return None
+		quads = np.nonzero(faces[:,2] != faces[:,3])[0]
+		triangles = np.vstack((faces[:,:3], faces[quads][:,[0,2,3]]))
+
+		dist = np.dot(vertices - _to_array(plane._origin), _to_array(plane._z))
+		above = dist >= 0
+		segments = []
+		for tri in triangles[np.any(above[triangles], axis=1) & ~np.all(above[triangles], axis=1)].tolist():
+			pts = []
+			for i, j in ((tri[0], tri[1]), (tri[1], tri[2]), (tri[2], tri[0])):
+				if above[i] != above[j]:
+					## compute the point with the edge vertices in a fixed order, so that faces sharing the edge get the same point
+					if i > j:
+						i, j = j, i
+					t = dist[i] / (dist[i] - dist[j])
+					pts.append(tuple((vertices[i] + (vertices[j] - vertices[i]) * t).tolist()))
+			segments.append(pts)
+		if len(segments) == 0:
+			return None
+		return [Polyline([Point3d(*p) for p in chain]) for chain in _join_segments(segments)]
+
+
+## join segments sharing end points into chains of points
+def _join_segments(segments):
+	ends = {}
+	for i, seg in enumerate(segments):
+		for p in seg:
+			ends.setdefault(p, []).append(i)
+	used = [False] * len(segments)
+	chains = []
+	for i in range(len(segments)):
+		if used[i]:
+			continue
+		used[i] = True
+		chain = list(segments[i])
+		## extend the chain forward, then backward
+		for forward in (True, False):
+			while True:
+				end = chain[-1] if forward else chain[0]
+				next_id = None
+				for j in ends[end]:
+					if not used[j]:
+						next_id = j
+						break
+				if next_id is None:
+					break
+				used[next_id] = True
+				seg = segments[next_id]
+				other = seg[1] if seg[0] == end else seg[0]
+				if forward:
+					chain.append(other)
+				else:
+					chain.insert(0, other)
+		chains.append(chain)
+	return chains
@@ -9,10 +9,12 @@ This file is part of Wasp. https://github.com/ar0551/Wasp
 Utilities
 """
 
-from Rhino.Geometry import Mesh
-from Rhino.Geometry import Plane
-from Rhino.Geometry import Vector3d, Point3d
-from Rhino.Geometry import Transform
+import os
+
+from wasp.geometry import Mesh
+from wasp.geometry import Plane
+from wasp.geometry import Vector3d, Point3d
+from wasp.geometry import Transform
 
 
 #################################################################### Utilities ####################################################################
@@ -106,4 +108,51 @@ def transform_from_data(data):
 	trans.M31 = float(data['M31'])
 	trans.M32 = float(data['M32'])
 	trans.M33 = float(data['M33'])
-	return trans
\ No newline at end of file
+	return trans
+
+
+## return the first 3 rows of an affine transformation as a flat list of 12 floats
+def transform_to_list(trans):
+	return [trans.M00, trans.M01, trans.M02, trans.M03, 
+			trans.M10, trans.M11, trans.M12, trans.M13, 
+			trans.M20, trans.M21, trans.M22, trans.M23]
+
+
+## create an affine transformation from a flat list of 12 floats (first 3 rows of the matrix)
+def transform_from_list(values):
+	trans = Transform(0)
+	trans.M00 = float(values[0])
+	trans.M01 = float(values[1])
+	trans.M02 = float(values[2])
+	trans.M03 = float(values[3])
+	trans.M10 = float(values[4])
+	trans.M11 = float(values[5])
+	trans.M12 = float(values[6])
+	trans.M13 = float(values[7])
+	trans.M20 = float(values[8])
+	trans.M21 = float(values[9])
+	trans.M22 = float(values[10])
+	trans.M23 = float(values[11])
+	trans.M33 = 1.0
+	return trans
+
+
+## move a file over another one, so that the destination always holds a complete file
+## os.replace is atomic. where it is missing (IronPython 2.7), the old file is kept as a backup (see backup_path) until the new one is in place
+def replace_file(src_path, dst_path):
+	if hasattr(os, 'replace'):
+		os.replace(src_path, dst_path)
+		return
+	bak_path = backup_path(dst_path)
+	if os.path.exists(dst_path):
+		if os.path.exists(bak_path):
+			os.remove(bak_path)
+		os.rename(dst_path, bak_path)
+	os.rename(src_path, dst_path)
+	if os.path.exists(bak_path):
+		os.remove(bak_path)
+
+
+## return the path of the backup left by an interrupted replace_file
+def backup_path(file_path):
+	return file_path + '.bak'
@@ -0,0 +1,16 @@
+"""
+(C) 2017-2020 Andrea Rossi <ghwasp@gmail.com>
+
+This file is part of Wasp. https://github.com/ar0551/Wasp
+@license GPL-3.0 <https://www.gnu.org/licenses/gpl.html>
+
+@version 0.5.001
+
+Test configuration: the Wasp engine is imported from the src folder, using the NumPy geometry backend outside of Rhino
+"""
+
+import os
+import sys
+
+os.environ.setdefault('WASP_GEOMETRY_BACKEND', 'numpy')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
@@ -0,0 +1,94 @@
+"""
+(C) 2017-2020 Andrea Rossi <ghwasp@gmail.com>
+
+This file is part of Wasp. https://github.com/ar0551/Wasp
+@license GPL-3.0 <https://www.gnu.org/licenses/gpl.html>
+
+@version 0.5.001
+
+Parts, rules and fields shared by the tests
+"""
+
+import math
+
+from wasp.geometry import Point3d, Vector3d, Plane, Mesh, Transform
+from wasp.field import Field
+from wasp.core import Part, Connection, Rule, Collider
+
+
+## create a box mesh centered at the origin
+def box_mesh(size_x, size_y, size_z):
+	mesh = Mesh()
+	for z in (-0.5, 0.5):
+		for y in (-0.5, 0.5):
+			for x in (-0.5, 0.5):
+				mesh.Vertices.Add(x*size_x, y*size_y, z*size_z)
+	for face in ((0,2,3,1), (4,5,7,6), (0,1,5,4), (2,6,7,3), (0,4,6,2), (1,3,7,5)):
+		mesh.Faces.AddFace(*face)
+	return mesh
+
+
+## create a box part with a connection at the center of each face
+def box_part(name, size_x, size_y, size_z):
+	conn_planes = [((size_x*0.5,0,0), (0,1,0), (0,0,1)), ((-size_x*0.5,0,0), (0,-1,0), (0,0,1)),
+		((0,size_y*0.5,0), (-1,0,0), (0,0,1)), ((0,-size_y*0.5,0), (1,0,0), (0,0,1)),
+		((0,0,size_z*0.5), (1,0,0), (0,1,0)), ((0,0,-size_z*0.5), (1,0,0), (0,-1,0))]
+	connections = []
+	for i in range(len(conn_planes)):
+		origin, x_axis, y_axis = conn_planes[i]
+		connections.append(Connection(Plane(Point3d(*origin), Vector3d(*x_axis), Vector3d(*y_axis)), 'box', name, i))
+	collider = Collider([box_mesh(size_x*0.98, size_y*0.98, size_z*0.98)])
+	return Part(name, box_mesh(size_x, size_y, size_z), connections, collider, [])
+
+
+## return the rules joining every connection of the given parts with every other one
+def all_rules(parts):
+	rules = []
+	for part_01 in parts:
+		for conn_01 in part_01.connections:
+			for part_02 in parts:
+				for conn_02 in part_02.connections:
+					rules.append(Rule(part_01.name, conn_01.id, part_02.name, conn_02.id))
+	return rules
+
+
+## create 3 box parts of different sizes, all connections joined with each other
+def box_setup():
+	parts = [box_part('A', 1.0, 1.0, 1.0), box_part('B', 2.0, 1.0, 1.0), box_part('C', 3.0, 1.0, 0.5)]
+	return parts, all_rules(parts)
+
+
+## create 5 box parts of different sizes, joined by the given number of rules (evenly picked among all connection pairs)
+def candidates_setup(rules_count):
+	parts = [box_part('A', 1.0, 1.0, 1.0), box_part('B', 2.0, 1.0, 1.0), box_part('C', 3.0, 1.0, 0.5), box_part('D', 1.0, 1.0, 2.0), box_part('E', 2.0, 2.0, 0.5)]
+	rules = all_rules(parts)
+	step = max(1, len(rules) // rules_count)
+	return parts, rules[::step][:rules_count]
+
+
+## create a cubic field with smooth values, in the range -3 to 3
+def wave_field(count, resolution = 1.0, interpolate = False):
+	frequency = 4.0 * math.pi / count
+	pts = []
+	values = []
+	for z in range(count):
+		for y in range(count):
+			for x in range(count):
+				pts.append(Point3d(x*resolution, y*resolution, z*resolution))
+				values.append(math.sin(x*frequency)*math.cos(y*frequency) + math.sin(y*frequency)*math.cos(z*frequency) + math.sin(z*frequency)*math.cos(x*frequency))
+	return Field('waves', pts, [count, count, count], resolution, plane=Plane.WorldXY, values=values, interpolate=interpolate)
+
+
+## evaluate all candidate placements of the given parts one by one (as before candidates were evaluated in batches), adding the ones inside the field to the aggregation queue
+def compute_next_one_by_one(aggr, parts):
+	for part in parts:
+		for conn_id in reversed(part.active_connections):
+			conn = part.connections[conn_id]
+			for rule_id in reversed(conn.active_rules):
+				rule = conn.rules_table[rule_id]
+				next_part = aggr.parts[rule.part2]
+				next_center = Point3d(next_part.center)
+				orientTransform = Transform.PlaneToPlane(next_part.connections[rule.conn2].flip_pln, conn.pln)
+				next_center.Transform(orientTransform)
+				if aggr.field.bbox.Contains(next_center):
+					aggr.aggregation_queue.push(aggr.field.return_pt_val(next_center), (next_part.name, part.id, orientTransform, rule.conn1, rule.conn2))
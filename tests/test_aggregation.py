@@ -0,0 +1,163 @@
+"""
+(C) 2017-2020 Andrea Rossi <ghwasp@gmail.com>
+
+This file is part of Wasp. https://github.com/ar0551/Wasp
+@license GPL-3.0 <https://www.gnu.org/licenses/gpl.html>
+
+@version 0.5.001
+
+Tests of the aggregation methods
+"""
+
+import os
+
+from wasp.geometry import Transform, Point3d, Line
+from wasp.core import Aggregation, AdvancedPart, Rule, Support
+
+from helpers import box_setup, box_part, wave_field, candidates_setup, compute_next_one_by_one
+
+
+## return the placements of an aggregation, in the form (name, id, parent, center)
+def placements(aggr):
+	return [(part.name, part.id, part.parent, tuple(round(c, 6) for c in (part.center.X, part.center.Y, part.center.Z))) for part in aggr.aggregated_parts]
+
+
+def test_field_removal_restores_the_queue():
+	parts, rules = box_setup()
+	field = wave_field(9, 2.0)
+
+	expected = Aggregation('expected', parts, rules, 0, _field=[field], _rnd_seed=0)
+	expected.aggregate_field(40)
+	assert len(expected.aggregated_parts) == 40
+
+	aggr = Aggregation('removed', parts, rules, 0, _field=[field], _rnd_seed=0)
+	aggr.aggregate_field(40)
+	aggr.remove_elements(25)
+	removed_ids = set(range(25, 40))
+	assert all(entry[1] not in removed_ids for entry in aggr.aggregation_queue.sorted_entries())
+
+	aggr.aggregate_field(15)
+	assert placements(aggr) == placements(expected)
+
+
+def test_batched_candidates_match_one_by_one():
+	parts, rules = candidates_setup(50)
+	aggr = Aggregation('candidates', parts, rules, 0, _field=[wave_field(9, 2.0)], _rnd_seed=0)
+	aggr.aggregate_field(30)
+
+	aggr.aggregation_queue.clear()
+	compute_next_one_by_one(aggr, aggr.aggregated_parts)
+	expected = [(entry[0], entry[1], entry[3], entry[4]) for entry in aggr.aggregation_queue.sorted_entries()]
+
+	aggr.aggregation_queue.clear()
+	aggr.compute_next_w_field_batch(aggr.aggregated_parts)
+	assert [(entry[0], entry[1], entry[3], entry[4]) for entry in aggr.aggregation_queue.sorted_entries()] == expected
+	assert len(expected) > 0
+
+
+def test_removal_restores_the_open_sites():
+	parts, rules = box_setup()
+	aggr = Aggregation('sites', parts, rules, 0, _rnd_seed=0)
+	aggr.aggregate_rnd(60)
+	for num in (45, 30, 29):
+		aggr.remove_elements(num)
+		sites = set(aggr.open_sites.sites)
+		buckets = dict((name, set(bucket)) for name, bucket in aggr.open_sites.buckets.items() if len(bucket) > 0)
+
+		aggr.reset_open_sites()
+		assert sites == set(aggr.open_sites.sites)
+		assert buckets == dict((name, set(bucket)) for name, bucket in aggr.open_sites.buckets.items() if len(bucket) > 0)
+		aggr.aggregate_rnd(10)
+
+
+def test_previous_parts_with_sparse_ids():
+	box = box_part('A', 1.0, 1.0, 1.0)
+	## supported only when resting on another part, so placements beside the row are suspended and released later
+	support = Support([Line(Point3d(0, 0, 0), Point3d(0, 0, -0.8))])
+	part = AdvancedPart('A', box.geo, box.connections, box.collider, [], None, [support])
+	rules = [Rule('A', conn_01.id, 'A', conn_02.id) for conn_01 in box.connections for conn_02 in box.connections]
+
+	prev = []
+	for i in range(6):
+		prev_part = part.transform(Transform.Translation(i, 0, -1))
+		prev_part.id = 2*i
+		prev.append(prev_part)
+
+	aggr = Aggregation('sparse', [part], rules, 1, _prev=prev, _rnd_seed=0)
+	aggr.aggregate_rnd(30)
+	assert any(change[0] == 'rule_on' for change in aggr.history)
+	ids = [p.id for p in aggr.aggregated_parts]
+	assert len(set(ids)) == len(ids)
+	graph_dict = aggr.graph.graph_dict
+	assert all(p.id in graph_dict[p.parent] for p in aggr.aggregated_parts if p.parent is not None)
+
+	for num in (20, 9):
+		aggr.remove_elements(num)
+		sites = set(aggr.open_sites.sites)
+		aggr.reset_open_sites()
+		assert sites == set(aggr.open_sites.sites)
+		aggr.aggregate_rnd(5)
+
+
+def test_open_sites_follow_external_edits():
+	parts, rules = box_setup()
+	aggr = Aggregation('edited', parts, rules, 0, _rnd_seed=0)
+	aggr.aggregate_rnd(30)
+	## as done by the Remove Parts component
+	aggr.aggregated_parts.pop(12)
+	aggr.aggregated_parts.pop(5)
+
+	aggr.aggregate_rnd(5)
+	sites = set(aggr.open_sites.sites)
+	aggr.reset_open_sites()
+	assert sites == set(aggr.open_sites.sites)
+	assert len(aggr.aggregated_parts) == 33
+
+
+def test_stream_count_stops_after_live_parts(tmp_path):
+	parts, rules = box_setup()
+	file_path = str(tmp_path / 'aggregation.wasp')
+	aggr = Aggregation('streamed', parts, rules, 0, _rnd_seed=0)
+	aggr.to_stream(file_path, keep_open=True)
+	aggr.aggregate_rnd(20)
+	aggr.remove_elements(10)
+	aggr.aggregate_rnd(15)
+	aggr.close_stream()
+
+	assert placements(Aggregation.from_stream(file_path)) == placements(aggr)
+	## 22 parts are first reached after the removal, 12 part records after it
+	assert placements(Aggregation.from_stream(file_path, 22)) == placements(aggr)[:22]
+	assert len(Aggregation.from_stream(file_path, 0).aggregated_parts) == 0
+
+
+def test_checkpoint_replace_without_os_replace(tmp_path, monkeypatch):
+	parts, rules = box_setup()
+	file_path = str(tmp_path / 'checkpoint.json')
+	aggr = Aggregation('checkpoint', parts, rules, 0, _rnd_seed=0)
+	aggr.aggregate_rnd(10)
+	aggr.save_checkpoint(file_path)
+
+	## as in IronPython 2.7
+	monkeypatch.delattr(os, 'replace')
+	aggr.aggregate_rnd(10)
+	aggr.save_checkpoint(file_path)
+	assert sorted(os.listdir(str(tmp_path))) == ['checkpoint.json']
+	assert placements(Aggregation.load_checkpoint(file_path)) == placements(aggr)
+
+
+def test_checkpoint_falls_back_to_backup(tmp_path):
+	parts, rules = box_setup()
+	file_path = str(tmp_path / 'checkpoint.json')
+	aggr = Aggregation('checkpoint', parts, rules, 0, _rnd_seed=0)
+	aggr.aggregate_rnd(10)
+	aggr.save_checkpoint(file_path)
+	expected = placements(aggr)
+
+	## a save interrupted after moving the old checkpoint to its backup
+	os.rename(file_path, file_path + '.bak')
+	assert placements(Aggregation.load_checkpoint(file_path)) == expected
+
+	## a save interrupted while writing the checkpoint in place
+	with open(file_path, 'w') as f:
+		f.write('{"type": "checkp')
+	assert placements(Aggregation.load_checkpoint(file_path)) == expected
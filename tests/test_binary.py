@@ -0,0 +1,100 @@
+"""
+(C) 2017-2020 Andrea Rossi <ghwasp@gmail.com>
+
+This file is part of Wasp. https://github.com/ar0551/Wasp
+@license GPL-3.0 <https://www.gnu.org/licenses/gpl.html>
+
+@version 0.5.001
+
+Tests of the binary aggregation format
+"""
+
+import json
+import os
+import struct
+import zlib
+
+import pytest
+
+from wasp.core import Aggregation
+
+from helpers import box_setup, wave_field
+
+
+## return the data dictionary of an aggregation, as it would be read from a JSON file
+## active connections are not compared, as loaded parts only deactivate the connections used by their parent (field-driven aggregations keep them active)
+def json_data(aggr):
+	data = json.loads(json.dumps(aggr.to_data()))
+	for part_data in data['aggregated_parts'].values():
+		del part_data['active_connections']
+	return data
+
+
+def test_random_aggregation_round_trip(tmp_path):
+	parts, rules = box_setup()
+	aggr = Aggregation('binary', parts, rules, 0, _rnd_seed=1)
+	aggr.aggregate_rnd(60)
+
+	file_path = str(tmp_path / 'aggregation.wbin')
+	aggr.to_binary(file_path)
+	loaded = Aggregation.from_binary(file_path)
+
+	assert json_data(loaded) == json_data(aggr)
+	assert [part.id for part in loaded.aggregated_parts] == [part.id for part in aggr.aggregated_parts]
+
+
+def test_field_aggregation_round_trip(tmp_path):
+	parts, rules = box_setup()
+	aggr = Aggregation('binary', parts, rules, 0, _field=[wave_field(9, 2.0, True)], _rnd_seed=0)
+	aggr.aggregate_field(30)
+
+	file_path = str(tmp_path / 'aggregation.wbin')
+	aggr.to_binary(file_path)
+	loaded = Aggregation.from_binary(file_path)
+
+	assert json_data(loaded) == json_data(aggr)
+	assert loaded.field.interpolate
+	assert loaded.aggregation_queue.count > 0
+
+
+def test_binary_is_smaller_than_json(tmp_path):
+	parts, rules = box_setup()
+	aggr = Aggregation('binary', parts, rules, 0, _rnd_seed=1)
+	aggr.aggregate_rnd(200)
+
+	json_path = str(tmp_path / 'aggregation.json')
+	with open(json_path, 'w') as f:
+		json.dump(aggr.to_data(), f)
+	bin_path = str(tmp_path / 'aggregation.wbin')
+	aggr.to_binary(bin_path)
+
+	## the compressed placements take less than the 110 bytes of each uncompressed one
+	header_size = len(zlib.compress(json.dumps(aggr.header_to_data()).encode('utf-8')))
+	assert os.path.getsize(bin_path) - header_size < 110 * len(aggr.aggregated_parts)
+	assert os.path.getsize(bin_path) * 50 < os.path.getsize(json_path)
+
+
+def test_version_1_file(tmp_path):
+	parts, rules = box_setup()
+	aggr = Aggregation('binary', parts, rules, 0, _rnd_seed=1)
+	aggr.aggregate_rnd(30)
+	file_path = str(tmp_path / 'aggregation.wbin')
+	aggr.to_binary(file_path)
+
+	## rewrite the file without compression, as saved by version 1
+	with open(file_path, 'rb') as f:
+		magic, version, header_size = struct.unpack('<8sII', f.read(16))
+		header_bytes = zlib.decompress(f.read(header_size))
+		placements = zlib.decompress(f.read())
+	with open(file_path, 'wb') as f:
+		f.write(struct.pack('<8sII', magic, 1, len(header_bytes)) + header_bytes + placements)
+
+	assert json_data(Aggregation.from_binary(file_path)) == json_data(aggr)
+
+
+def test_invalid_file(tmp_path):
+	file_path = str(tmp_path / 'invalid.wbin')
+	with open(file_path, 'wb') as f:
+		f.write(b'NOTWASP!' + b'\0' * 8)
+	with pytest.raises(ValueError):
+		Aggregation.from_binary(file_path)
@@ -0,0 +1,155 @@
+"""
+(C) 2017-2020 Andrea Rossi <ghwasp@gmail.com>
+
+This file is part of Wasp. https://github.com/ar0551/Wasp
+@license GPL-3.0 <https://www.gnu.org/licenses/gpl.html>
+
+@version 0.5.001
+
+Tests of the field meshing and sampling methods
+"""
+
+import random
+
+import pytest
+
+from wasp.geometry import Point3d, Plane
+from wasp.field import Field
+from wasp.field.meshing import voxel_quads, voxel_quads_np, marching_cubes, marching_cubes_np
+
+
+## create a field of random values between 0 and 1
+def random_field(count, seed, interpolate = False):
+	rnd = random.Random(seed)
+	pts = []
+	values = []
+	for z in range(count[2]):
+		for y in range(count[1]):
+			for x in range(count[0]):
+				pts.append(Point3d(x, y, z))
+				values.append(rnd.random())
+	return Field('random', pts, count, 1.0, plane=Plane.WorldXY, values=values, interpolate=interpolate)
+
+
+## count the voxel faces as computed before the faces were shared on a lattice (one face for each solid voxel side facing a lower value or the capped boundary)
+def reference_voxel_face_count(values, count, iso, cap):
+	x_count, y_count, z_count = count
+	steps = (1, x_count, x_count*y_count)
+	faces = 0
+	for z in range(z_count):
+		for y in range(y_count):
+			for x in range(x_count):
+				i = x + y*steps[1] + z*steps[2]
+				if values[i] <= iso:
+					continue
+				for axis, c in ((0, x), (1, y), (2, z)):
+					for side in (-1, 1):
+						if c + side < 0 or c + side >= count[axis]:
+							faces += 1 if cap else 0
+						elif values[i + side*steps[axis]] < iso:
+							faces += 1
+	return faces
+
+
+## return the area of a voxel face rectangle, from the lattice ids of its corners
+def lattice_quad_area(quad, count):
+	x_lattice = count[0] + 1
+	xy_lattice = (count[0] + 1) * (count[1] + 1)
+	corners = [(i % x_lattice, (i % xy_lattice) // x_lattice, i // xy_lattice) for i in quad]
+	extents = [max(c[axis] for c in corners) - min(c[axis] for c in corners) for axis in range(3)]
+	return max(extents[0]*extents[1], extents[1]*extents[2], extents[2]*extents[0])
+
+
+@pytest.mark.parametrize('cap', [True, False])
+def test_voxel_face_count_matches_reference(cap):
+	count = (7, 5, 6)
+	field = random_field(count, 0)
+	values = field.return_values_list()
+	solid = [v > 0.5 for v in values]
+	expected = reference_voxel_face_count(values, count, 0.5, cap)
+
+	assert len(voxel_quads(solid, count, cap)) == expected
+	assert len(voxel_quads_np(solid, count, cap)) == expected
+	assert field.compute_voxel_mesh(0.5, cap).Faces.Count == expected
+
+
+@pytest.mark.parametrize('cap', [True, False])
+def test_merged_voxel_faces_cover_the_same_area(cap):
+	count = (8, 6, 5)
+	field = random_field(count, 1)
+	solid = [v > 0.3 for v in field.return_values_list()]
+	expected = reference_voxel_face_count(field.return_values_list(), count, 0.3, cap)
+
+	for quads in (voxel_quads(solid, count, cap, True), voxel_quads_np(solid, count, cap, True).tolist()):
+		assert len(quads) < expected
+		assert sum(lattice_quad_area(quad, count) for quad in quads) == expected
+
+
+## return the directed edges of the triangles of a mesh, counting how many times each one is used
+def directed_edges(triangles):
+	edges = {}
+	for triangle in triangles:
+		for i in range(3):
+			edge = (triangle[i], triangle[(i+1) % 3])
+			edges[edge] = edges.get(edge, 0) + 1
+	return edges
+
+
+## return the signed volume enclosed by the triangles (positive if they face outwards)
+def signed_volume(vertices, triangles):
+	volume = 0.0
+	for a, b, c in triangles:
+		pa, pb, pc = vertices[a], vertices[b], vertices[c]
+		volume += (pa[0]*(pb[1]*pc[2] - pb[2]*pc[1]) + pa[1]*(pb[2]*pc[0] - pb[0]*pc[2]) + pa[2]*(pb[0]*pc[1] - pb[1]*pc[0])) / 6.0
+	return volume
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_iso_surface_is_closed_and_oriented(seed):
+	count = (6, 7, 5)
+	values = random_field(count, seed).return_values_list()
+
+	np_vertices, np_triangles = marching_cubes_np(values, count, 0.5)
+	for vertices, triangles in ((np_vertices.tolist(), np_triangles.tolist()), marching_cubes(values, count, 0.5)):
+		assert len(triangles) > 0
+		edges = directed_edges(triangles)
+		## each edge is shared by two triangles, walking it in opposite directions
+		assert all(used == 1 for used in edges.values())
+		assert all(edges.get((b, a)) == 1 for a, b in edges)
+		## triangles face the values lower than the iso value, outwards from the enclosed volume
+		assert signed_volume(vertices, triangles) > 0
+	assert len(np_triangles) == len(marching_cubes(values, count, 0.5)[1])
+
+
+
+
+def test_interpolation_matches_values_at_points():
+	count = (5, 4, 3)
+	field = random_field(count, 2, interpolate=True)
+	values = field.return_values_list()
+	pts = [Point3d(x, y, z) for z in range(count[2]) for y in range(count[1]) for x in range(count[0])]
+
+	assert field.return_pts_val(pts) == pytest.approx(values)
+	for pt, value in zip(pts, values):
+		assert field.return_pt_val(pt) == pytest.approx(value)
+
+
+@pytest.mark.parametrize('t', [0.0, 0.25, 0.5, 0.8])
+def test_interpolation_is_linear_along_edges(t):
+	count = (5, 4, 3)
+	field = random_field(count, 3, interpolate=True)
+	steps = ((1, 0, 0), (0, 1, 0), (0, 0, 1))
+
+	pts = []
+	expected = []
+	for z in range(count[2]):
+		for y in range(count[1]):
+			for x in range(count[0]):
+				for step in steps:
+					end = (x + step[0], y + step[1], z + step[2])
+					if end[0] < count[0] and end[1] < count[1] and end[2] < count[2]:
+						pts.append(Point3d(x + t*step[0], y + t*step[1], z + t*step[2]))
+						expected.append((1.0 - t)*field.return_value(x, y, z) + t*field.return_value(*end))
+
+	assert field.return_pts_val(pts) == pytest.approx(expected)
+	assert [field.return_pt_val(pt) for pt in pts] == pytest.approx(expected)
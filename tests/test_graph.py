@@ -0,0 +1,30 @@
+"""
+(C) 2017-2020 Andrea Rossi <ghwasp@gmail.com>
+
+This file is part of Wasp. https://github.com/ar0551/Wasp
+@license GPL-3.0 <https://www.gnu.org/licenses/gpl.html>
+
+@version 0.5.001
+
+Tests of the aggregation graph
+"""
+
+from wasp.core import Aggregation
+
+from helpers import box_setup
+
+
+def test_edge_lookup_matches_graph_dict():
+	parts, rules = box_setup()
+	aggr = Aggregation('graph', parts, rules, 0, _rnd_seed=0)
+	aggr.aggregate_rnd(40)
+	aggr.remove_elements(30)
+	graph = aggr.graph
+
+	graph_dict = graph.graph_dict
+	for part in aggr.aggregated_parts:
+		if part.parent is not None:
+			edge = graph.get_edge_attributes(graph.get_edge_index(part.parent, part.id))
+			assert edge == graph_dict[part.parent][part.id]
+			assert (edge['conn_start'], edge['conn_end']) == (part.conn_on_parent, part.conn_to_parent)
+	assert graph.get_edge_index(aggr.aggregated_parts[0].id, 1000) is None
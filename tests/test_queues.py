@@ -0,0 +1,60 @@
+"""
+(C) 2017-2020 Andrea Rossi <ghwasp@gmail.com>
+
+This file is part of Wasp. https://github.com/ar0551/Wasp
+@license GPL-3.0 <https://www.gnu.org/licenses/gpl.html>
+
+@version 0.5.001
+
+Tests of the aggregation queue
+"""
+
+from wasp.core import AggregationQueue
+
+
+## create a queue with the entries of three parents, in the form (part_name, parent_id, value)
+def sample_queue():
+	queue = AggregationQueue()
+	for parent_id in range(3):
+		for i in range(4):
+			queue.push(float(i), ('A' if i % 2 == 0 else 'B', parent_id, float(i)))
+	return queue
+
+
+def test_remove_parent_only_removes_its_entries():
+	queue = sample_queue()
+	assert queue.remove_parent(1) == 4
+	assert queue.count == 8
+	assert all(entry[1] != 1 for entry in queue.sorted_entries())
+	assert queue.remove_parent(1) == 0
+
+
+def test_remove_entry_after_reinsertion():
+	queue = sample_queue()
+	item = queue.pop_item()
+	queue.push_item(item)
+	assert queue.count == 12
+	assert queue.remove_entry(item[2]) == 1
+	assert queue.count == 11
+	assert all(entry is not item[2] for entry in queue.sorted_entries())
+
+
+def test_parent_index_survives_compaction():
+	queue = sample_queue()
+	queue.remove_parent(0)
+	queue.remove_parent(2)
+	queue.compact()
+	assert len(queue.heap) == 4
+	assert queue.remove_parent(1) == 4
+	assert queue.count == 0
+	assert queue.peek() is None
+
+
+def test_popped_entries_follow_value_order():
+	queue = sample_queue()
+	queue.remove_parent(0)
+	values = []
+	while queue.count > 0:
+		values.append(queue.pop('A')[2] if queue.contains('A') else queue.pop()[2])
+	assert values[:4] == [2.0, 2.0, 0.0, 0.0]
+	assert values[4:] == [3.0, 3.0, 1.0, 1.0]
@@ -0,0 +1,52 @@
+"""
+(C) 2017-2020 Andrea Rossi <ghwasp@gmail.com>
+
+This file is part of Wasp. https://github.com/ar0551/Wasp
+@license GPL-3.0 <https://www.gnu.org/licenses/gpl.html>
+
+@version 0.5.001
+
+Tests of the batch runner
+"""
+
+import json
+
+import pytest
+
+from wasp.core import Aggregation
+from wasp.batch import run_sweep
+
+from helpers import box_setup
+
+
+## write a base aggregation file and return a sweep spec using it
+def sweep_spec(tmp_path, **settings):
+	parts, rules = box_setup()
+	base = Aggregation('sweep', parts, rules, 0, _rnd_seed=0)
+	base_path = str(tmp_path / 'base.json')
+	with open(base_path, 'w') as f:
+		json.dump(base.header_to_data(), f)
+
+	spec = {'aggregation': base_path, 'output': str(tmp_path / 'results'), 'count': 10, 'seeds': [0, 1], 'format': 'none'}
+	spec.update(settings)
+	return spec
+
+
+def test_sweep_over_processes(tmp_path):
+	spec = sweep_spec(tmp_path, rule_sets={'all': None, 'half': list(range(0, 324, 2))})
+	results = run_sweep(spec, processes=2)
+	assert [metrics['id'] for metrics in results] == [0, 1, 2, 3]
+	assert all(metrics['parts_placed'] == 10 for metrics in results)
+
+
+def test_invalid_rule_index_fails_before_starting_workers(tmp_path):
+	spec = sweep_spec(tmp_path, rule_sets={'broken': [0, 1, 5000]})
+	with pytest.raises(ValueError) as error:
+		run_sweep(spec, processes=2)
+	assert 'rule 5000' in str(error.value)
+
+
+def test_invalid_method(tmp_path):
+	spec = sweep_spec(tmp_path, method='field')
+	with pytest.raises(ValueError):
+		run_sweep(spec, processes=2)